@@ -12,6 +12,12 @@ from routes.users import users_bp
 from routes.cart import cart_bp
 from routes.orders import orders_bp
 from routes.admin import admin_bp
+from routes.images import images_bp
+from middleware.compression import init_compression
+from services.suggest_index import suggest_index
+from services.reservation_sweeper import reservation_sweeper
+from services.email_worker import email_worker
+from services.password_hasher import password_hasher
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -24,6 +30,9 @@ app.config.from_object(Config)
 # Enable CORS
 CORS(app)  # React app default port
 
+# Compress large JSON responses (gzip/brotli)
+init_compression(app)
+
 # MongoDB connection
 client = MongoClient(Config.MONGO_URI)
 db = client[Config.DATABASE_NAME]
@@ -51,6 +60,7 @@ app.register_blueprint(users_bp, url_prefix='/api/user')
 app.register_blueprint(cart_bp, url_prefix='/api')
 app.register_blueprint(orders_bp, url_prefix='/api')
 app.register_blueprint(admin_bp, url_prefix='/api')
+app.register_blueprint(images_bp, url_prefix='/api')
 
 # Health check endpoint
 @app.route('/api/health', methods=['GET'])
@@ -65,9 +75,45 @@ if __name__ == '__main__':
     # Create indexes for better performance
     db.users.create_index([('email', 1)], unique=True)
     db.products.create_index([('category', 1)])
+    db.products.create_index([('sku', 1)], unique=True, sparse=True)
+    db.products.create_index([('createdAt', -1), ('_id', -1)])
+    db.products.create_index([('category', 1), ('createdAt', -1), ('_id', -1)])
+    db.products.create_index([('price', 1), ('_id', 1)])
+    db.products.create_index([('category', 1), ('price', 1), ('_id', 1)])
+    db.products.create_index([('unitsSold', -1), ('_id', -1)])
+    db.products.create_index([('category', 1), ('unitsSold', -1), ('_id', -1)])
     db.products.create_index([('name', 'text'), ('description', 'text')])
     db.orders.create_index([('userId', 1), ('createdAt', -1)])
     db.orders.create_index([('createdAt', -1)])
+    # Admin order list: newest first with keyset paging, optionally filtered
+    db.orders.create_index([('createdAt', -1), ('_id', -1)])
+    db.orders.create_index([('orderStatus', 1), ('createdAt', -1), ('_id', -1)])
+    db.orders.create_index([('paymentStatus', 1), ('createdAt', -1), ('_id', -1)])
+    db.orders.create_index([('customerEmail', 1), ('createdAt', -1), ('_id', -1)])
+    db.carts.create_index([('userId', 1)], unique=True, sparse=True)
+    db.carts.create_index([('guestToken', 1)], unique=True, sparse=True)
+    db.carts.create_index([('expiresAt', 1)], expireAfterSeconds=0)  # guest carts only
+    db.orders.create_index(
+        [('reservation.expiresAt', 1)],
+        partialFilterExpression={'reservation.status': 'held'}
+    )
+    db.email_outbox.create_index([('dedupeKey', 1)], unique=True)
+    db.email_outbox.create_index([('status', 1), ('nextAttemptAt', 1)])
+    db.email_outbox.create_index([('status', 1), ('leaseUntil', 1)])
+    db.email_outbox.create_index([('status', 1), ('template', 1), ('nextAttemptAt', 1)])
+    db.email_outbox.create_index([('sentAt', 1)], expireAfterSeconds=Config.EMAIL_OUTBOX_RETENTION_DAYS * 86400)
+    
+    # Warm the typeahead index before accepting traffic
+    suggest_index.build(db)
+    
+    # Give back stock held by checkouts that were abandoned
+    reservation_sweeper.start(db)
+    
+    # Deliver queued emails off the request threads
+    email_worker.start(db)
+    
+    # Pick the bcrypt cost for this host before the first login
+    password_hasher.calibrate()
     
     print("Starting Flask server...")
     print(f"Database: {Config.DATABASE_NAME}")
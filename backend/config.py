@@ -21,4 +21,72 @@ class Config:
     # File Upload Configuration
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
-    UPLOAD_FOLDER = 'uploads'
\ No newline at end of file
+    UPLOAD_FOLDER = 'uploads'
+
+    # Image Store Configuration
+    IMAGE_STORE_BACKEND = os.getenv('IMAGE_STORE_BACKEND', 'gridfs')  # 'gridfs' or 'filesystem'
+    IMAGE_STORE_PATH = os.getenv('IMAGE_STORE_PATH', os.path.join(UPLOAD_FOLDER, 'images'))
+    IMAGE_CACHE_MAX_AGE = int(os.getenv('IMAGE_CACHE_MAX_AGE', 31536000))  # 1 year, blobs are immutable
+
+    # Image Derivative Pipeline Configuration
+    IMAGE_PIPELINE_WORKERS = int(os.getenv('IMAGE_PIPELINE_WORKERS', 2))
+    IMAGE_PIPELINE_QUEUE_SIZE = int(os.getenv('IMAGE_PIPELINE_QUEUE_SIZE', 32))
+    IMAGE_VARIANT_QUALITY = int(os.getenv('IMAGE_VARIANT_QUALITY', 80))
+
+    # Password Hashing Configuration
+    AUTH_HASH_WORKERS = int(os.getenv('AUTH_HASH_WORKERS', 2))  # bcrypt processes
+    AUTH_HASH_QUEUE_SIZE = int(os.getenv('AUTH_HASH_QUEUE_SIZE', 8))  # running + waiting; more gets a 503
+    AUTH_HASH_TIMEOUT = float(os.getenv('AUTH_HASH_TIMEOUT', 5))  # seconds a request waits for its hash
+    AUTH_BUSY_RETRY_AFTER = int(os.getenv('AUTH_BUSY_RETRY_AFTER', 2))  # Retry-After on a 503
+    AUTH_HASH_COST = int(os.getenv('AUTH_HASH_COST', 0))  # fixed bcrypt cost; 0 calibrates at startup
+    AUTH_HASH_TARGET_MS = int(os.getenv('AUTH_HASH_TARGET_MS', 250))  # calibration target per hash
+    AUTH_HASH_MIN_COST = int(os.getenv('AUTH_HASH_MIN_COST', 12))  # never calibrate below the old fixed cost
+    AUTH_HASH_MAX_COST = int(os.getenv('AUTH_HASH_MAX_COST', 15))
+
+    # Catalog Configuration
+    PRODUCT_COUNT_CACHE_TTL = int(os.getenv('PRODUCT_COUNT_CACHE_TTL', 60))  # seconds
+    SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', 15))  # seconds
+    CATALOG_CACHE_TTL = int(os.getenv('CATALOG_CACHE_TTL', 300))  # seconds
+    CATALOG_CACHE_SIZE = int(os.getenv('CATALOG_CACHE_SIZE', 1024))  # entries per cache
+    PRODUCT_BATCH_MAX = int(os.getenv('PRODUCT_BATCH_MAX', 100))  # ids per /products/batch request
+
+    # Admin Dashboard Configuration
+    DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', 30))  # seconds
+    DASHBOARD_MAX_DAYS = int(os.getenv('DASHBOARD_MAX_DAYS', 365))
+    ORDER_COUNT_CACHE_TTL = int(os.getenv('ORDER_COUNT_CACHE_TTL', 30))  # seconds, filtered admin order totals
+
+    # Cart Configuration
+    GUEST_CART_TTL_DAYS = int(os.getenv('GUEST_CART_TTL_DAYS', 14))  # abandoned guest carts expire
+
+    # Inventory Configuration
+    STOCK_RESERVATION_MINUTES = int(os.getenv('STOCK_RESERVATION_MINUTES', 30))  # checkout window, raised to Stripe's minimum (31) if lower
+    RESERVATION_GRACE_MINUTES = int(os.getenv('RESERVATION_GRACE_MINUTES', 5))  # hold kept after the session expires
+    RESERVATION_SWEEP_INTERVAL = int(os.getenv('RESERVATION_SWEEP_INTERVAL', 60))  # seconds
+
+    # Email Outbox Configuration
+    EMAIL_WORKERS = int(os.getenv('EMAIL_WORKERS', 2))  # concurrent Mailgun sends
+    EMAIL_POLL_INTERVAL = int(os.getenv('EMAIL_POLL_INTERVAL', 5))  # seconds between outbox polls when idle
+    EMAIL_MAX_ATTEMPTS = int(os.getenv('EMAIL_MAX_ATTEMPTS', 6))  # then the message is dead-lettered
+    EMAIL_RETRY_BASE_SECONDS = int(os.getenv('EMAIL_RETRY_BASE_SECONDS', 30))  # first retry delay, doubles each attempt
+    EMAIL_RETRY_MAX_SECONDS = int(os.getenv('EMAIL_RETRY_MAX_SECONDS', 3600))
+    EMAIL_SEND_LEASE_SECONDS = int(os.getenv('EMAIL_SEND_LEASE_SECONDS', 120))  # a claimed message is retried after this
+    EMAIL_OUTBOX_RETENTION_DAYS = int(os.getenv('EMAIL_OUTBOX_RETENTION_DAYS', 30))  # sent messages are then removed
+    EMAIL_BATCH_WINDOW_SECONDS = int(os.getenv('EMAIL_BATCH_WINDOW_SECONDS', 60))  # shipping/delivery notices wait to be batched
+    MAILGUN_BATCH_SIZE = int(os.getenv('MAILGUN_BATCH_SIZE', 1000))  # recipients per batch request, Mailgun maximum is 1000
+
+    # Mailgun HTTP Client Configuration
+    MAILGUN_POOL_SIZE = int(os.getenv('MAILGUN_POOL_SIZE', 4))  # keep-alive connections, at least EMAIL_WORKERS
+    MAILGUN_CONNECT_TIMEOUT = float(os.getenv('MAILGUN_CONNECT_TIMEOUT', 3.05))  # seconds
+    MAILGUN_READ_TIMEOUT = float(os.getenv('MAILGUN_READ_TIMEOUT', 10))  # seconds
+    MAILGUN_RETRIES = int(os.getenv('MAILGUN_RETRIES', 2))  # in-request retries on connect errors and 429/502/503
+    MAILGUN_RETRY_BACKOFF = float(os.getenv('MAILGUN_RETRY_BACKOFF', 0.5))  # seconds, doubles per retry
+    MAILGUN_BREAKER_FAILURES = int(os.getenv('MAILGUN_BREAKER_FAILURES', 5))  # consecutive failures that open the circuit
+    MAILGUN_BREAKER_RESET_SECONDS = int(os.getenv('MAILGUN_BREAKER_RESET_SECONDS', 30))  # before a trial request
+
+    # Response Compression Configuration
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))  # bytes
+    COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 5))
+    COMPRESSION_CACHE_SIZE = int(os.getenv('COMPRESSION_CACHE_SIZE', 256))  # entries
+    COMPRESSION_CACHE_TTL = int(os.getenv('COMPRESSION_CACHE_TTL', 300))  # seconds
\ No newline at end of file
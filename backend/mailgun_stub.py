@@ -0,0 +1,101 @@
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+# Local stand-in for the Mailgun API, for exercising the email outbox end to end.
+# Run it, then start the backend with MAILGUN_API_BASE=http://127.0.0.1:<port>/v3
+
+class StubState:
+    def __init__(self, failure_rate, status, latency):
+        self.failure_rate = failure_rate
+        self.status = status
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.accepted = 0
+        self.failed = 0
+
+def make_handler(state):
+    class MailgunStubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            # Domain lookup used by EmailService.test_mailgun_connection
+            self._reply(200, {'domain': {'name': self.path.rsplit('/', 1)[-1], 'state': 'active'}})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            form = parse_qs(self.rfile.read(length).decode('utf-8'))
+            if state.latency:
+                time.sleep(state.latency)
+
+            if random.random() < state.failure_rate:
+                with state.lock:
+                    state.failed += 1
+                self._reply(state.status, {'message': 'Stub failure'})
+                return
+
+            recipients = form.get('to', [])
+            # Like Mailgun, reject the whole request for an undeliverable address
+            if any(recipient.endswith('.invalid') for recipient in recipients):
+                with state.lock:
+                    state.failed += 1
+                self._reply(400, {'message': "'to' parameter is not a valid address"})
+                return
+            if len(recipients) > 1 and 'recipient-variables' not in form:
+                self._reply(400, {'message': 'Batch sending requires recipient-variables'})
+                return
+
+            with state.lock:
+                state.accepted += 1
+                count = state.accepted
+            shown = recipients[0] if len(recipients) == 1 else f'{len(recipients)} recipients (batch)'
+            print(f"[{count}] {self.path} to={shown} template={form.get('template', [''])[0]}")
+            self._reply(200, {'id': f'<stub.{count}@mailgun.local>', 'message': 'Queued. Thank you.'})
+
+        def log_message(self, format, *args):
+            pass
+
+    return MailgunStubHandler
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local Mailgun API stand-in')
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='share of POSTs that fail (0-1)')
+    parser.add_argument('--status', type=int, default=503, help='HTTP status returned for failures')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every POST')
+    args = parser.parse_args()
+
+    print("="*50)
+    print("MAILGUN STUB")
+    print("="*50)
+
+    try:
+        state = StubState(args.failure_rate, args.status, args.latency)
+        server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(state))
+        print(f"Listening on http://127.0.0.1:{args.port}/v3 (failure rate {args.failure_rate:.0%}, status {args.status})")
+        print(f"Start the backend with MAILGUN_API_BASE=http://127.0.0.1:{args.port}/v3\n")
+        server.serve_forever()
+
+    except KeyboardInterrupt:
+        print(f"\nStopped. {state.accepted} accepted, {state.failed} failed.")
+    except Exception as e:
+        print(f"\nError running stub: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -29,6 +29,28 @@ def token_required(f):
     decorator.__name__ = f.__name__
     return decorator
 
+def token_optional(f):
+    """Like token_required, but anonymous requests pass with request.user_id = None"""
+    def decorator(*args, **kwargs):
+        request.user_id = None
+        request.is_admin = False
+        
+        auth_header = request.headers.get('Authorization', '')
+        if auth_header.startswith('Bearer '):
+            try:
+                payload = jwt.decode(auth_header.split(' ')[1], os.getenv('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production'), algorithms=['HS256'])
+                request.user_id = payload['user_id']
+                request.is_admin = payload.get('is_admin', False)
+            except jwt.ExpiredSignatureError:
+                return jsonify({'error': 'Token has expired'}), 401
+            except jwt.InvalidTokenError:
+                return jsonify({'error': 'Invalid token'}), 401
+        
+        return f(*args, **kwargs)
+    
+    decorator.__name__ = f.__name__
+    return decorator
+
 def admin_required(f):
     def decorator(*args, **kwargs):
         if not hasattr(request, 'is_admin') or not request.is_admin:
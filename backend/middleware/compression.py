@@ -0,0 +1,115 @@
+from flask import request
+import gzip
+import time
+import logging
+import threading
+from config import Config
+from utils.cache import TTLCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Only text-like payloads are worth compressing
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript', 'application/x-ndjson', 'image/svg+xml')
+
+# Compressed bytes of cacheable GET responses, keyed by (ETag, encoding)
+_compressed_cache = TTLCache(maxsize=Config.COMPRESSION_CACHE_SIZE, ttl=Config.COMPRESSION_CACHE_TTL)
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+def _negotiate_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+def _compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=Config.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=Config.COMPRESSION_GZIP_LEVEL)
+
+def _record(route, original_size, compressed_size, cpu_seconds, cache_hit):
+    with _stats_lock:
+        entry = _stats.setdefault(route, {
+            'responses': 0,
+            'bytesIn': 0,
+            'bytesOut': 0,
+            'cpuSeconds': 0.0,
+            'cacheHits': 0
+        })
+        entry['responses'] += 1
+        entry['bytesIn'] += original_size
+        entry['bytesOut'] += compressed_size
+        entry['cpuSeconds'] += cpu_seconds
+        if cache_hit:
+            entry['cacheHits'] += 1
+
+def get_compression_stats():
+    with _stats_lock:
+        routes = {}
+        for route, entry in _stats.items():
+            routes[route] = {
+                **entry,
+                'cpuSeconds': round(entry['cpuSeconds'], 6),
+                'ratio': round(entry['bytesOut'] / entry['bytesIn'], 4) if entry['bytesIn'] else 0
+            }
+    return {
+        'routes': routes,
+        'cache': _compressed_cache.stats(),
+        'brotliAvailable': brotli is not None
+    }
+
+def compress_response(response):
+    """Negotiated gzip/brotli compression for sufficiently large responses"""
+    if (response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES)):
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    encoding = _negotiate_encoding()
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    if len(data) < Config.COMPRESSION_MIN_SIZE:
+        return response
+
+    # Public GET responses with an ETag are identical for every client
+    etag, _ = response.get_etag()
+    cache_key = None
+    if request.method == 'GET' and etag and response.cache_control.public:
+        cache_key = (etag, encoding)
+
+    started = time.thread_time()
+    compressed = _compressed_cache.get(cache_key) if cache_key else None
+    cache_hit = compressed is not None
+    if compressed is None:
+        compressed = _compress(data, encoding)
+        if cache_key:
+            _compressed_cache.set(cache_key, compressed)
+    cpu_seconds = time.thread_time() - started
+
+    route = request.url_rule.rule if request.url_rule else request.path
+    _record(route, len(data), len(compressed), cpu_seconds, cache_hit)
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    if etag:
+        # Weak, so If-None-Match still matches the uncompressed validator
+        response.set_etag(etag, weak=True)
+    return response
+
+def init_compression(app):
+    if not Config.COMPRESSION_ENABLED:
+        logging.info("Response compression disabled")
+        return
+    app.after_request(compress_response)
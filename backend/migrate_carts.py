@@ -0,0 +1,69 @@
+import sys
+from datetime import datetime
+from pymongo import MongoClient, UpdateOne
+from config import Config
+
+BATCH_SIZE = 100
+
+def migrate_carts(db):
+    """Copy embedded users.cart arrays into the carts collection, then drop them"""
+    migrated = 0
+    operations = []
+    user_ids = []
+
+    cursor = db.users.find(
+        {'cart': {'$exists': True}},
+        {'cart': 1}
+    ).batch_size(BATCH_SIZE)
+
+    for user in cursor:
+        items = user.get('cart') or []
+        if items:
+            now = datetime.utcnow()
+            # $setOnInsert keeps a cart already written through the new API
+            operations.append(UpdateOne(
+                {'userId': user['_id']},
+                {'$setOnInsert': {'items': items, 'createdAt': now, 'updatedAt': now}},
+                upsert=True
+            ))
+        user_ids.append(user['_id'])
+
+        if len(user_ids) >= BATCH_SIZE:
+            migrated += flush(db, operations, user_ids)
+            print(f"  Migrated {migrated} carts...")
+            operations = []
+            user_ids = []
+
+    if user_ids:
+        migrated += flush(db, operations, user_ids)
+
+    return migrated
+
+def flush(db, operations, user_ids):
+    if operations:
+        db.carts.bulk_write(operations, ordered=False)
+    db.users.update_many({'_id': {'$in': user_ids}}, {'$unset': {'cart': ''}})
+    return len(operations)
+
+def main():
+    print("="*50)
+    print("CART MIGRATION")
+    print("="*50)
+
+    try:
+        client = MongoClient(Config.MONGO_URI)
+        db = client[Config.DATABASE_NAME]
+        print(f"Connected to database: {Config.DATABASE_NAME}\n")
+
+        db.carts.create_index([('userId', 1)], unique=True, sparse=True)
+        migrated = migrate_carts(db)
+        print(f"\nDone. {migrated} carts moved to the carts collection.")
+
+    except Exception as e:
+        print(f"\nError during migration: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
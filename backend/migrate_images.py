@@ -0,0 +1,88 @@
+import sys
+import base64
+from pymongo import MongoClient, UpdateOne
+from config import Config
+from services.image_store import image_store
+from services.image_pipeline import image_pipeline
+
+BATCH_SIZE = 100
+
+def to_reference(db, image):
+    """Convert a legacy embedded base64 image into an image store reference"""
+    if not isinstance(image, dict) or 'data' not in image:
+        return image
+    return image_store.save(
+        db,
+        base64.b64decode(image['data']),
+        image.get('contentType', 'application/octet-stream'),
+        image.get('filename', '')
+    )
+
+def migrate_products(db):
+    """Move base64 images out of product documents into the image store"""
+    migrated = 0
+    operations = []
+
+    # Only fetch products that still have embedded image data
+    cursor = db.products.find(
+        {'images.data': {'$exists': True}},
+        {'images': 1}
+    ).batch_size(BATCH_SIZE)
+
+    for product in cursor:
+        references = [to_reference(db, image) for image in product.get('images', [])]
+        operations.append(UpdateOne({'_id': product['_id']}, {'$set': {'images': references}}))
+
+        if len(operations) >= BATCH_SIZE:
+            db.products.bulk_write(operations, ordered=False)
+            migrated += len(operations)
+            print(f"  Migrated {migrated} products...")
+            operations = []
+
+    if operations:
+        db.products.bulk_write(operations, ordered=False)
+        migrated += len(operations)
+
+    return migrated
+
+def migrate_variants(db):
+    """Generate thumbnail/card/zoom derivatives for images that have none"""
+    generated = 0
+    cursor = db.products.find(
+        {'images': {'$elemMatch': {'hash': {'$exists': True}, 'variants': {'$exists': False}}}},
+        {'images': 1}
+    ).batch_size(BATCH_SIZE)
+
+    for product in cursor:
+        for image in product.get('images', []):
+            if 'hash' in image and 'variants' not in image:
+                if image_pipeline.process_now(db, str(product['_id']), image['hash']):
+                    generated += 1
+
+    return generated
+
+def main():
+    print("="*50)
+    print("PRODUCT IMAGE MIGRATION")
+    print("="*50)
+
+    try:
+        client = MongoClient(Config.MONGO_URI)
+        db = client[Config.DATABASE_NAME]
+        print(f"Connected to database: {Config.DATABASE_NAME}")
+        print(f"Image store backend: {image_store.backend}\n")
+
+        migrated = migrate_products(db)
+        print(f"\n{migrated} products migrated to the image store.")
+
+        generated = migrate_variants(db)
+        print(f"Done. Generated variants for {generated} images.")
+
+    except Exception as e:
+        print(f"\nError during migration: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
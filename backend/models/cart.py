@@ -0,0 +1,257 @@
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from models.product import ProductModel
+from services.image_store import image_store
+from config import Config
+import secrets
+
+# Only what a cart line needs; images are trimmed to the first reference
+CART_PRODUCT_PROJECTION = {
+    'name': 1,
+    'price': 1,
+    'availability': 1,
+    'stock': 1,
+    'inventory': 1,
+    'images': {'$slice': 1}
+}
+
+class CartModel:
+    """Carts live in their own collection, one document per owner.
+
+    An owner is either ``{'userId': ObjectId}`` for signed-in users or
+    ``{'guestToken': str}`` for anonymous shoppers. Guest carts carry an
+    ``expiresAt`` that is pushed forward on every write and a TTL index
+    removes abandoned ones. A line is identified by productId plus an
+    optional size.
+    """
+
+    @staticmethod
+    def owner_for(user_id=None, guest_token=None):
+        if user_id:
+            return {'userId': ObjectId(user_id)}
+        if guest_token:
+            return {'guestToken': guest_token}
+        return None
+
+    @staticmethod
+    def new_guest_token():
+        return secrets.token_urlsafe(24)
+
+    @staticmethod
+    def _touch(owner, now):
+        fields = {'updatedAt': now}
+        if 'guestToken' in owner:
+            fields['expiresAt'] = now + timedelta(days=Config.GUEST_CART_TTL_DAYS)
+        return fields
+
+    @staticmethod
+    def get_items(db, owner):
+        cart = db.carts.find_one(owner, {'items': 1})
+        return cart.get('items', []) if cart else []
+
+    @staticmethod
+    def set_quantity(db, owner, product_id, quantity, price, size=None):
+        """Set one line's quantity atomically, adding the line (and cart) if needed"""
+        now = datetime.utcnow()
+        touched = CartModel._touch(owner, now)
+        projection = {'items': 1}
+        line_match = {'productId': product_id, 'size': size}
+        
+        line = {
+            'productId': product_id,
+            'quantity': quantity,
+            'price': price,  # Price at add time, used to flag changes
+            'addedAt': now
+        }
+        if size:
+            line['size'] = size
+        
+        # A concurrent add between the two updates is retried
+        for _ in range(3):
+            cart = db.carts.find_one_and_update(
+                {**owner, 'items': {'$elemMatch': line_match}},
+                {'$set': {'items.$.quantity': quantity, **touched}},
+                projection=projection,
+                return_document=ReturnDocument.AFTER
+            )
+            if cart is not None:
+                return cart.get('items', [])
+            
+            try:
+                cart = db.carts.find_one_and_update(
+                    {**owner, 'items': {'$not': {'$elemMatch': line_match}}},
+                    {
+                        '$push': {'items': line},
+                        '$set': touched,
+                        '$setOnInsert': {'createdAt': now}
+                    },
+                    projection=projection,
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+                return cart.get('items', [])
+            except DuplicateKeyError:
+                # The cart exists and already has the line: positional update again
+                continue
+        
+        raise RuntimeError('Cart update kept conflicting, please retry')
+
+    @staticmethod
+    def remove_item(db, owner, product_id, size=None):
+        """Remove one size of a product, or every line for it when no size is given"""
+        now = datetime.utcnow()
+        line_match = {'productId': product_id}
+        if size:
+            line_match['size'] = size
+        cart = db.carts.find_one_and_update(
+            owner,
+            {
+                '$pull': {'items': line_match},
+                '$set': CartModel._touch(owner, now)
+            },
+            projection={'items': 1},
+            return_document=ReturnDocument.AFTER
+        )
+        return cart.get('items', []) if cart else []
+
+    @staticmethod
+    def clear(db, owner):
+        db.carts.update_one(owner, {'$set': {'items': [], 'updatedAt': datetime.utcnow()}})
+
+    @staticmethod
+    def apply_changes(db, owner, changes, prices):
+        """Apply many line changes in one atomic pipeline update.
+
+        ``changes`` maps ``(productId, size)`` to ``('set', quantity)`` or
+        ``('inc', delta)``; a resulting quantity of 0 or less removes the line.
+        ``prices`` maps productId to the current price, captured on newly
+        added lines. Client values are wrapped in ``$literal`` so a string
+        starting with ``$`` is never read as a field path.
+        """
+        now = datetime.utcnow()
+        existing = {'$ifNull': ['$items', []]}
+        existing_keys = {'$map': {
+            'input': existing,
+            'as': 'line',
+            'in': ['$$line.productId', {'$ifNull': ['$$line.size', None]}]
+        }}
+        
+        branches = []
+        new_lines = []
+        for (product_id, size), (operation, amount) in changes.items():
+            key = {'$literal': [product_id, size]}
+            if operation == 'inc':
+                quantity = {'$add': ['$$line.quantity', {'$literal': amount}]}
+            else:
+                quantity = {'$literal': amount}
+            branches.append({
+                'case': {'$and': [
+                    {'$eq': ['$$line.productId', {'$literal': product_id}]},
+                    {'$eq': [{'$ifNull': ['$$line.size', None]}, {'$literal': size}]}
+                ]},
+                'then': {'$mergeObjects': ['$$line', {'quantity': quantity}]}
+            })
+            
+            if amount > 0:
+                line = {
+                    'productId': product_id,
+                    'quantity': amount,
+                    'price': prices.get(product_id),
+                    'addedAt': now
+                }
+                if size:
+                    line['size'] = size
+                new_lines.append({'$cond': [
+                    {'$in': [key, existing_keys]},
+                    [],
+                    [{'$literal': line}]
+                ]})
+        
+        updated_lines = {'$map': {
+            'input': existing,
+            'as': 'line',
+            'in': {'$switch': {'branches': branches, 'default': '$$line'}} if branches else '$$line'
+        }}
+        kept_lines = {'$filter': {
+            'input': updated_lines,
+            'as': 'line',
+            'cond': {'$gt': ['$$line.quantity', 0]}
+        }}
+        
+        cart = db.carts.find_one_and_update(
+            owner,
+            [{'$set': {
+                'items': {'$concatArrays': [kept_lines] + new_lines},
+                'createdAt': {'$ifNull': ['$createdAt', now]},
+                **CartModel._touch(owner, now)
+            }}],
+            projection={'items': 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return cart.get('items', [])
+
+    @staticmethod
+    def merge_guest_cart(db, guest_token, user_id):
+        """Fold a guest cart into the user's cart on login; returns lines merged"""
+        guest_cart = db.carts.find_one_and_delete({'guestToken': guest_token})
+        if not guest_cart or not guest_cart.get('items'):
+            return 0
+        
+        changes = {}
+        prices = {}
+        for line in guest_cart['items']:
+            key = (line['productId'], line.get('size'))
+            _, quantity = changes.get(key, ('inc', 0))
+            changes[key] = ('inc', quantity + int(line['quantity']))
+            prices[line['productId']] = line.get('price')
+        
+        CartModel.apply_changes(db, CartModel.owner_for(user_id=user_id), changes, prices)
+        return len(changes)
+
+    @staticmethod
+    def hydrate_items(db, cart_items):
+        """Attach product summaries and status flags to cart lines in one query.
+
+        Each line gets ``product`` (name, price, thumbnail image) plus
+        ``unavailable``, ``outOfStock`` and ``priceChanged`` flags computed
+        against the price captured when the item was added.
+        """
+        products = ProductModel.get_products_by_ids(
+            db,
+            [item['productId'] for item in cart_items],
+            CART_PRODUCT_PROJECTION
+        )
+
+        for item in cart_items:
+            product = products.get(str(item['productId']))
+            if not product:
+                item['product'] = None
+                item['unavailable'] = True
+                item['outOfStock'] = True
+                item['priceChanged'] = False
+                continue
+
+            images = product.get('images') or []
+            item['product'] = {
+                'name': product['name'],
+                'price': product['price'],
+                'availability': product.get('availability', True),
+                'image': image_store.pick_variant(images[0], 'thumb') if images else None
+            }
+            item['unavailable'] = not product.get('availability', True)
+            inventory = product.get('inventory')
+            if inventory and item.get('size'):
+                available = inventory.get(item['size'], 0)
+            else:
+                available = product.get('stock', 0)
+            item['outOfStock'] = available < int(item.get('quantity', 1))
+
+            added_price = item.get('price')
+            item['priceChanged'] = added_price is not None and float(added_price) != float(product['price'])
+            if item['priceChanged']:
+                item['previousPrice'] = added_price
+
+        return cart_items
@@ -1,5 +1,6 @@
 from datetime import datetime
 from bson import ObjectId
+from utils.catalog_cache import catalog_cache
 
 class CategoryModel:
     @staticmethod
@@ -15,13 +16,20 @@ class CategoryModel:
             'updatedAt': datetime.utcnow()
         }
         result = categories.insert_one(category)
+        catalog_cache.invalidate_categories()
         return str(result.inserted_id)
 
     @staticmethod
     def get_all_categories(db):
+        cached = catalog_cache.categories.get('active')
+        if cached is not None:
+            return cached
+        
+        version = catalog_cache.version
         categories = list(db.categories.find({'isActive': True}))
         for cat in categories:
             cat['_id'] = str(cat['_id'])
+        catalog_cache.set_if_current(catalog_cache.categories, 'active', categories, version)
         return categories
 
     @staticmethod
@@ -32,6 +40,7 @@ class CategoryModel:
                 '$set': {**update_data, 'updatedAt': datetime.utcnow()}
             }
         )
+        catalog_cache.invalidate_categories()
         return CategoryModel.get_category_by_id(db, category_id)
 
     @staticmethod
@@ -0,0 +1,223 @@
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument, ASCENDING
+from pymongo.errors import DuplicateKeyError
+from config import Config
+import random
+
+class EmailOutboxModel:
+    """Outgoing emails queued in ``email_outbox`` and delivered by workers.
+
+    Every message carries a ``dedupeKey`` with a unique index, so queueing
+    the same notification twice (a retried request, a replayed webhook) is
+    a no-op. Workers claim one message at a time with a lease; a worker that
+    dies mid-send leaves the lease to expire and another worker picks the
+    message up. Failures are retried with exponential backoff and moved to
+    ``dead`` after ``EMAIL_MAX_ATTEMPTS`` or on a permanent error.
+
+    ``batchable`` messages sharing a template are claimed together and sent
+    as one Mailgun batch request (see ``claim_batch``). Mailgun's delivery
+    events are matched back to each message by its id and recorded in
+    ``deliveryStatus`` (see ``record_delivery_event``).
+
+    Statuses: pending -> sending -> sent | pending (retry) | dead
+    """
+
+    @staticmethod
+    def enqueue(db, dedupe_key, to_email, subject, template, variables, batchable=False, delay_seconds=0):
+        """Queue one message; returns its id, or None when the key was already queued.
+
+        ``variables`` is the JSON string sent as ``X-Mailgun-Variables``.
+        ``delay_seconds`` holds the message back so a batch can gather.
+        """
+        now = datetime.utcnow()
+        message = {
+            'dedupeKey': dedupe_key,
+            'to': to_email,
+            'subject': subject,
+            'template': template,
+            'variables': variables,
+            'batchable': batchable,
+            'status': 'pending',
+            'attempts': 0,
+            'nextAttemptAt': now + timedelta(seconds=delay_seconds),
+            'createdAt': now,
+            'updatedAt': now
+        }
+        try:
+            return db.email_outbox.insert_one(message).inserted_id
+        except DuplicateKeyError:
+            return None
+
+    @staticmethod
+    def claim(db, worker_name):
+        """Lease the next due message to ``worker_name``, or return None"""
+        now = datetime.utcnow()
+        return db.email_outbox.find_one_and_update(
+            {'$or': [
+                {'status': 'pending', 'nextAttemptAt': {'$lte': now}},
+                # A worker died while sending; its lease has run out
+                {'status': 'sending', 'leaseUntil': {'$lte': now}}
+            ]},
+            {
+                '$set': {
+                    'status': 'sending',
+                    'worker': worker_name,
+                    'leaseUntil': now + timedelta(seconds=Config.EMAIL_SEND_LEASE_SECONDS),
+                    'updatedAt': now
+                },
+                '$inc': {'attempts': 1}
+            },
+            sort=[('nextAttemptAt', ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    @staticmethod
+    def claim_batch(db, worker_name, template, limit, exclude_to=()):
+        """Lease up to ``limit`` more due batchable messages for ``template``.
+
+        Recipients are unique within a batch (recipient variables are keyed
+        by address), so a second message to the same address waits for the
+        next batch.
+        """
+        now = datetime.utcnow()
+        seen = set(exclude_to)
+        ids = []
+        candidates = db.email_outbox.find(
+            {'status': 'pending', 'template': template, 'batchable': True, 'nextAttemptAt': {'$lte': now}},
+            {'to': 1}
+        ).sort('nextAttemptAt', ASCENDING).limit(limit * 2)
+        for candidate in candidates:
+            if candidate['to'] in seen:
+                continue
+            seen.add(candidate['to'])
+            ids.append(candidate['_id'])
+            if len(ids) >= limit:
+                break
+        if not ids:
+            return []
+
+        batch_id = ObjectId()
+        db.email_outbox.update_many(
+            {'_id': {'$in': ids}, 'status': 'pending'},
+            {
+                '$set': {
+                    'status': 'sending',
+                    'worker': worker_name,
+                    'batchId': batch_id,
+                    'leaseUntil': now + timedelta(seconds=Config.EMAIL_SEND_LEASE_SECONDS),
+                    'updatedAt': now
+                },
+                '$inc': {'attempts': 1}
+            }
+        )
+        # Another worker may have claimed some of them in between
+        return list(db.email_outbox.find({'batchId': batch_id, 'status': 'sending'}))
+
+    @staticmethod
+    def unbatch(db, messages):
+        """Send these individually instead; the failed batch attempt is not counted"""
+        now = datetime.utcnow()
+        db.email_outbox.update_many(
+            {'_id': {'$in': [message['_id'] for message in messages]}, 'status': 'sending'},
+            {
+                '$set': {'status': 'pending', 'batchable': False, 'nextAttemptAt': now, 'updatedAt': now},
+                '$inc': {'attempts': -1},
+                '$unset': {'leaseUntil': '', 'worker': '', 'batchId': ''}
+            }
+        )
+
+    @staticmethod
+    def mark_sent(db, message, provider_id=None):
+        """Accepted by Mailgun; for a batch ``provider_id`` is shared by every message in it"""
+        now = datetime.utcnow()
+        db.email_outbox.update_one(
+            {'_id': message['_id'], 'status': 'sending'},
+            {
+                '$set': {'status': 'sent', 'sentAt': now, 'providerId': provider_id, 'updatedAt': now},
+                '$unset': {'leaseUntil': '', 'worker': ''}
+            }
+        )
+
+    @staticmethod
+    def record_delivery_event(db, message_id, event, occurred_at, detail=None):
+        """Record a Mailgun delivered/failed event for one message.
+
+        Events can arrive out of order, so an older event never overwrites a
+        newer one. Returns False when the message is unknown or the event is stale.
+        """
+        fields = {'deliveryStatus': event, 'deliveryEventAt': occurred_at, 'updatedAt': datetime.utcnow()}
+        if detail:
+            fields['deliveryError'] = str(detail)[:500]
+        result = db.email_outbox.update_one(
+            {
+                '_id': message_id,
+                '$or': [{'deliveryEventAt': {'$exists': False}}, {'deliveryEventAt': {'$lt': occurred_at}}]
+            },
+            {'$set': fields}
+        )
+        return result.modified_count == 1
+
+    @staticmethod
+    def retry_delay(attempts):
+        """Exponential backoff with jitter: base * 2^(attempts-1), capped"""
+        delay = min(Config.EMAIL_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)), Config.EMAIL_RETRY_MAX_SECONDS)
+        return delay * random.uniform(0.8, 1.2)
+
+    @staticmethod
+    def mark_failed(db, message, error, permanent=False):
+        """Schedule a retry, or dead-letter the message; returns the new status"""
+        now = datetime.utcnow()
+        attempts = message.get('attempts', 1)
+        dead = permanent or attempts >= Config.EMAIL_MAX_ATTEMPTS
+        fields = {'status': 'dead' if dead else 'pending', 'lastError': str(error)[:500], 'updatedAt': now}
+        if dead:
+            fields['deadAt'] = now
+        else:
+            fields['nextAttemptAt'] = now + timedelta(seconds=EmailOutboxModel.retry_delay(attempts))
+        db.email_outbox.update_one(
+            {'_id': message['_id'], 'status': 'sending'},
+            {'$set': fields, '$unset': {'leaseUntil': '', 'worker': ''}}
+        )
+        return fields['status']
+
+    @staticmethod
+    def requeue_dead(db, message_id=None):
+        """Give dead-lettered messages (or one of them) a fresh set of attempts"""
+        query = {'status': 'dead'}
+        if message_id is not None:
+            query['_id'] = message_id
+        now = datetime.utcnow()
+        result = db.email_outbox.update_many(
+            query,
+            {
+                '$set': {'status': 'pending', 'attempts': 0, 'nextAttemptAt': now, 'updatedAt': now},
+                '$unset': {'deadAt': ''}
+            }
+        )
+        return result.modified_count
+
+    @staticmethod
+    def get_stats(db):
+        # Each count is a scan of the (status, nextAttemptAt) index
+        counts = {
+            status: db.email_outbox.count_documents({'status': status})
+            for status in ('pending', 'sending', 'sent', 'dead')
+        }
+
+        oldest = db.email_outbox.find_one(
+            {'status': 'pending'},
+            {'createdAt': 1},
+            sort=[('nextAttemptAt', ASCENDING)]
+        )
+        dead = list(
+            db.email_outbox.find(
+                {'status': 'dead'},
+                {'dedupeKey': 1, 'to': 1, 'subject': 1, 'attempts': 1, 'lastError': 1, 'deadAt': 1}
+            ).sort('deadAt', -1).limit(20)
+        )
+        return {
+            'counts': counts,
+            'oldestPendingAt': oldest['createdAt'] if oldest else None,
+            'recentDead': dead
+        }
@@ -0,0 +1,285 @@
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import UpdateOne, ReturnDocument
+from config import Config
+from utils.catalog_cache import catalog_cache
+import logging
+
+# Stripe rejects Checkout Sessions expiring less than 30 minutes after creation
+# (or more than 24 hours); one minute of headroom covers the request itself
+MIN_CHECKOUT_MINUTES = 31
+MAX_CHECKOUT_MINUTES = 24 * 60
+
+def checkout_minutes():
+    return min(max(Config.STOCK_RESERVATION_MINUTES, MIN_CHECKOUT_MINUTES), MAX_CHECKOUT_MINUTES)
+
+class InventoryModel:
+    """Per-size stock and order reservations.
+
+    Products sold in sizes keep ``inventory: {size: quantity}`` with ``stock``
+    as the total; other products only track ``stock``. Reserving an order is
+    one unordered bulk_write of conditional ``$inc`` updates (``>= quantity``
+    in the filter), so stock never goes negative and nothing is read first.
+    Every successful line also pushes a hold token onto ``product.holds``,
+    which lets a partially failed batch, a release and a commit each touch
+    exactly the lines that were reserved, and makes all three idempotent.
+    Every stock change bumps ``updatedAt`` and evicts the cached product, so
+    product ETags and payloads follow live stock. Listings are only
+    invalidated when a line sells out or comes back (``_stock_changed``):
+    flushing every cached list on each reservation would defeat the catalog
+    cache exactly when a sale drives traffic, so stock counts shown in
+    cached listings may lag by up to ``CATALOG_CACHE_TTL``.
+    """
+
+    @staticmethod
+    def _stock_changed(db, lines, sign):
+        """Evict the touched products; bump the catalog version if availability flipped.
+
+        ``sign`` is -1 after taking stock and 1 after giving it back. A counter
+        that is now 0 after taking, or was 0 before giving back, flipped.
+        """
+        ids = {str(line['productId']) for line in lines}
+        catalog_cache.evict_products(ids)
+        
+        moved = {}
+        for line in lines:
+            for field in ('stock', f"inventory.{line['size']}" if line.get('size') else None):
+                if field:
+                    key = (str(line['productId']), field)
+                    moved[key] = moved.get(key, 0) + int(line['quantity'])
+        
+        products = {
+            str(product['_id']): product
+            for product in db.products.find({'_id': {'$in': [ObjectId(pid) for pid in ids]}}, {'stock': 1, 'inventory': 1})
+        }
+        for (product_id, field), quantity in moved.items():
+            product = products.get(product_id, {})
+            if field == 'stock':
+                now = product.get('stock', 0)
+            else:
+                now = (product.get('inventory') or {}).get(field.split('.', 1)[1], 0)
+            before = now - sign * quantity
+            if (before > 0) != (now > 0):
+                catalog_cache.bump()
+                return
+
+    @staticmethod
+    def normalize_inventory(inventory):
+        """Validate an admin supplied ``{size: quantity}`` map"""
+        normalized = {}
+        for size, quantity in (inventory or {}).items():
+            size = str(size).strip()
+            if not size or '.' in size or size.startswith('$'):
+                raise ValueError(f'Invalid size: {size!r}')
+            normalized[size] = max(int(quantity), 0)
+        return normalized
+
+    @staticmethod
+    def check_size(product, size):
+        """Return an error message when ``size`` does not fit the product, else None"""
+        inventory = product.get('inventory')
+        if not inventory:
+            return None
+        if not size:
+            return 'Please choose a size'
+        if size not in inventory:
+            return f'Size {size} is not available'
+        return None
+
+    @staticmethod
+    def _stock_delta(line, sign):
+        quantity = sign * int(line['quantity'])
+        delta = {'stock': quantity}
+        if line.get('size'):
+            delta[f"inventory.{line['size']}"] = quantity
+        return delta
+
+    @staticmethod
+    def reserve(db, order_id, lines):
+        """Hold stock for every line or none of them.
+
+        ``lines`` are dicts with productId, quantity and optional size.
+        Returns ``(reservation_lines, shortages)``; on failure the first is
+        None and anything already held has been given back.
+        """
+        now = datetime.utcnow()
+        held = []
+        operations = []
+        for index, line in enumerate(lines):
+            quantity = int(line['quantity'])
+            hold = f'{order_id}:{index}'
+            stock_field = f"inventory.{line['size']}" if line.get('size') else 'stock'
+            operations.append(UpdateOne(
+                {'_id': ObjectId(line['productId']), stock_field: {'$gte': quantity}},
+                {
+                    '$inc': InventoryModel._stock_delta(line, -1),
+                    '$push': {'holds': hold},
+                    '$set': {'updatedAt': now}
+                }
+            ))
+            held.append({
+                'productId': str(line['productId']),
+                'size': line.get('size'),
+                'quantity': quantity,
+                'hold': hold
+            })
+        
+        if not operations:
+            return held, []
+        
+        result = db.products.bulk_write(operations, ordered=False)
+        if result.modified_count == len(operations):
+            InventoryModel._stock_changed(db, held, -1)
+            return held, []
+        
+        # Some lines lost the race: return what was taken, then report shortages
+        InventoryModel.release(db, held)
+        return None, InventoryModel._shortages(db, held)
+
+    @staticmethod
+    def _shortages(db, lines):
+        ids = list({ObjectId(line['productId']) for line in lines})
+        products = {
+            str(product['_id']): product
+            for product in db.products.find({'_id': {'$in': ids}}, {'stock': 1, 'inventory': 1})
+        }
+        shortages = []
+        for line in lines:
+            product = products.get(line['productId'], {})
+            if line.get('size'):
+                available = (product.get('inventory') or {}).get(line['size'], 0)
+            else:
+                available = product.get('stock', 0)
+            if available < line['quantity']:
+                shortages.append({
+                    'productId': line['productId'],
+                    'size': line.get('size'),
+                    'requested': line['quantity'],
+                    'available': max(available, 0)
+                })
+        return shortages
+
+    @staticmethod
+    def release(db, lines):
+        """Give held stock back; lines whose hold is already gone are skipped"""
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {'_id': ObjectId(line['productId']), 'holds': line['hold']},
+                {
+                    '$inc': InventoryModel._stock_delta(line, 1),
+                    '$pull': {'holds': line['hold']},
+                    '$set': {'updatedAt': now}
+                }
+            )
+            for line in lines
+        ]
+        if not operations:
+            return 0
+        released = db.products.bulk_write(operations, ordered=False).modified_count
+        if released:
+            InventoryModel._stock_changed(db, lines, 1)
+        return released
+
+    @staticmethod
+    def reservation_for(lines, now=None):
+        """Reservation sub-document stored on the order"""
+        now = now or datetime.utcnow()
+        checkout_expires = now + timedelta(minutes=checkout_minutes())
+        return {
+            'status': 'held',
+            'lines': lines,
+            'createdAt': now,
+            'checkoutExpiresAt': checkout_expires,
+            'expiresAt': checkout_expires + timedelta(minutes=Config.RESERVATION_GRACE_MINUTES)
+        }
+
+    @staticmethod
+    def extend_hold(db, order_id, checkout_expires):
+        """Keep a held reservation at least until ``checkout_expires`` plus the grace period"""
+        db.orders.update_one(
+            {'_id': ObjectId(order_id), 'reservation.status': 'held'},
+            {'$max': {
+                'reservation.checkoutExpiresAt': checkout_expires,
+                'reservation.expiresAt': checkout_expires + timedelta(minutes=Config.RESERVATION_GRACE_MINUTES)
+            }}
+        )
+
+    @staticmethod
+    def _transition(db, order_id, status, extra=None):
+        """Move an order's reservation out of 'held'; only one caller ever wins"""
+        return db.orders.find_one_and_update(
+            {'_id': ObjectId(order_id), 'reservation.status': 'held'},
+            {'$set': {
+                'reservation.status': status,
+                'reservation.updatedAt': datetime.utcnow(),
+                **(extra or {})
+            }},
+            projection={'reservation': 1},
+            return_document=ReturnDocument.BEFORE
+        )
+
+    @staticmethod
+    def release_order(db, order_id, reason):
+        """Release an order's held stock (checkout expired, payment failed, timeout)"""
+        order = InventoryModel._transition(db, order_id, 'released', {'reservation.reason': reason})
+        if not order:
+            return False
+        InventoryModel.release(db, order['reservation']['lines'])
+        logging.info(f"Released stock reservation for order {order_id} ({reason})")
+        return True
+
+    @staticmethod
+    def commit_order(db, order_id):
+        """Payment succeeded: the held stock is now sold"""
+        order = InventoryModel._transition(db, order_id, 'committed')
+        if order:
+            InventoryModel._drop_holds(db, order['reservation']['lines'])
+            return True
+        
+        # Paid after the hold timed out: take the stock again if it is still there
+        order = db.orders.find_one(
+            {'_id': ObjectId(order_id), 'reservation.status': 'released'},
+            {'reservation': 1}
+        )
+        if not order:
+            return False
+        lines, shortages = InventoryModel.reserve(db, f'{order_id}-paid', order['reservation']['lines'])
+        status = 'committed' if lines is not None else 'oversold'
+        if lines is not None:
+            InventoryModel._drop_holds(db, lines)
+        else:
+            logging.error(f"Order {order_id} was paid after its reservation expired and is short: {shortages}")
+        db.orders.update_one(
+            {'_id': ObjectId(order_id), 'reservation.status': 'released'},
+            {'$set': {'reservation.status': status, 'reservation.updatedAt': datetime.utcnow()}}
+        )
+        return lines is not None
+
+    @staticmethod
+    def _drop_holds(db, lines):
+        """Keep the stock taken by ``lines`` but forget their hold tokens"""
+        result = db.products.update_many(
+            {'_id': {'$in': list({ObjectId(line['productId']) for line in lines})}},
+            {
+                '$pull': {'holds': {'$in': [line['hold'] for line in lines]}},
+                '$set': {'updatedAt': datetime.utcnow()}
+            }
+        )
+        if result.modified_count:
+            # Only hold tokens changed; stock is the same as after the reservation
+            catalog_cache.evict_products({str(line['productId']) for line in lines})
+
+    @staticmethod
+    def release_expired(db, now=None, limit=100):
+        """Release holds whose checkout window has passed; returns how many"""
+        now = now or datetime.utcnow()
+        expired = db.orders.find(
+            {'reservation.status': 'held', 'reservation.expiresAt': {'$lt': now}},
+            {'_id': 1}
+        ).limit(limit)
+        released = 0
+        for order in expired:
+            if InventoryModel.release_order(db, order['_id'], 'timeout'):
+                released += 1
+        return released
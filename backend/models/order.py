@@ -1,5 +1,83 @@
 from datetime import datetime, timedelta
 from bson import ObjectId
+from pymongo import ReturnDocument
+from config import Config
+from utils.cache import TTLCache
+from utils.metrics import metrics
+from utils.cursor import encode_cursor, decode_cursor
+from models.sales_rollup import SalesRollupModel, PAID_STATUSES, day_start, order_pence
+from models.product_sales import ProductSalesModel, line_pence
+from utils.helpers import normalize_email
+import time
+
+# What the sales rollup needs to know about an order that changed
+ROLLUP_PROJECTION = {
+    'createdAt': 1,
+    'paidAt': 1,
+    'orderStatus': 1,
+    'paymentStatus': 1,
+    'grandTotal': 1,
+    'grandTotalPence': 1,
+    'items.productId': 1,
+    'items.price': 1,
+    'items.quantity': 1,
+    'items.lineTotalPence': 1
+}
+
+# Fields shown in the dashboard's recent orders table
+RECENT_ORDER_PROJECTION = {
+    'customerName': 1,
+    'customerEmail': 1,
+    'totalAmount': 1,
+    'grandTotal': 1,
+    'orderStatus': 1,
+    'paymentStatus': 1,
+    'createdAt': 1,
+    'itemCount': {'$size': {'$ifNull': ['$items', []]}}
+}
+
+# Columns of the admin order table; full documents are fetched per order
+ORDER_SUMMARY_PROJECTION = {
+    'userId': 1,
+    'customerName': 1,
+    'customerEmail': 1,
+    'shippingAddress.name': 1,
+    'totalAmount': 1,
+    'grandTotal': 1,
+    'orderStatus': 1,
+    'paymentStatus': 1,
+    'paymentMethod': 1,
+    'shippingInfo': 1,
+    'createdAt': 1,
+    'itemCount': {'$size': {'$ifNull': ['$items', []]}}
+}
+
+# Accounting export columns: one row per order, or per line item with ``lines``
+ORDER_EXPORT_FIELDS = [
+    'orderId', 'createdAt', 'customerName', 'customerEmail', 'orderStatus', 'paymentStatus',
+    'paymentMethod', 'itemCount', 'subtotal', 'shipping', 'grandTotal', 'stripePaymentIntentId'
+]
+ORDER_LINE_EXPORT_FIELDS = [
+    'orderId', 'createdAt', 'customerEmail', 'orderStatus', 'paymentStatus',
+    'productId', 'name', 'size', 'quantity', 'unitPrice', 'lineTotal'
+]
+
+def format_pence(pence):
+    """Exact decimal string for a pence amount, e.g. 1999 -> '19.99'"""
+    sign = '-' if pence < 0 else ''
+    pounds, pence = divmod(abs(int(pence)), 100)
+    return f'{sign}{pounds}.{pence:02d}'
+
+def _amount_pence(order, pence_field, amount_field):
+    if order.get(pence_field) is not None:
+        return int(order[pence_field])
+    return int(round(float(order.get(amount_field) or 0) * 100))
+
+# Dashboard figures per ``days`` value; a little staleness is fine here
+_dashboard_cache = TTLCache(maxsize=16, ttl=Config.DASHBOARD_CACHE_TTL)
+
+# Admin order list totals per filter set
+_order_count_cache = TTLCache(maxsize=128, ttl=Config.ORDER_COUNT_CACHE_TTL)
 
 class OrderModel:
     @staticmethod
@@ -19,11 +97,21 @@ class OrderModel:
             'stripePaymentId': order_data.get('stripePaymentId', ''),
             'createdAt': datetime.utcnow(),
             'updatedAt': datetime.utcnow(),
-            'customerEmail': order_data.get('customerEmail'),  # Add customerEmail
+            'customerEmail': normalize_email(order_data.get('customerEmail')),  # Add customerEmail
             'customerName': order_data.get('customerName', ''),  # Add customerName
             'shippingFeeConfig': float(order_data.get('shippingCost', 3.5))  # Store shipping fee
         }
+        # Exact integer amounts from server-side pricing
+        for key in ('subtotalPence', 'shippingPence', 'grandTotalPence'):
+            if key in order_data:
+                order[key] = int(order_data[key])
+        # Pre-allocated id and stock hold from InventoryModel.reserve
+        if '_id' in order_data:
+            order['_id'] = order_data['_id']
+        if 'reservation' in order_data:
+            order['reservation'] = order_data['reservation']
         result = orders.insert_one(order)
+        SalesRollupModel.record_order_created(db, order)
         return str(result.inserted_id)
 
     @staticmethod
@@ -87,144 +175,234 @@ class OrderModel:
             raise e
 
     @staticmethod
-    def get_dashboard_stats(db, days=7):
-        try:
-            # Calculate date range
-            cutoff_date = datetime.utcnow() - timedelta(days=days)
-            
-            # 1. Get total orders count
-            total_orders = db.orders.count_documents({})
-            
-            # 2. Get recent orders count
-            recent_orders = db.orders.count_documents({
-                'createdAt': {'$gte': cutoff_date}
-            })
-            
-            # 3. Get total revenue
-            revenue_cursor = db.orders.aggregate([
-                {'$match': {'createdAt': {'$gte': cutoff_date}}},
-                {'$group': {'_id': None, 'total': {'$sum': '$grandTotal'}}}
-            ])
-            
-            try:
-                revenue_data = list(revenue_cursor)
-                total_revenue = revenue_data[0]['total'] if revenue_data else 0
-            except:
-                total_revenue = 0
-            
-            # 4. Get pending orders count
-            pending_orders = db.orders.count_documents({
-                'orderStatus': 'pending'
-            })
-            
-            # 5. Get completed orders count
-            completed_orders = db.orders.count_documents({
-                'orderStatus': 'completed'
-            })
-            
-            # 6. Get recent orders with details (limit to 10)
-            recent_orders_list = db.orders.find({
-                'createdAt': {'$gte': cutoff_date}
-            }).sort('createdAt', -1).limit(10)
-            
-            # Convert ObjectId to string and format dates
-            formatted_recent_orders = []
-            for order in recent_orders_list:
-                # Create a new dict with serializable values
-                formatted_order = {}
-                for key, value in order.items():
-                    if isinstance(value, ObjectId):
-                        formatted_order[key] = str(value)
-                    elif isinstance(value, datetime):
-                        formatted_order[key] = value.isoformat()
-                    elif key == '_id':
-                        formatted_order[key] = str(value)
-                    elif key == 'userId' and isinstance(value, ObjectId):
-                        formatted_order[key] = str(value)
-                    elif isinstance(value, dict) and '_id' in value and isinstance(value['_id'], ObjectId):
-                        # Handle nested ObjectIds (like in shippingAddress if it has _id)
-                        formatted_order[key] = {
-                            k: str(v) if isinstance(v, ObjectId) else v 
-                            for k, v in value.items()
-                        }
-                    else:
-                        formatted_order[key] = value
-                formatted_recent_orders.append(formatted_order)
+    def build_admin_filters(status=None, payment_status=None, created_from=None, created_before=None, email=None):
+        """Query for the admin order list; every filter has a matching
+        ``(field, createdAt, _id)`` index so pages stay index-only scans.
+
+        ``email`` is an exact match (as typed or lowercased, the form new
+        orders are stored in): a range such as a prefix regex on the leading
+        index key would leave the createdAt sort to run in memory.
+        """
+        query = {}
+        if status:
+            query['orderStatus'] = status
+        if payment_status:
+            query['paymentStatus'] = payment_status
+        if email:
+            query['customerEmail'] = {'$in': sorted({email, email.lower()})}
+        created = {}
+        if created_from:
+            created['$gte'] = created_from
+        if created_before:
+            created['$lt'] = created_before
+        if created:
+            query['createdAt'] = created
+        return query
+
+    @staticmethod
+    def list_orders(db, filters, cursor=None, limit=20, full=False):
+        """Keyset pagination over (createdAt, _id) newest first.
+
+        Returns summary rows (see ORDER_SUMMARY_PROJECTION) unless ``full``.
+        """
+        query = dict(filters)
+        if cursor:
+            position = decode_cursor(cursor)
+            query['$or'] = [
+                {'createdAt': {'$lt': position['v']}},
+                {'createdAt': position['v'], '_id': {'$lt': ObjectId(position['id'])}}
+            ]
+        
+        # Fetch one extra document to know whether another page exists
+        pipeline = [
+            {'$match': query},
+            {'$sort': {'createdAt': -1, '_id': -1}},
+            {'$limit': limit + 1}
+        ]
+        if not full:
+            pipeline.append({'$project': ORDER_SUMMARY_PROJECTION})
+        orders = list(db.orders.aggregate(pipeline))
+        has_more = len(orders) > limit
+        orders = orders[:limit]
+        
+        next_cursor = None
+        if has_more:
+            last = orders[-1]
+            next_cursor = encode_cursor('newest', last.get('createdAt'), str(last['_id']))
+        
+        return {'orders': orders, 'nextCursor': next_cursor}
+
+    @staticmethod
+    def count_orders(db, filters):
+        """Total for a filter set: collection metadata when unfiltered, else cached"""
+        if not filters:
+            return db.orders.estimated_document_count()
+        
+        cache_key = tuple(sorted((field, repr(value)) for field, value in filters.items()))
+        total = _order_count_cache.get(cache_key)
+        if total is None:
+            total = db.orders.count_documents(filters)
+            _order_count_cache.set(cache_key, total)
+        return total
+
+    @staticmethod
+    def iter_export(db, filters, lines=False, batch_size=1000):
+        """Yield flat export rows oldest first from a batched server-side cursor.
+
+        Only one batch is held in memory at a time, so the cost of a long
+        range is time, not memory.
+        """
+        projection = {
+            'createdAt': 1, 'customerName': 1, 'customerEmail': 1,
+            'orderStatus': 1, 'paymentStatus': 1, 'paymentMethod': 1,
+            'totalAmount': 1, 'shippingCost': 1, 'grandTotal': 1,
+            'subtotalPence': 1, 'shippingPence': 1, 'grandTotalPence': 1,
+            'stripePaymentIntentId': 1,
+            'items.productId': 1, 'items.name': 1, 'items.size': 1, 'items.quantity': 1,
+            'items.price': 1, 'items.unitPricePence': 1, 'items.lineTotalPence': 1
+        }
+        cursor = (
+            db.orders.find(filters, projection)
+            .sort([('createdAt', 1), ('_id', 1)])
+            .batch_size(batch_size)
+        )
+        for order in cursor:
+            created_at = order.get('createdAt')
+            base = {
+                'orderId': str(order['_id']),
+                'createdAt': created_at.isoformat() if isinstance(created_at, datetime) else created_at,
+                'customerEmail': order.get('customerEmail') or '',
+                'orderStatus': order.get('orderStatus', ''),
+                'paymentStatus': order.get('paymentStatus', '')
+            }
+            items = order.get('items') or []
             
-            # 7. Get top selling products
-            top_products_cursor = db.orders.aggregate([
-                {'$unwind': '$items'},
-                {'$group': {
-                    '_id': '$items.productId',
-                    'name': {'$first': '$items.name'},
-                    'totalSold': {'$sum': '$items.quantity'},
-                    'totalRevenue': {'$sum': {'$multiply': ['$items.price', '$items.quantity']}}
-                }},
-                {'$sort': {'totalSold': -1}},
-                {'$limit': 5}
-            ])
+            if not lines:
+                yield {
+                    **base,
+                    'customerName': order.get('customerName') or '',
+                    'paymentMethod': order.get('paymentMethod', ''),
+                    'itemCount': len(items),
+                    'subtotal': format_pence(_amount_pence(order, 'subtotalPence', 'totalAmount')),
+                    'shipping': format_pence(_amount_pence(order, 'shippingPence', 'shippingCost')),
+                    'grandTotal': format_pence(order_pence(order)),
+                    'stripePaymentIntentId': order.get('stripePaymentIntentId') or ''
+                }
+                continue
             
-            top_products = []
-            for product in top_products_cursor:
-                product['_id'] = str(product['_id']) if isinstance(product['_id'], ObjectId) else product['_id']
-                top_products.append(product)
+            for item in items:
+                yield {
+                    **base,
+                    'productId': str(item.get('productId', '')),
+                    'name': item.get('name', ''),
+                    'size': item.get('size') or '',
+                    'quantity': int(item.get('quantity', 0)),
+                    'unitPrice': format_pence(_amount_pence(item, 'unitPricePence', 'price')),
+                    'lineTotal': format_pence(line_pence(item))
+                }
+
+    @staticmethod
+    def get_dashboard_stats(db, days=7):
+        """Dashboard figures for the last ``days`` calendar days (UTC, today included).
+
+        Daily revenue, counts and the status mix come from the ``sales_daily``
+        rollup, one small document per day, and top sellers from the
+        per-product daily counters. Recent orders and the pending count come
+        from one $facet aggregation over orders inside the window plus the
+        (small) set of pending orders. Results are cached per ``days`` for
+        DASHBOARD_CACHE_TTL seconds and every computation is timed.
+        """
+        cached = _dashboard_cache.get(days)
+        if cached is not None:
+            metrics.increment('dashboard.stats', cacheHits=1)
+            return dict(cached, meta=dict(cached['meta'], cached=True))
+        
+        try:
+            started = time.perf_counter()
+            now = datetime.utcnow()
+            cutoff_date = day_start(now) - timedelta(days=days - 1)
+            in_window = {'$match': {'createdAt': {'$gte': cutoff_date}}}
             
-            # 8. Get order status distribution
-            status_distribution = db.orders.aggregate([
-                {'$group': {
-                    '_id': '$orderStatus',
-                    'count': {'$sum': 1}
+            pipeline = [
+                {'$match': {'$or': [
+                    {'createdAt': {'$gte': cutoff_date}},
+                    {'orderStatus': 'pending'}
+                ]}},
+                {'$facet': {
+                    'pending': [
+                        {'$match': {'orderStatus': 'pending'}},
+                        {'$count': 'count'}
+                    ],
+                    'recentOrders': [
+                        in_window,
+                        {'$sort': {'createdAt': -1}},
+                        {'$limit': 10},
+                        {'$project': RECENT_ORDER_PROJECTION}
+                    ]
                 }}
-            ])
+            ]
+            facets = next(db.orders.aggregate(pipeline), {})
+            pending = facets.get('pending') or [{}]
             
+            # A few dozen rollup documents, whatever the order volume
+            sales_days = SalesRollupModel.get_days(db, cutoff_date)
+            recent_orders = sum(day.get('orders', 0) for day in sales_days)
+            total_revenue = sum(day.get('revenuePence', 0) for day in sales_days) / 100
             status_data = {}
-            for status in status_distribution:
-                status_data[status['_id']] = status['count']
+            for day in sales_days:
+                for status, count in (day.get('statuses') or {}).items():
+                    status_data[status] = status_data.get(status, 0) + count
+            status_data = {status: count for status, count in status_data.items() if count}
             
-            # 9. Get daily revenue for chart
-            daily_revenue_cursor = db.orders.aggregate([
-                {'$match': {'createdAt': {'$gte': cutoff_date}}},
-                {'$group': {
-                    '_id': {
-                        '$dateToString': {
-                            'format': '%Y-%m-%d',
-                            'date': '$createdAt'
-                        }
-                    },
-                    'revenue': {'$sum': '$grandTotal'},
-                    'orders': {'$sum': 1}
-                }},
-                {'$sort': {'_id': 1}}
-            ])
-            
-            daily_revenue = []
-            for day in daily_revenue_cursor:
-                daily_revenue.append({
-                    'date': day['_id'],
-                    'revenue': day['revenue'],
-                    'orders': day['orders']
+            formatted_recent_orders = []
+            for order in facets.get('recentOrders', []):
+                formatted_recent_orders.append({
+                    key: str(value) if isinstance(value, ObjectId)
+                    else value.isoformat() if isinstance(value, datetime)
+                    else value
+                    for key, value in order.items()
                 })
             
-            # Return all stats
-            return {
+            # Per-product daily counters instead of unwinding order lines
+            top_products = [{
+                '_id': product['productId'],
+                'name': product['name'],
+                'totalSold': product['unitsSold'],
+                'totalRevenue': product['revenue']
+            } for product in ProductSalesModel.top_products(db, days, 5)]
+            
+            elapsed = time.perf_counter() - started
+            stats = {
                 'summary': {
-                    'totalOrders': total_orders,
+                    # Collection metadata, not a scan
+                    'totalOrders': db.orders.estimated_document_count(),
                     'recentOrders': recent_orders,
                     'totalRevenue': total_revenue,
-                    'pendingOrders': pending_orders,
-                    'completedOrders': completed_orders,
+                    'pendingOrders': pending[0].get('count', 0),
+                    'completedOrders': status_data.get('completed', 0),
                     'averageOrderValue': total_revenue / recent_orders if recent_orders > 0 else 0
                 },
                 'recentOrders': formatted_recent_orders,
                 'topProducts': top_products,
                 'statusDistribution': status_data,
-                'dailyRevenue': daily_revenue,
+                'dailyRevenue': [
+                    {'date': day['_id'], 'revenue': day.get('revenuePence', 0) / 100, 'orders': day.get('orders', 0)}
+                    for day in sales_days
+                ],
                 'timeRange': {
                     'days': days,
                     'from': cutoff_date.isoformat(),
-                    'to': datetime.utcnow().isoformat()
+                    'to': now.isoformat()
+                },
+                'meta': {
+                    'cached': False,
+                    'computedAt': now.isoformat(),
+                    'queryMs': round(elapsed * 1000, 3)
                 }
             }
+            metrics.record('dashboard.stats', elapsed, cacheMisses=1)
+            _dashboard_cache.set(days, stats)
+            return stats
             
         except Exception as e:
             # Note: current_app is not available here, use regular logging
@@ -233,16 +411,32 @@ class OrderModel:
             raise e
 
     @staticmethod
-    def update_order_payment_status(db, order_id, payment_status):
-        db.orders.update_one(
-            {'_id': ObjectId(order_id)},
-            {
-                '$set': {
-                    'paymentStatus': payment_status,
-                    'updatedAt': datetime.utcnow()
-                }
+    def update_order_payment_status(db, order_id, payment_status, extra_fields=None):
+        """Set paymentStatus; the first move into a paid state is counted exactly once.
+
+        ``paidAt`` keeps the first time the order was paid; product sales are
+        bucketed by it here and in ``ProductSalesModel.rebuild``.
+        """
+        now = datetime.utcnow()
+        update = {
+            '$set': {
+                'paymentStatus': payment_status,
+                'updatedAt': now,
+                **(extra_fields or {})
             }
+        }
+        if payment_status in PAID_STATUSES:
+            update['$min'] = {'paidAt': now}
+        before = db.orders.find_one_and_update(
+            {'_id': ObjectId(order_id)},
+            update,
+            projection=ROLLUP_PROJECTION,
+            return_document=ReturnDocument.BEFORE
         )
+        if before and payment_status in PAID_STATUSES and before.get('paymentStatus') not in PAID_STATUSES:
+            SalesRollupModel.record_payment(db, before)
+            ProductSalesModel.record_sale(db, before, before.get('paidAt') or now)
+        return before
 
     @staticmethod
     def update_order_status(db, order_id, order_status, shipping_info=None):
@@ -257,7 +451,12 @@ class OrderModel:
             shipping_info['shippedAt'] = datetime.utcnow()
             update_data['shippingInfo'] = shipping_info
         
-        db.orders.update_one(
+        before = db.orders.find_one_and_update(
             {'_id': ObjectId(order_id)},
-            {'$set': update_data}
-        )
\ No newline at end of file
+            {'$set': update_data},
+            projection=ROLLUP_PROJECTION,
+            return_document=ReturnDocument.BEFORE
+        )
+        if before:
+            SalesRollupModel.record_status_change(db, before, before.get('orderStatus'), order_status)
+        return before
\ No newline at end of file
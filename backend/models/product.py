@@ -1,60 +1,402 @@
 from datetime import datetime
 from bson import ObjectId
-import base64
+from pymongo import ASCENDING, DESCENDING, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from services.image_store import image_store
+from utils.cache import TTLCache
+from utils.catalog_cache import catalog_cache
+from services.suggest_index import suggest_index
+from models.inventory import InventoryModel
+from utils.cursor import encode_cursor, decode_cursor
+from config import Config
+
+# Sort options available to cursor pagination: name -> (field, direction)
+SORT_OPTIONS = {
+    'newest': ('createdAt', DESCENDING),
+    'price_asc': ('price', ASCENDING),
+    'price_desc': ('price', DESCENDING),
+    'popular': ('unitsSold', DESCENDING)
+}
+
+# Price facet bucket boundaries (GBP); the last bucket is open-ended
+PRICE_BUCKETS = [0, 25, 50, 100, 200, 500]
+
+# Columns written by the catalog export and accepted by the import
+EXPORT_FIELDS = ['_id', 'sku', 'name', 'description', 'price', 'category', 'sizes', 'availability', 'stock', 'inventory']
+
+# Stock hold tokens (see models/inventory.py) are internal bookkeeping
+PUBLIC_PROJECTION = {'holds': 0}
+
+# Totals change rarely and are expensive on large catalogs
+_count_cache = TTLCache(maxsize=128, ttl=Config.PRODUCT_COUNT_CACHE_TTL)
+
+# Hot search queries are served from memory for a few seconds
+_search_cache = TTLCache(maxsize=256, ttl=Config.SEARCH_CACHE_TTL)
 
 class ProductModel:
     @staticmethod
     def create_product(db, product_data, images=None):
         products = db.products
+        product = ProductModel.build_product(product_data, images)
+        print("Creating product with data:", product)
+        result = products.insert_one(product)
+        catalog_cache.invalidate_product()
+        suggest_index.upsert_product(product)
+        return str(result.inserted_id)
+
+    @staticmethod
+    def build_product(product_data, images=None):
         product = {
             'name': product_data['name'],
             'description': product_data.get('description', ''),
             'price': float(product_data['price']),
             'category': product_data['category'],
-            'images': images or [],  # Store base64 encoded images
+            'images': images or [],  # Image store references (see services/image_store.py)
             'sizes': product_data.get('sizes', []),
             'availability': product_data.get('availability', True),
             'stock': int(product_data.get('stock', 0)),
+            'unitsSold': 0,  # Sales counters, see models/product_sales.py
+            'revenuePence': 0,
             
             'createdAt': datetime.utcnow(),
             'updatedAt': datetime.utcnow()
         }
-        print("Creating product with data:", product)
-        result = products.insert_one(product)
-        return str(result.inserted_id)
+        if product_data.get('sku'):
+            product['sku'] = str(product_data['sku'])
+        if product_data.get('inventory'):
+            product['inventory'] = product_data['inventory']
+        return ProductModel.apply_inventory(product)
+
+    @staticmethod
+    def apply_inventory(product_data):
+        """Normalize a per-size ``inventory`` map and derive ``stock``/``sizes`` from it"""
+        if product_data.get('inventory') is None:
+            product_data.pop('inventory', None)
+            return product_data
+        inventory = InventoryModel.normalize_inventory(product_data['inventory'])
+        product_data['inventory'] = inventory
+        product_data['stock'] = sum(inventory.values())
+        if inventory:
+            product_data['sizes'] = list(inventory)
+        return product_data
+
+    @staticmethod
+    def bulk_upsert(db, rows):
+        """Write a batch of (row_number, product_data) in one bulk_write.
+
+        Rows with a ``sku`` or ``_id`` are upserted on that key, the rest are
+        inserted. Returns counts plus per-row errors reported by MongoDB.
+        """
+        operations = []
+        for _, data in rows:
+            product = ProductModel.build_product(data)
+            if data.get('sku') or data.get('_id'):
+                key = {'sku': product['sku']} if data.get('sku') else {'_id': ObjectId(data['_id'])}
+                # Only overwrite the fields supplied; defaults apply to new products
+                set_fields = {field: product[field] for field in data if field in product}
+                set_fields['updatedAt'] = product['updatedAt']
+                defaults = {field: value for field, value in product.items() if field not in set_fields}
+                operations.append(UpdateOne(
+                    key,
+                    {'$set': set_fields, '$setOnInsert': defaults},
+                    upsert=True
+                ))
+            else:
+                operations.append(InsertOne(product))
+        
+        if not operations:
+            return {'inserted': 0, 'updated': 0, 'errors': []}
+        
+        try:
+            result = db.products.bulk_write(operations, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+        finally:
+            catalog_cache.invalidate_product()
+        
+        errors = [
+            {'row': rows[error['index']][0], 'error': error.get('errmsg', 'Write failed')}
+            for error in details.get('writeErrors', [])
+        ]
+        return {
+            'inserted': details.get('nInserted', 0) + details.get('nUpserted', 0),
+            'updated': details.get('nModified', 0),
+            'errors': errors
+        }
+
+    @staticmethod
+    def iter_export(db, batch_size=500):
+        """Yield export-ready product dicts from a batched server-side cursor"""
+        projection = {field: 1 for field in EXPORT_FIELDS}
+        cursor = db.products.find({}, projection).sort('_id', ASCENDING).batch_size(batch_size)
+        for product in cursor:
+            product['_id'] = str(product['_id'])
+            yield product
 
     @staticmethod
-    def get_all_products(db, category=None, page=1, limit=20):
+    def get_all_products(db, category=None, page=1, limit=20, sort=None):
+        if sort is not None and sort not in SORT_OPTIONS:
+            raise ValueError(f'Invalid sort. Must be one of: {", ".join(SORT_OPTIONS)}')
+        cache_key = catalog_cache.list_key('page', category, page, limit, sort)
+        cached = catalog_cache.lists.get(cache_key)
+        if cached is not None:
+            return cached
+        
         products = db.products
         query = {}
         if category:
             query['category'] = category
         
         skip = (page - 1) * limit
-        total = products.count_documents(query)
+        total = ProductModel.count_products(db, query)
         
-        items = list(products.find(query).skip(skip).limit(limit))
+        cursor = products.find(query, PUBLIC_PROJECTION)
+        if sort:
+            field, direction = SORT_OPTIONS[sort]
+            cursor = cursor.sort([(field, direction), ('_id', direction)])
+        items = list(cursor.skip(skip).limit(limit))
         
         # Convert ObjectId to string for JSON serialization
         for item in items:
-            item['_id'] = str(item['_id'])
+            ProductModel._prepare_listing_item(item)
         
-        return {
+        result = {
             'products': items,
             'total': total,
             'page': page,
             'limit': limit,
             'totalPages': (total + limit - 1) // limit
         }
+        catalog_cache.lists.set(cache_key, result)
+        return result
+
+    @staticmethod
+    def get_products_by_cursor(db, category=None, cursor=None, limit=20, sort='newest', include_total=False):
+        """Keyset pagination over (sort key, _id); cost is O(limit) at any depth"""
+        cache_key = catalog_cache.list_key('cursor', category, cursor, limit, sort, include_total)
+        cached = catalog_cache.lists.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        if cursor:
+            position = decode_cursor(cursor)
+            sort = position['s']
+        if sort not in SORT_OPTIONS:
+            raise ValueError(f'Invalid sort. Must be one of: {", ".join(SORT_OPTIONS)}')
+        
+        field, direction = SORT_OPTIONS[sort]
+        query = {}
+        if category:
+            query['category'] = category
+        
+        filters = dict(query)
+        if cursor:
+            op = '$lt' if direction == DESCENDING else '$gt'
+            filters['$or'] = [
+                {field: {op: position['v']}},
+                {field: position['v'], '_id': {op: ObjectId(position['id'])}}
+            ]
+        
+        # Fetch one extra document to know whether another page exists
+        items = list(
+            db.products.find(filters, PUBLIC_PROJECTION)
+            .sort([(field, direction), ('_id', direction)])
+            .limit(limit + 1)
+        )
+        has_more = len(items) > limit
+        items = items[:limit]
+        
+        next_cursor = None
+        if has_more:
+            last = items[-1]
+            next_cursor = encode_cursor(sort, last.get(field), str(last['_id']))
+        
+        for item in items:
+            ProductModel._prepare_listing_item(item)
+        
+        result = {
+            'products': items,
+            'nextCursor': next_cursor,
+            'limit': limit,
+            'sort': sort
+        }
+        if include_total:
+            result['total'] = ProductModel.count_products(db, query)
+        catalog_cache.lists.set(cache_key, result)
+        return result
+
+    @staticmethod
+    def search_products(db, q=None, category=None, min_price=None, max_price=None,
+                        size=None, available=None, page=1, limit=20):
+        """Text search ranked by score, with facets, in a single aggregation"""
+        cache_key = catalog_cache.list_key(q, category, min_price, max_price, size, available, page, limit)
+        cached = _search_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        match = {}
+        if q:
+            match['$text'] = {'$search': q}
+        if category:
+            match['category'] = category
+        if min_price is not None or max_price is not None:
+            match['price'] = {}
+            if min_price is not None:
+                match['price']['$gte'] = min_price
+            if max_price is not None:
+                match['price']['$lte'] = max_price
+        if size:
+            match['sizes'] = size
+        if available is not None:
+            match['availability'] = available
+        
+        if q:
+            ranking = [
+                {'$addFields': {'score': {'$meta': 'textScore'}}},
+                {'$sort': {'score': -1, '_id': 1}}
+            ]
+        else:
+            ranking = [{'$sort': {'createdAt': -1, '_id': -1}}]
+        
+        pipeline = [
+            {'$match': match},
+            {'$facet': {
+                'results': ranking + [
+                    {'$skip': (page - 1) * limit},
+                    {'$limit': limit},
+                    {'$project': PUBLIC_PROJECTION}
+                ],
+                'total': [{'$count': 'count'}],
+                'categories': [
+                    {'$group': {'_id': '$category', 'count': {'$sum': 1}}},
+                    {'$sort': {'count': -1}}
+                ],
+                'priceBuckets': [
+                    {'$bucket': {
+                        'groupBy': '$price',
+                        'boundaries': PRICE_BUCKETS,
+                        'default': PRICE_BUCKETS[-1],
+                        'output': {'count': {'$sum': 1}}
+                    }}
+                ],
+                'sizes': [
+                    {'$unwind': '$sizes'},
+                    {'$group': {'_id': '$sizes', 'count': {'$sum': 1}}},
+                    {'$sort': {'_id': 1}}
+                ],
+                'availability': [
+                    {'$group': {'_id': '$availability', 'count': {'$sum': 1}}}
+                ]
+            }}
+        ]
+        
+        facets = next(db.products.aggregate(pipeline), {})
+        
+        items = facets.get('results', [])
+        for item in items:
+            ProductModel._prepare_listing_item(item)
+        
+        total = facets['total'][0]['count'] if facets.get('total') else 0
+        
+        price_buckets = []
+        for bucket in facets.get('priceBuckets', []):
+            lower = bucket['_id']
+            index = PRICE_BUCKETS.index(lower)
+            upper = PRICE_BUCKETS[index + 1] if index + 1 < len(PRICE_BUCKETS) else None
+            price_buckets.append({'min': lower, 'max': upper, 'count': bucket['count']})
+        
+        result = {
+            'products': items,
+            'total': total,
+            'page': page,
+            'limit': limit,
+            'totalPages': (total + limit - 1) // limit,
+            'facets': {
+                'categories': [{'value': c['_id'], 'count': c['count']} for c in facets.get('categories', [])],
+                'priceBuckets': price_buckets,
+                'sizes': [{'value': s['_id'], 'count': s['count']} for s in facets.get('sizes', [])],
+                'availability': [{'value': a['_id'], 'count': a['count']} for a in facets.get('availability', [])]
+            }
+        }
+        _search_cache.set(cache_key, result)
+        return result
+
+    @staticmethod
+    def count_products(db, query):
+        key = catalog_cache.list_key(*sorted(query.items()))
+        total = _count_cache.get(key)
+        if total is None:
+            total = db.products.count_documents(query)
+            _count_cache.set(key, total)
+        return total
+
+    @staticmethod
+    def _prepare_listing_item(item):
+        item['_id'] = str(item['_id'])
+        # Listing cards only need the small card-sized derivative
+        item['thumbnail'] = image_store.pick_variant(
+            item['images'][0] if item.get('images') else None, 'card'
+        )
+        return item
 
     @staticmethod
     def get_product_by_id(db, product_id):
-        product = db.products.find_one({'_id': ObjectId(product_id)})
+        product_id = str(product_id)
+        cached = catalog_cache.products.get(product_id)
+        if cached is not None:
+            return cached
+        
+        version = catalog_cache.version
+        product = db.products.find_one({'_id': ObjectId(product_id)}, PUBLIC_PROJECTION)
         if product:
             product['_id'] = str(product['_id'])
+            catalog_cache.set_if_current(catalog_cache.products, product_id, product, version)
         return product
 
     @staticmethod
+    def get_products_by_ids(db, product_ids, projection=None):
+        """Fetch many products in one $in query.
+
+        Returns ``{id: product}`` for the ids that exist. Without a projection
+        full documents are served from the catalog cache where possible.
+        """
+        found = {}
+        wanted = []
+        for product_id in dict.fromkeys(str(pid) for pid in product_ids):
+            if not ObjectId.is_valid(product_id):
+                continue
+            cached = catalog_cache.products.get(product_id) if projection is None else None
+            if cached is not None:
+                found[product_id] = cached
+            else:
+                wanted.append(ObjectId(product_id))
+        
+        if wanted:
+            version = catalog_cache.version
+            for product in db.products.find({'_id': {'$in': wanted}}, projection or PUBLIC_PROJECTION):
+                product['_id'] = str(product['_id'])
+                found[product['_id']] = product
+                if projection is None:
+                    catalog_cache.set_if_current(catalog_cache.products, product['_id'], product, version)
+        
+        return found
+
+    @staticmethod
+    def set_image_variants(db, product_id, image_hash, variants):
+        """Attach generated derivatives to every matching image of a product.
+
+        ``updatedAt`` moves too, so the product's ETag changes and clients
+        holding the old image URLs refetch.
+        """
+        result = db.products.update_one(
+            {'_id': ObjectId(product_id)},
+            {'$set': {'images.$[img].variants': variants, 'updatedAt': datetime.utcnow()}},
+            array_filters=[{'img.hash': image_hash}]
+        )
+        if result.matched_count:
+            catalog_cache.invalidate_product(product_id)
+
     @staticmethod
     def update_product(db, product_id, update_data):
         # Don't overwrite created timestamp
@@ -72,11 +414,20 @@ class ProductModel:
         if 'stock' in update_data:
             update_data['stock'] = int(update_data['stock'])
         
+        # Per-size inventory overrides stock; holds and sales counters are never client-written
+        ProductModel.apply_inventory(update_data)
+        for field in ('holds', 'unitsSold', 'revenuePence'):
+            update_data.pop(field, None)
+        
         # Perform the update
         result = db.products.update_one(
             {'_id': ObjectId(product_id)},
             {'$set': update_data}
         )
+        catalog_cache.invalidate_product(product_id)
         
         # Return the updated product
-        return ProductModel.get_product_by_id(db, product_id)
\ No newline at end of file
+        updated_product = ProductModel.get_product_by_id(db, product_id)
+        if updated_product:
+            suggest_index.upsert_product(updated_product)
+        return updated_product
\ No newline at end of file
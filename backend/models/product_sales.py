@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import UpdateOne, DESCENDING
+from models.sales_rollup import PAID_STATUSES, day_key, day_start
+from models.product import ProductModel
+from services.suggest_index import suggest_index
+
+def line_pence(item):
+    if item.get('lineTotalPence') is not None:
+        return int(item['lineTotalPence'])
+    return int(round(float(item.get('price', 0)) * 100 * int(item.get('quantity', 0))))
+
+class ProductSalesModel:
+    """Sales counters per product.
+
+    ``products.unitsSold`` / ``products.revenuePence`` hold all-time totals
+    (indexed, so all-time top sellers and popularity sorting are an index
+    walk). ``product_sales_daily`` holds one document per product per UTC
+    day, ``_id`` ``'YYYY-MM-DD:<productId>'``, so a window is an ``_id``
+    range scan over a few documents per day. Days are the order's ``paidAt``
+    (``createdAt`` for orders paid before it was recorded).
+    """
+
+    @staticmethod
+    def _totals(order):
+        totals = {}
+        for item in order.get('items') or []:
+            product_id = str(item.get('productId', ''))
+            if not ObjectId.is_valid(product_id):
+                continue
+            units, pence = totals.get(product_id, (0, 0))
+            totals[product_id] = (units + int(item.get('quantity', 0)), pence + line_pence(item))
+        return totals
+
+    @staticmethod
+    def record_sale(db, order, paid_at=None):
+        """Add a paid order's lines to the counters with two bulk writes"""
+        totals = ProductSalesModel._totals(order)
+        if not totals:
+            return
+        paid_at = paid_at or datetime.utcnow()
+        key = day_key(paid_at)
+        
+        db.products.bulk_write([
+            UpdateOne(
+                {'_id': ObjectId(product_id)},
+                {'$inc': {'unitsSold': units, 'revenuePence': pence}}
+            )
+            for product_id, (units, pence) in totals.items()
+        ], ordered=False)
+        suggest_index.record_sales({product_id: units for product_id, (units, _) in totals.items()})
+        db.product_sales_daily.bulk_write([
+            UpdateOne(
+                {'_id': f'{key}:{product_id}'},
+                {
+                    '$inc': {'unitsSold': units, 'revenuePence': pence},
+                    '$setOnInsert': {'productId': product_id, 'date': day_start(paid_at)}
+                },
+                upsert=True
+            )
+            for product_id, (units, pence) in totals.items()
+        ], ordered=False)
+
+    @staticmethod
+    def top_products(db, days=None, limit=10):
+        """Best sellers by units, all time or over the last ``days`` calendar days"""
+        if not days:
+            products = db.products.find(
+                {'unitsSold': {'$gt': 0}},
+                {'name': 1, 'price': 1, 'unitsSold': 1, 'revenuePence': 1}
+            ).sort([('unitsSold', DESCENDING), ('_id', DESCENDING)]).limit(limit)
+            return [{
+                'productId': str(product['_id']),
+                'name': product.get('name'),
+                'price': product.get('price'),
+                'unitsSold': product.get('unitsSold', 0),
+                'revenue': product.get('revenuePence', 0) / 100
+            } for product in products]
+        
+        start = day_start(datetime.utcnow()) - timedelta(days=days - 1)
+        rows = list(db.product_sales_daily.aggregate([
+            {'$match': {'_id': {'$gte': day_key(start)}}},
+            {'$group': {
+                '_id': '$productId',
+                'unitsSold': {'$sum': '$unitsSold'},
+                'revenuePence': {'$sum': '$revenuePence'}
+            }},
+            {'$sort': {'unitsSold': -1, 'revenuePence': -1}},
+            {'$limit': limit}
+        ]))
+        
+        products = ProductModel.get_products_by_ids(db, [row['_id'] for row in rows], {'name': 1, 'price': 1})
+        return [{
+            'productId': row['_id'],
+            'name': products.get(row['_id'], {}).get('name'),
+            'price': products.get(row['_id'], {}).get('price'),
+            'unitsSold': row['unitsSold'],
+            'revenue': row['revenuePence'] / 100
+        } for row in rows]
+
+    @staticmethod
+    def rebuild(db, batch_size=500):
+        """Recompute every counter from paid orders (bucketed by payment day, as ``record_sale`` does)"""
+        pipeline = [
+            {'$match': {'paymentStatus': {'$in': list(PAID_STATUSES)}}},
+            {'$project': {'paidAt': {'$ifNull': ['$paidAt', '$createdAt']}, 'items': 1}},
+            {'$unwind': '$items'},
+            {'$group': {
+                '_id': {
+                    'day': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$paidAt'}},
+                    'productId': {'$toString': '$items.productId'}
+                },
+                'unitsSold': {'$sum': '$items.quantity'},
+                'revenuePence': {'$sum': {'$ifNull': [
+                    '$items.lineTotalPence',
+                    {'$round': [{'$multiply': ['$items.price', '$items.quantity', 100]}, 0]}
+                ]}}
+            }}
+        ]
+        
+        totals = {}
+        daily = []
+        for row in db.orders.aggregate(pipeline, allowDiskUse=True):
+            product_id = row['_id']['productId']
+            if not ObjectId.is_valid(product_id):
+                continue
+            units, pence = int(row['unitsSold']), int(row['revenuePence'])
+            day = row['_id']['day']
+            daily.append(UpdateOne(
+                {'_id': f'{day}:{product_id}'},
+                {'$set': {
+                    'productId': product_id,
+                    'date': datetime.strptime(day, '%Y-%m-%d'),
+                    'unitsSold': units,
+                    'revenuePence': pence
+                }},
+                upsert=True
+            ))
+            total_units, total_pence = totals.get(product_id, (0, 0))
+            totals[product_id] = (total_units + units, total_pence + pence)
+        
+        db.product_sales_daily.delete_many({})
+        db.products.update_many({}, {'$set': {'unitsSold': 0, 'revenuePence': 0}})
+        counters = [
+            UpdateOne({'_id': ObjectId(product_id)}, {'$set': {'unitsSold': units, 'revenuePence': pence}})
+            for product_id, (units, pence) in totals.items()
+        ]
+        for collection, operations in ((db.product_sales_daily, daily), (db.products, counters)):
+            for start in range(0, len(operations), batch_size):
+                collection.bulk_write(operations[start:start + batch_size], ordered=False)
+        return len(totals)
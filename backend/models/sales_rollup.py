@@ -0,0 +1,122 @@
+from datetime import datetime
+from pymongo import ReplaceOne
+
+# Payment statuses that count as money received
+PAID_STATUSES = ('completed', 'paid')
+
+def day_key(moment):
+    return moment.strftime('%Y-%m-%d')
+
+def day_start(moment):
+    return datetime(moment.year, moment.month, moment.day)
+
+def order_pence(order):
+    if order.get('grandTotalPence') is not None:
+        return int(order['grandTotalPence'])
+    return int(round(float(order.get('grandTotal', 0)) * 100))
+
+class SalesRollupModel:
+    """Per-day sales counters in ``sales_daily``, keyed by UTC date.
+
+    Each document holds counts and revenue (in pence) for orders created
+    that day, the current status mix of those orders and what has been paid.
+    Writers only ``$inc``, so the dashboard reads one small document per day
+    however many orders there are.
+    """
+
+    @staticmethod
+    def _inc(db, created_at, counters):
+        db.sales_daily.update_one(
+            {'_id': day_key(created_at)},
+            {
+                '$inc': counters,
+                '$setOnInsert': {'date': day_start(created_at)},
+                '$currentDate': {'updatedAt': True}
+            },
+            upsert=True
+        )
+
+    @staticmethod
+    def record_order_created(db, order):
+        counters = {
+            'orders': 1,
+            'revenuePence': order_pence(order),
+            f"statuses.{order.get('orderStatus', 'pending')}": 1
+        }
+        if order.get('paymentStatus') in PAID_STATUSES:
+            counters['paidOrders'] = 1
+            counters['paidRevenuePence'] = order_pence(order)
+        SalesRollupModel._inc(db, order['createdAt'], counters)
+
+    @staticmethod
+    def record_status_change(db, order, old_status, new_status):
+        if old_status == new_status:
+            return
+        SalesRollupModel._inc(db, order['createdAt'], {
+            f'statuses.{old_status}': -1,
+            f'statuses.{new_status}': 1
+        })
+
+    @staticmethod
+    def record_payment(db, order):
+        SalesRollupModel._inc(db, order['createdAt'], {
+            'paidOrders': 1,
+            'paidRevenuePence': order_pence(order)
+        })
+
+    @staticmethod
+    def get_days(db, start):
+        """Rollup documents from ``start`` (a datetime) onwards, oldest first"""
+        return list(db.sales_daily.find({'_id': {'$gte': day_key(start)}}).sort('_id', 1))
+
+    @staticmethod
+    def rebuild(db, since=None, batch_size=500):
+        """Recompute days from ``orders`` (all of them, or from ``since``).
+
+        Live ``$inc`` updates that land while a day is being replaced are
+        lost, so run this when order traffic is quiet.
+        """
+        match = {'createdAt': {'$gte': day_start(since)}} if since else {}
+        pipeline = [
+            {'$match': match},
+            {'$project': {
+                'day': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$createdAt'}},
+                'orderStatus': 1,
+                'pence': {'$ifNull': ['$grandTotalPence', {'$round': [{'$multiply': ['$grandTotal', 100]}, 0]}]},
+                'paid': {'$in': ['$paymentStatus', list(PAID_STATUSES)]}
+            }},
+            {'$group': {
+                '_id': {'day': '$day', 'status': '$orderStatus'},
+                'orders': {'$sum': 1},
+                'revenuePence': {'$sum': '$pence'},
+                'paidOrders': {'$sum': {'$cond': ['$paid', 1, 0]}},
+                'paidRevenuePence': {'$sum': {'$cond': ['$paid', '$pence', 0]}}
+            }}
+        ]
+        
+        days = {}
+        for row in db.orders.aggregate(pipeline, allowDiskUse=True):
+            key = row['_id']['day']
+            day = days.setdefault(key, {
+                '_id': key,
+                'date': datetime.strptime(key, '%Y-%m-%d'),
+                'orders': 0,
+                'revenuePence': 0,
+                'paidOrders': 0,
+                'paidRevenuePence': 0,
+                'statuses': {},
+                'updatedAt': datetime.utcnow()
+            })
+            for field in ('orders', 'revenuePence', 'paidOrders', 'paidRevenuePence'):
+                day[field] += int(row[field])
+            day['statuses'][row['_id']['status'] or 'unknown'] = row['orders']
+        
+        # Days with no orders left are removed, the rest replaced wholesale
+        stale = {'_id': {'$gte': day_key(since)}} if since else {}
+        stale['_id'] = dict(stale.get('_id', {}), **{'$nin': list(days)})
+        db.sales_daily.delete_many(stale)
+        
+        operations = [ReplaceOne({'_id': key}, day, upsert=True) for key, day in days.items()]
+        for start in range(0, len(operations), batch_size):
+            db.sales_daily.bulk_write(operations[start:start + batch_size], ordered=False)
+        return len(days)
@@ -12,7 +12,6 @@ class UserModel:
             'lastName': user_data.get('lastName', ''),
             'phone': user_data.get('phone', ''),
             'addresses': [],
-            'cart': [],
             'wishlist': [],
             'isAdmin': False,
             'createdAt': datetime.utcnow(),
@@ -25,6 +24,31 @@ class UserModel:
     def find_by_email(db, email):
         return db.users.find_one({'email': email})
 
+    @staticmethod
+    def replace_password_hash(db, user_id, old_hash, new_hash):
+        """Swap in a rehashed password unless the password changed meanwhile"""
+        result = db.users.update_one(
+            {'_id': ObjectId(user_id), 'password': old_hash},
+            {'$set': {'password': new_hash, 'updatedAt': datetime.utcnow()}}
+        )
+        return result.modified_count == 1
+
+    @staticmethod
+    def cost_distribution(db):
+        """Number of users per bcrypt cost (None for unrecognized hashes)"""
+        pipeline = [
+            {'$group': {
+                '_id': {'$substrCP': [{'$ifNull': ['$password', '']}, 4, 2]},
+                'count': {'$sum': 1}
+            }},
+            {'$sort': {'_id': 1}}
+        ]
+        distribution = {}
+        for row in db.users.aggregate(pipeline):
+            cost = int(row['_id']) if row['_id'].isdigit() else None
+            distribution[cost] = distribution.get(cost, 0) + row['count']
+        return distribution
+
     @staticmethod
     def find_by_id(db, user_id):
         return db.users.find_one({'_id': ObjectId(user_id)})
@@ -0,0 +1,59 @@
+import sys
+import argparse
+from pymongo import MongoClient
+from config import Config
+from models.user import UserModel
+from services.password_hasher import password_hasher, measure_hash_ms
+
+def main():
+    parser = argparse.ArgumentParser(description='Report the bcrypt cost distribution across users')
+    parser.add_argument('--timings', action='store_true', help='also time one hash at every cost on this host')
+    args = parser.parse_args()
+
+    print("="*50)
+    print("PASSWORD HASH COSTS")
+    print("="*50)
+
+    try:
+        client = MongoClient(Config.MONGO_URI)
+        db = client[Config.DATABASE_NAME]
+        print(f"Connected to database: {Config.DATABASE_NAME}\n")
+
+        target = password_hasher.calibrate()
+        source = 'AUTH_HASH_COST' if Config.AUTH_HASH_COST else f'calibrated for {Config.AUTH_HASH_TARGET_MS} ms'
+        print(f"Target cost on this host: {target} ({source})\n")
+
+        if args.timings:
+            print("Cost   ms/hash")
+            for cost in range(Config.AUTH_HASH_MIN_COST, Config.AUTH_HASH_MAX_COST + 1):
+                print(f"{cost:>4}   {measure_hash_ms(cost, samples=1):>7.0f}")
+            print()
+
+        distribution = UserModel.cost_distribution(db)
+        total = sum(distribution.values())
+        if not total:
+            print("No users found.")
+            return
+
+        print("Cost   Users   Share")
+        for cost, count in sorted(distribution.items(), key=lambda item: (item[0] is None, item[0] or 0)):
+            label = 'n/a' if cost is None else str(cost)
+            if cost is None:
+                marker = '  <- not a bcrypt hash'
+            elif cost < target:
+                marker = '  <- rehashed on next login'
+            else:
+                marker = ''
+            print(f"{label:>4}   {count:>5}   {count / total:>5.1%}{marker}")
+
+        pending = sum(count for cost, count in distribution.items() if cost is not None and cost < target)
+        print(f"\n{total} users, {pending} below the target cost.")
+
+    except Exception as e:
+        print(f"\nError reading password costs: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import sys
+import argparse
+from datetime import datetime, timedelta
+from pymongo import MongoClient
+from config import Config
+from models.sales_rollup import SalesRollupModel
+from models.product_sales import ProductSalesModel
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the sales_daily rollup and product sales counters from orders')
+    parser.add_argument('--days', type=int, default=None, help='only rebuild the last N days (default: everything)')
+    args = parser.parse_args()
+
+    print("="*50)
+    print("SALES ROLLUP REBUILD")
+    print("="*50)
+
+    try:
+        client = MongoClient(Config.MONGO_URI)
+        db = client[Config.DATABASE_NAME]
+        print(f"Connected to database: {Config.DATABASE_NAME}\n")
+
+        since = datetime.utcnow() - timedelta(days=args.days - 1) if args.days else None
+        if since:
+            print(f"Rebuilding days from {since.date()}...")
+        else:
+            print("Rebuilding every day with orders...")
+
+        rebuilt = SalesRollupModel.rebuild(db, since)
+        print(f"{rebuilt} days written to sales_daily.")
+
+        # Product counters are all-time totals, so they are always rebuilt in full
+        products = ProductSalesModel.rebuild(db)
+        print(f"\nDone. Sales counters rebuilt for {products} products.")
+
+    except Exception as e:
+        print(f"\nError during rebuild: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
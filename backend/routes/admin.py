@@ -1,7 +1,22 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
 from middleware.auth_middleware import token_required, admin_required
 from datetime import datetime, timedelta
 from bson import ObjectId
+from models.product import ProductModel, EXPORT_FIELDS
+from models.order import OrderModel, ORDER_EXPORT_FIELDS, ORDER_LINE_EXPORT_FIELDS
+from models.inventory import InventoryModel
+from models.product_sales import ProductSalesModel
+from models.email_outbox import EmailOutboxModel
+from services.email_service import email_service
+from utils.validators import validate_product_data
+from services.suggest_index import suggest_index
+import io
+import csv
+import json
+import time
+from utils.catalog_cache import catalog_cache
+from middleware.compression import get_compression_stats
+from utils.metrics import metrics
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -53,38 +68,324 @@ def get_all_users():
         'limit': limit
     }), 200
 
+def _parse_day(value, end=False):
+    """Parse a YYYY-MM-DD (or ISO datetime) query value; ``end`` makes a date inclusive"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
 @admin_bp.route('/admin/orders', methods=['GET'])
 @token_required
 @admin_required
 def get_all_orders():
+    """Newest-first order list with filters and cursor paging.
+
+    Query: status, paymentStatus, from, to (inclusive dates), email (exact),
+    cursor, limit, view=full for complete documents instead of table rows.
+    """
     try:
-        page = int(request.args.get('page', 1))
-        limit = int(request.args.get('limit', 20))
-        skip = (page - 1) * limit
-        
-        # Get orders
-        orders_cursor = request.db.orders.find().sort('createdAt', -1).skip(skip).limit(limit)
-        orders = list(orders_cursor)
-        total = request.db.orders.count_documents({})
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+        filters = OrderModel.build_admin_filters(
+            status=request.args.get('status'),
+            payment_status=request.args.get('paymentStatus'),
+            created_from=_parse_day(request.args.get('from')),
+            created_before=_parse_day(request.args.get('to'), end=True),
+            email=(request.args.get('email') or '').strip()
+        )
         
-        # Serialize all orders
-        serialized_orders = serialize_mongo_document(orders)
+        with metrics.timed('admin.orders'):
+            page = OrderModel.list_orders(
+                request.db,
+                filters,
+                cursor=request.args.get('cursor'),
+                limit=limit,
+                full=request.args.get('view') == 'full'
+            )
+            total = OrderModel.count_orders(request.db, filters)
         
         return jsonify({
-            'orders': serialized_orders,
+            'orders': serialize_mongo_document(page['orders']),
+            'nextCursor': page['nextCursor'],
             'total': total,
-            'page': page,
             'limit': limit,
-            'pages': (total + limit - 1) // limit
+            'totalPages': (total + limit - 1) // limit
         }), 200
         
     except ValueError:
-        return jsonify({'error': 'Invalid page or limit parameter'}), 400
+        return jsonify({'error': 'Invalid filter, cursor or limit parameter'}), 400
     except Exception as e:
         current_app.logger.error(f'Error fetching orders: {e}', exc_info=True)
         return jsonify({'error': 'Internal server error'}), 500
 
 
+@admin_bp.route('/admin/orders/export', methods=['GET'])
+@token_required
+@admin_required
+def export_orders():
+    """Stream orders for accounting as CSV or NDJSON.
+
+    Query: from, to (inclusive dates), optional status/paymentStatus,
+    lines=true for one row per line item, batchSize for the Mongo cursor.
+    """
+    file_format = request.args.get('format', 'csv')
+    if file_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'Format must be ndjson or csv'}), 400
+    
+    try:
+        created_from = _parse_day(request.args.get('from'))
+        created_to = _parse_day(request.args.get('to'))
+        filters = OrderModel.build_admin_filters(
+            status=request.args.get('status'),
+            payment_status=request.args.get('paymentStatus'),
+            created_from=created_from,
+            created_before=_parse_day(request.args.get('to'), end=True)
+        )
+        batch_size = min(max(int(request.args.get('batchSize', 1000)), 100), 5000)
+    except ValueError:
+        return jsonify({'error': 'Invalid from, to or batchSize parameter'}), 400
+    
+    lines = request.args.get('lines', 'false').lower() in ('true', '1', 'yes')
+    fields = ORDER_LINE_EXPORT_FIELDS if lines else ORDER_EXPORT_FIELDS
+    db = request.db
+    
+    def generate():
+        started = time.perf_counter()
+        rows = 0
+        if file_format == 'csv':
+            yield _csv_line(fields)
+        for row in OrderModel.iter_export(db, filters, lines=lines, batch_size=batch_size):
+            rows += 1
+            if file_format == 'csv':
+                yield _csv_line([row.get(field, '') for field in fields])
+            else:
+                yield json.dumps(row) + '\n'
+        metrics.record('admin.orders_export', time.perf_counter() - started, rows=rows)
+    
+    name = 'order-lines' if lines else 'orders'
+    span = '_'.join(day.strftime('%Y%m%d') for day in (created_from, created_to) if day)
+    filename = f'{name}-{span}.{file_format}' if span else f'{name}.{file_format}'
+    mimetype = 'text/csv' if file_format == 'csv' else 'application/x-ndjson'
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+
+def _csv_line(values):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+def _parse_import_rows(stream, file_format):
+    """Yield (row number, raw row) while reading the upload incrementally"""
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='' if file_format == 'csv' else None)
+    if file_format == 'csv':
+        for row_number, row in enumerate(csv.DictReader(text), start=1):
+            yield row_number, row
+    else:
+        for row_number, line in enumerate(text, start=1):
+            if line.strip():
+                yield row_number, line
+
+def _normalize_import_row(row):
+    """Coerce CSV strings / NDJSON values into product fields"""
+    if isinstance(row, str):
+        row = json.loads(row)
+    is_valid, message = validate_product_data(row)
+    if not is_valid:
+        raise ValueError(message)
+    
+    product = {
+        'name': row['name'],
+        'price': float(row['price']),
+        'category': row['category']
+    }
+    
+    # Optional columns are only written when present in the feed
+    if 'description' in row:
+        product['description'] = row['description'] or ''
+    if 'sizes' in row:
+        sizes = row['sizes'] or []
+        if isinstance(sizes, str):
+            sizes = [size.strip() for size in sizes.replace('|', ',').split(',') if size.strip()]
+        product['sizes'] = sizes
+    if 'availability' in row:
+        availability = row['availability']
+        if isinstance(availability, str):
+            availability = availability.strip().lower() not in ('false', '0', 'no', '')
+        product['availability'] = availability
+    if 'stock' in row:
+        product['stock'] = int(row['stock'] or 0)
+    if row.get('inventory'):
+        inventory = row['inventory']
+        if isinstance(inventory, str):
+            # CSV form: S:3|M:5
+            inventory = dict(pair.rsplit(':', 1) for pair in inventory.split('|') if pair.strip())
+        product['inventory'] = inventory
+        ProductModel.apply_inventory(product)
+    if row.get('sku'):
+        product['sku'] = str(row['sku'])
+    if row.get('_id'):
+        if not ObjectId.is_valid(row['_id']):
+            raise ValueError('Invalid _id')
+        product['_id'] = row['_id']
+    return product
+
+
+@admin_bp.route('/admin/products/export', methods=['GET'])
+@token_required
+@admin_required
+def export_products():
+    """Stream the whole catalog as NDJSON or CSV"""
+    file_format = request.args.get('format', 'ndjson')
+    if file_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'Format must be ndjson or csv'}), 400
+    
+    try:
+        batch_size = min(max(int(request.args.get('batchSize', 500)), 100), 5000)
+    except ValueError:
+        return jsonify({'error': 'Invalid batchSize parameter'}), 400
+    db = request.db
+    
+    def generate():
+        if file_format == 'csv':
+            yield _csv_line(EXPORT_FIELDS)
+        for product in ProductModel.iter_export(db, batch_size):
+            if file_format == 'csv':
+                values = dict(
+                    product,
+                    sizes='|'.join(product.get('sizes') or []),
+                    inventory='|'.join(f'{size}:{quantity}' for size, quantity in (product.get('inventory') or {}).items())
+                )
+                yield _csv_line([values.get(field, '') for field in EXPORT_FIELDS])
+            else:
+                yield json.dumps(product, default=str) + '\n'
+    
+    mimetype = 'text/csv' if file_format == 'csv' else 'application/x-ndjson'
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=products.{file_format}'
+    return response
+
+
+@admin_bp.route('/admin/products/import', methods=['POST'])
+@token_required
+@admin_required
+def import_products():
+    """Bulk upsert products from an NDJSON/CSV upload in batches"""
+    file_format = request.args.get('format', 'ndjson')
+    if file_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'Format must be ndjson or csv'}), 400
+    
+    try:
+        batch_size = max(1, min(int(request.args.get('batchSize', 1000)), 10000))
+    except ValueError:
+        return jsonify({'error': 'Invalid batchSize parameter'}), 400
+    
+    # Either a multipart 'file' field or the raw request body
+    upload = request.files.get('file')
+    stream = upload.stream if upload else io.BufferedReader(request.stream)
+    
+    report = {'processed': 0, 'inserted': 0, 'updated': 0, 'errors': []}
+    batch = []
+    
+    def flush():
+        result = ProductModel.bulk_upsert(request.db, batch)
+        report['inserted'] += result['inserted']
+        report['updated'] += result['updated']
+        report['errors'].extend(result['errors'])
+        batch.clear()
+    
+    try:
+        for row_number, row in _parse_import_rows(stream, file_format):
+            report['processed'] += 1
+            try:
+                batch.append((row_number, _normalize_import_row(row)))
+            except (ValueError, TypeError, KeyError) as e:
+                report['errors'].append({'row': row_number, 'error': str(e)})
+                continue
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        # Unparseable input: report how far we got
+        report['errors'].append({'row': report['processed'] + 1, 'error': f'Parse error: {e}'})
+    
+    report['failed'] = len(report['errors'])
+    
+    # Bulk writes bypass the incremental hooks, so rebuild typeahead once
+    if report['inserted'] or report['updated']:
+        suggest_index.build(request.db)
+    
+    return jsonify(report), 200
+
+
+@admin_bp.route('/admin/cache/stats', methods=['GET'])
+@token_required
+@admin_required
+def get_cache_stats():
+    """Hit/miss/eviction counters for the in-process catalog cache"""
+    return jsonify(catalog_cache.stats()), 200
+
+
+@admin_bp.route('/admin/top-products', methods=['GET'])
+@token_required
+@admin_required
+def get_top_products():
+    """Best sellers from the sales counters; ?days= limits to recent days"""
+    try:
+        days = int(request.args['days']) if request.args.get('days') else None
+        limit = min(max(int(request.args.get('limit', 10)), 1), 100)
+    except ValueError:
+        return jsonify({'error': 'days and limit must be integers'}), 400
+    if days is not None and days < 1:
+        return jsonify({'error': 'days must be at least 1'}), 400
+    
+    with metrics.timed('admin.top_products'):
+        products = ProductSalesModel.top_products(request.db, days, limit)
+    return jsonify({'products': products, 'days': days, 'limit': limit}), 200
+
+
+@admin_bp.route('/admin/metrics', methods=['GET'])
+@token_required
+@admin_required
+def get_metrics():
+    """Latency percentiles and counters for instrumented operations"""
+    return jsonify(metrics.snapshot(request.args.get('prefix', ''))), 200
+
+
+@admin_bp.route('/admin/email-outbox', methods=['GET'])
+@token_required
+@admin_required
+def get_email_outbox():
+    """Outbox depth by status, recent dead-lettered messages and Mailgun circuit state"""
+    stats = EmailOutboxModel.get_stats(request.db)
+    stats['mailgun'] = email_service.stats()
+    return jsonify(serialize_mongo_document(stats)), 200
+
+
+@admin_bp.route('/admin/email-outbox/requeue', methods=['POST'])
+@token_required
+@admin_required
+def requeue_dead_emails():
+    """Retry dead-lettered emails: one by ``messageId`` or all of them"""
+    message_id = (request.get_json(silent=True) or {}).get('messageId')
+    if message_id is not None and not ObjectId.is_valid(message_id):
+        return jsonify({'error': 'Invalid messageId'}), 400
+    requeued = EmailOutboxModel.requeue_dead(request.db, ObjectId(message_id) if message_id else None)
+    return jsonify({'requeued': requeued}), 200
+
+
+@admin_bp.route('/admin/compression/stats', methods=['GET'])
+@token_required
+@admin_required
+def get_compression_stats_route():
+    """Per-route compression ratios and CPU time"""
+    return jsonify(get_compression_stats()), 200
+
+
 @admin_bp.route('/admin/orders/<order_id>/status', methods=['PUT'])
 @token_required
 @admin_required
@@ -98,14 +399,25 @@ def update_order_status(order_id):
     if data['status'] not in valid_statuses:
         return jsonify({'error': f'Invalid status. Must be one of: {", ".join(valid_statuses)}'}), 400
     
-    request.db.orders.update_one(
-        {'_id': ObjectId(order_id)},
-        {
-            '$set': {
-                'orderStatus': data['status'],
-                'updatedAt': datetime.utcnow()
-            }
-        }
-    )
+    # The shipped notification needs a courier and tracking number
+    shipping_info = None
+    if data['status'] == 'shipped':
+        shipping_info = data.get('shippingInfo')
+        if not shipping_info:
+            return jsonify({'error': 'Shipping information is required for shipped status'}), 400
+        if not str(shipping_info.get('courierName') or '').strip():
+            return jsonify({'error': 'Courier company name is required'}), 400
+        if not str(shipping_info.get('trackingNumber') or '').strip():
+            return jsonify({'error': 'Tracking number is required'}), 400
+    
+    OrderModel.update_order_status(request.db, order_id, data['status'], shipping_info=shipping_info)
+    if data['status'] == 'cancelled':
+        InventoryModel.release_order(request.db, order_id, 'cancelled')
+    if data['status'] in ('shipped', 'delivered'):
+        try:
+            if email_service.queue_status_notification(request.db, order_id, data['status']):
+                current_app.logger.info(f'Order {order_id} {data["status"]} notification queued')
+        except Exception as email_error:
+            current_app.logger.error(f'Error queueing {data["status"]} notification: {email_error}')
     
     return jsonify({'message': 'Order status updated successfully'}), 200
\ No newline at end of file
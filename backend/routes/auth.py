@@ -1,14 +1,29 @@
 from flask import Blueprint, request, jsonify
 from models.user import UserModel
+from models.cart import CartModel
 from utils.validators import validate_email, validate_password
-from utils.helpers import hash_password, verify_password, generate_token
+from utils.helpers import generate_token
+from utils.metrics import metrics
+from services.password_hasher import password_hasher, HasherBusy
 from config import Config
 from bson import ObjectId
 
 auth_bp = Blueprint('auth', __name__)
 
+@auth_bp.errorhandler(HasherBusy)
+def hasher_busy(error):
+    """bcrypt pool saturated: shed load fast instead of queueing on worker threads"""
+    metrics.increment(f'auth.{request.endpoint.rsplit(".", 1)[-1]}', shed=1)
+    response = jsonify({'error': str(error)})
+    response.headers['Retry-After'] = str(Config.AUTH_BUSY_RETRY_AFTER)
+    return response, 503
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
+    with metrics.timed('auth.register'):
+        return _register()
+
+def _register():
     data = request.json
     
     # Validate input
@@ -29,7 +44,7 @@ def register():
     # Create user
     user_data = {
         'email': data['email'],
-        'password': hash_password(data['password']),
+        'password': password_hasher.hash(data['password']),
         'firstName': data['firstName'],
         'lastName': data['lastName'],
         'phone': data.get('phone', '')
@@ -48,6 +63,10 @@ def register():
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
+    with metrics.timed('auth.login'):
+        return _login()
+
+def _login():
     data = request.json
     
     if not all(k in data for k in ('email', 'password')):
@@ -57,15 +76,32 @@ def login():
     if not user:
         return jsonify({'error': 'Invalid credentials'}), 401
     
-    if not verify_password(data['password'], user['password']):
+    if not password_hasher.verify(data['password'], user['password']):
+        metrics.increment('auth.login', failed=1)
         return jsonify({'error': 'Invalid credentials'}), 401
     
+    # Move the stored hash to the current cost while we have the plain password
+    if password_hasher.needs_rehash(user['password']):
+        try:
+            new_hash = password_hasher.hash(data['password'])
+            if UserModel.replace_password_hash(request.db, user['_id'], user['password'], new_hash):
+                metrics.increment('auth.login', rehashed=1)
+        except HasherBusy:
+            pass  # Signing in matters more; try again next login
+    
     # Generate token
     token = generate_token(str(user['_id']), user.get('isAdmin', False))
     
+    # Fold any anonymous cart into the user's cart
+    cart_merged = 0
+    guest_token = data.get('cartToken') or request.headers.get('X-Cart-Token')
+    if guest_token:
+        cart_merged = CartModel.merge_guest_cart(request.db, guest_token, str(user['_id']))
+    
     return jsonify({
         'message': 'Login successful',
         'token': token,
         'userId': str(user['_id']),
-        'isAdmin': user.get('isAdmin', False)
+        'isAdmin': user.get('isAdmin', False),
+        'cartMerged': cart_merged
     }), 200
\ No newline at end of file
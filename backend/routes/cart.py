@@ -1,96 +1,132 @@
 from flask import Blueprint, request, jsonify
-from middleware.auth_middleware import token_required
-from datetime import datetime
+from middleware.auth_middleware import token_optional
+from models.cart import CartModel
+from models.product import ProductModel
+from models.inventory import InventoryModel
 from bson import ObjectId
 
 cart_bp = Blueprint('cart', __name__)
 
+CART_TOKEN_HEADER = 'X-Cart-Token'
+
+def resolve_cart_owner(create=False):
+    """Return (owner filter, new guest token or None) for the current request.
+
+    Signed-in users own their cart; anonymous shoppers are identified by the
+    X-Cart-Token header. With ``create`` a token is issued when none was sent.
+    """
+    owner = CartModel.owner_for(request.user_id, request.headers.get(CART_TOKEN_HEADER))
+    if owner is None and create:
+        token = CartModel.new_guest_token()
+        return CartModel.owner_for(guest_token=token), token
+    return owner, None
+
+def cart_response(message, cart, new_token):
+    body = {
+        'message': message,
+        'cart': cart
+    }
+    if new_token:
+        body['cartToken'] = new_token
+    return jsonify(body)
+
 @cart_bp.route('/cart', methods=['GET'])
-@token_required
+@token_optional
 def get_cart():
-    user = request.db.users.find_one(
-        {'_id': ObjectId(request.user_id)},
-        {'cart': 1}
-    )
-    
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
-    
-    cart_items = user.get('cart', [])
+    owner, _ = resolve_cart_owner()
+    if owner is None:
+        return jsonify([]), 200
     
-    # Get product details for cart items
-    for item in cart_items:
-        product = request.db.products.find_one(
-            {'_id': ObjectId(item['productId'])},
-            {'name': 1, 'price': 1, 'images': 1, 'availability': 1}
-        )
-        if product:
-            item['product'] = {
-                'name': product['name'],
-                'price': product['price'],
-                'image': product['images'][0] if product.get('images') else None
-            }
+    # Product details for every line come from a single $in query
+    cart_items = CartModel.hydrate_items(request.db, CartModel.get_items(request.db, owner))
     
     return jsonify(cart_items), 200
 
 @cart_bp.route('/cart', methods=['POST'])
-@token_required
+@token_optional
 def update_cart():
     data = request.json
     
     if 'productId' not in data or 'quantity' not in data:
         return jsonify({'error': 'productId and quantity are required'}), 400
     
-    product = request.db.products.find_one({'_id': ObjectId(data['productId'])})
+    product = ProductModel.get_products_by_ids(
+        request.db, [data['productId']], {'price': 1, 'inventory': 1}
+    ).get(data['productId'])
     if not product:
         return jsonify({'error': 'Product not found'}), 404
     
-    user = request.db.users.find_one({'_id': ObjectId(request.user_id)})
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
+    size = data.get('size') or None
+    size_error = InventoryModel.check_size(product, size)
+    if size_error:
+        return jsonify({'error': size_error}), 400
     
-    cart = user.get('cart', [])
+    owner, new_token = resolve_cart_owner(create=True)
     
-    # Check if product already in cart
-    found = False
-    for item in cart:
-        if item['productId'] == data['productId']:
-            item['quantity'] = int(data['quantity'])
-            found = True
-            break
+    # Server-side array update: no read-modify-write of the cart document
+    cart = CartModel.set_quantity(
+        request.db, owner, data['productId'], int(data['quantity']), product['price'], size
+    )
+    
+    return cart_response('Cart updated successfully', cart, new_token), 200
+
+@cart_bp.route('/cart', methods=['PATCH'])
+@token_optional
+def patch_cart():
+    """Apply many line changes in one atomic update.
+
+    Body: {"items": [{"productId": ..., "quantity": n} | {"productId": ..., "delta": n}]}
+    Items may carry a ``size``. A resulting quantity of 0 removes the line.
+    """
+    data = request.json or {}
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'items must be a non-empty list'}), 400
     
-    if not found:
-        cart.append({
-            'productId': data['productId'],
-            'quantity': int(data['quantity']),
-            'addedAt': datetime.utcnow()
-        })
+    changes = {}
+    try:
+        for item in items:
+            key = (str(item['productId']), item.get('size') or None)
+            # Checked for every item, removals included: both values end up in the update pipeline
+            if not ObjectId.is_valid(key[0]):
+                return jsonify({'error': 'Invalid productId', 'productId': key[0]}), 400
+            if key[1] is not None and not isinstance(key[1], str):
+                return jsonify({'error': 'size must be a string', 'productId': key[0]}), 400
+            if 'delta' in item:
+                changes[key] = ('inc', int(item['delta']))
+            else:
+                quantity = int(item['quantity'])
+                if quantity < 0:
+                    return jsonify({'error': 'quantity must not be negative'}), 400
+                changes[key] = ('set', quantity)
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Each item needs productId and an integer quantity or delta'}), 400
     
-    # Update cart
-    request.db.users.update_one(
-        {'_id': ObjectId(request.user_id)},
-        {
-            '$set': {
-                'cart': cart,
-                'updatedAt': datetime.utcnow()
-            }
-        }
+    # Validate every product (and capture prices) with one $in query
+    products = ProductModel.get_products_by_ids(
+        request.db, [pid for pid, _ in changes], {'price': 1, 'inventory': 1}
     )
+    missing = [pid for (pid, _), (_, amount) in changes.items() if pid not in products and amount > 0]
+    if missing:
+        return jsonify({'error': 'Product not found', 'missing': missing}), 404
+    for (pid, size), (_, amount) in changes.items():
+        size_error = InventoryModel.check_size(products[pid], size) if amount > 0 else None
+        if size_error:
+            return jsonify({'error': size_error, 'productId': pid}), 400
     
-    return jsonify({
-        'message': 'Cart updated successfully',
-        'cart': cart
-    }), 200
+    owner, new_token = resolve_cart_owner(create=True)
+    prices = {pid: product['price'] for pid, product in products.items()}
+    cart = CartModel.apply_changes(request.db, owner, changes, prices)
+    
+    return cart_response('Cart updated successfully', cart, new_token), 200
 
 @cart_bp.route('/cart/<product_id>', methods=['DELETE'])
-@token_required
+@token_optional
 def remove_from_cart(product_id):
-    request.db.users.update_one(
-        {'_id': ObjectId(request.user_id)},
-        {
-            '$pull': {'cart': {'productId': product_id}},
-            '$set': {'updatedAt': datetime.utcnow()}
-        }
-    )
+    owner, _ = resolve_cart_owner()
+    if owner is None:
+        return jsonify({'error': 'Cart not found'}), 404
+    
+    cart = CartModel.remove_item(request.db, owner, product_id, request.args.get('size'))
     
-    return jsonify({'message': 'Item removed from cart'}), 200
\ No newline at end of file
+    return cart_response('Item removed from cart', cart, None), 200
\ No newline at end of file
@@ -0,0 +1,43 @@
+from flask import Blueprint, request, jsonify, current_app
+from werkzeug.wsgi import wrap_file
+from services.image_store import image_store
+from config import Config
+import re
+
+images_bp = Blueprint('images', __name__)
+
+HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+@images_bp.route('/images/<image_hash>', methods=['GET'])
+def get_image(image_hash):
+    """Stream raw image bytes with ETag, long-lived caching and Range support"""
+    if not HASH_PATTERN.match(image_hash):
+        return jsonify({'error': 'Invalid image id'}), 400
+
+    # Content is addressed by hash, so a matching ETag never needs a lookup
+    if image_hash in request.if_none_match:
+        response = current_app.response_class(status=304)
+        response.set_etag(image_hash)
+        response.cache_control.public = True
+        response.cache_control.max_age = Config.IMAGE_CACHE_MAX_AGE
+        response.cache_control.immutable = True
+        return response
+
+    opened = image_store.open(request.db, image_hash)
+    if not opened:
+        return jsonify({'error': 'Image not found'}), 404
+
+    fileobj, size, content_type = opened
+
+    response = current_app.response_class(
+        wrap_file(request.environ, fileobj),
+        mimetype=content_type,
+        direct_passthrough=True
+    )
+    response.content_length = size
+    response.set_etag(image_hash)
+    response.cache_control.public = True
+    response.cache_control.max_age = Config.IMAGE_CACHE_MAX_AGE
+    response.cache_control.immutable = True
+
+    return response.make_conditional(request, accept_ranges=True, complete_length=size)
@@ -1,13 +1,20 @@
 from flask import Blueprint, request, jsonify
 from middleware.auth_middleware import token_required, admin_required
 from models.order import OrderModel
-from datetime import datetime
+from models.cart import CartModel
+from models.inventory import InventoryModel, checkout_minutes
+from datetime import datetime, timezone, timedelta
 from bson import ObjectId
 import stripe
 import os
 from flask import current_app
 from flask_cors import cross_origin
 from services.email_service import email_service
+from models.email_outbox import EmailOutboxModel
+from utils.http_cache import make_etag, not_modified, apply_validators
+from utils.pricing import price_order, from_pence, PricingError
+from utils.helpers import normalize_email
+from config import Config
 
 
 
@@ -39,26 +46,50 @@ def create_order():
         # Get configurable shipping fee from environment (default 3.5 GBP)
         configurable_shipping_fee = float(os.getenv('SHIPPING_FEE_GBP', 3.5))
         
+        # Price every line from the catalog (one $in query); client amounts are only checked
+        try:
+            pricing = price_order(request.db, data['items'], configurable_shipping_fee, data.get('totalAmount'))
+        except PricingError as e:
+            current_app.logger.info(f'Order pricing rejected: {e.message}')
+            return jsonify({'error': e.message, **e.details}), e.status
+        
+        # Hold stock for every line in one bulk_write of conditional $inc updates
+        order_object_id = ObjectId()
+        reserved, shortages = InventoryModel.reserve(request.db, order_object_id, pricing['stockLines'])
+        if reserved is None:
+            current_app.logger.info(f'Order rejected, insufficient stock: {shortages}')
+            return jsonify({'error': 'Some items are out of stock', 'shortages': shortages}), 409
+        reservation = InventoryModel.reservation_for(reserved)
+        
         # Create order in database
         order_data = {
+            '_id': order_object_id,
+            'reservation': reservation,
             'userId': ObjectId(request.user_id),  # Ensure ObjectId
-            'items': data['items'],
-            'totalAmount': data['totalAmount'],
+            'items': pricing['items'],
+            'totalAmount': from_pence(pricing['subtotalPence']),
             'taxAmount': 0,  # VAT removed
-            'shippingCost': configurable_shipping_fee,  # Fixed shipping fee
-            'grandTotal': float(data['totalAmount']) + configurable_shipping_fee,  # Total + shipping
+            'shippingCost': from_pence(pricing['shippingPence']),  # Fixed shipping fee
+            'grandTotal': from_pence(pricing['grandTotalPence']),  # Total + shipping
+            'subtotalPence': pricing['subtotalPence'],
+            'shippingPence': pricing['shippingPence'],
+            'grandTotalPence': pricing['grandTotalPence'],
             'shippingAddress': data['shippingAddress'],
             'paymentMethod': 'stripe',  # Stripe only now
             'paymentStatus': 'pending',
             'orderStatus': 'pending',
             'createdAt': datetime.utcnow(),
             'updatedAt': datetime.utcnow(),
-            'customerEmail': data.get('customerEmail'),
+            'customerEmail': normalize_email(data.get('customerEmail')),
             'customerName': data.get('customerName', ''),
             'shippingFeeConfig': configurable_shipping_fee  # Store the shipping fee used
         }
         
-        order_id = OrderModel.create_order(request.db, order_data)
+        try:
+            order_id = OrderModel.create_order(request.db, order_data)
+        except Exception:
+            InventoryModel.release(request.db, reserved)
+            raise
         
         # REMOVED: COD logic - only Stripe payments now
         
@@ -66,11 +97,9 @@ def create_order():
         try:
             # Create line items for Stripe - FIXED unit_amount calculation
             line_items = []
-            for item in data['items']:
-                # Ensure price is in pence (lowest currency unit)
-                unit_amount = int(float(item['price']) * 100)
-                if unit_amount < 50:  # Stripe minimum is 50 cents/pence
-                    unit_amount = 50
+            for item in pricing['items']:
+                # Already in pence; Stripe's minimum applies to the session total, not each line
+                unit_amount = item['unitPricePence']
                 
                 line_items.append({
                     'price_data': {
@@ -87,7 +116,7 @@ def create_order():
                 })
             
             # Add fixed shipping cost
-            shipping_amount = int(configurable_shipping_fee * 100)
+            shipping_amount = pricing['shippingPence']
             if shipping_amount < 50:
                 shipping_amount = 50
             
@@ -107,6 +136,11 @@ def create_order():
             current_app.logger.info(f'Creating Stripe checkout with {len(line_items)} line items')
             current_app.logger.debug(f'Line items: {line_items}')
             
+            # Stripe measures its 30 minute minimum from session creation, so the
+            # expiry is taken now and the stock hold stretched to cover it
+            checkout_expires = datetime.utcnow() + timedelta(minutes=checkout_minutes())
+            InventoryModel.extend_hold(request.db, order_id, checkout_expires)
+            
             # Create Stripe Checkout Session
             checkout_session = stripe.checkout.Session.create(
                 payment_method_types=['card'],
@@ -115,6 +149,8 @@ def create_order():
                 success_url=f'{FRONTEND_URL}/order-success/{order_id}?session_id={{CHECKOUT_SESSION_ID}}',
                 cancel_url=f'{FRONTEND_URL}/checkout?canceled=true',
                 client_reference_id=str(order_id),
+                # The stock hold outlives the session by a short grace period
+                expires_at=int(checkout_expires.replace(tzinfo=timezone.utc).timestamp()),
                 customer_email=data.get('customerEmail'),
                 metadata={
                     'orderId': str(order_id),
@@ -160,7 +196,9 @@ def create_order():
                 'paymentStatus': 'pending',
                 'checkoutUrl': checkout_session.url,
                 'sessionId': checkout_session.id,
-                'shippingFee': configurable_shipping_fee
+                'shippingFee': configurable_shipping_fee,
+                'totalAmount': order_data['totalAmount'],
+                'grandTotal': order_data['grandTotal']
             }), 201
             
         except stripe.error.StripeError as stripe_error:
@@ -171,6 +209,7 @@ def create_order():
             
             # If Stripe fails, mark order as failed
             OrderModel.update_order_payment_status(request.db, order_id, 'failed')
+            InventoryModel.release_order(request.db, order_id, 'payment_failed')
             return jsonify({
                 'error': 'Payment processing failed',
                 'stripe_error': str(stripe_error),
@@ -187,8 +226,8 @@ def create_order():
 @orders_bp.route('/stats', methods=['GET'])
 def get_dashboard_stats():
     try:
-        days = int(request.args.get('days', 7))
-        stats = OrderModel.get_dashboard_stats(request.db)
+        days = min(max(int(request.args.get('days', 7)), 1), Config.DASHBOARD_MAX_DAYS)
+        stats = OrderModel.get_dashboard_stats(request.db, days)
         return jsonify(stats), 200
     except Exception as e:
         current_app.logger.error(f'Error fetching dashboard stats: {e}', exc_info=True)
@@ -239,6 +278,7 @@ def confirm_stripe_payment(order_id):
             # Update order status
             OrderModel.update_order_payment_status(request.db, order_id, 'completed')
             OrderModel.update_order_status(request.db, order_id, 'processing')
+            InventoryModel.commit_order(request.db, order_id)
             
             # Get customer details from Stripe
             customer = stripe.Customer.retrieve(session.customer) if session.customer else None
@@ -290,12 +330,10 @@ def stripe_webhook():
         if order_id:
             OrderModel.update_order_payment_status(request.db, order_id, 'completed')
             OrderModel.update_order_status(request.db, order_id, 'processing')
+            InventoryModel.commit_order(request.db, order_id)
             
             # Clear user's cart
-            request.db.users.update_one(
-                {'_id': ObjectId(user_id)},
-                {'$set': {'cart': []}}
-            )
+            CartModel.clear(request.db, CartModel.owner_for(user_id=user_id))
     
     elif event['type'] == 'checkout.session.expired':
         session = event['data']['object']
@@ -303,9 +341,36 @@ def stripe_webhook():
         
         if order_id:
             OrderModel.update_order_payment_status(request.db, order_id, 'failed')
+            InventoryModel.release_order(request.db, order_id, 'checkout_expired')
     
     return jsonify({'success': True}), 200
 
+@orders_bp.route('/mailgun/webhook', methods=['POST'])
+def mailgun_webhook():
+    """Per-recipient delivered/failed events, matched to outbox messages by ``outboxId``"""
+    payload = request.get_json(silent=True) or {}
+    if not email_service.verify_webhook(payload.get('signature')):
+        return jsonify({'error': 'Invalid signature'}), 400
+    
+    event_data = payload.get('event-data') or {}
+    event = event_data.get('event')
+    outbox_id = (event_data.get('user-variables') or {}).get('outboxId')
+    if event not in ('delivered', 'failed') or not outbox_id or not ObjectId.is_valid(outbox_id):
+        # Other events, and mail not sent through the outbox, are acknowledged and ignored
+        return jsonify({'success': True}), 200
+    
+    detail = None
+    if event == 'failed':
+        # Temporary failures are still being retried by Mailgun
+        if event_data.get('severity') == 'temporary':
+            event = 'deferred'
+        detail = (event_data.get('delivery-status') or {}).get('description') or event_data.get('reason')
+    
+    timestamp = event_data.get('timestamp')
+    occurred_at = datetime.utcfromtimestamp(float(timestamp)) if timestamp else datetime.utcnow()
+    EmailOutboxModel.record_delivery_event(request.db, ObjectId(outbox_id), event, occurred_at, detail)
+    return jsonify({'success': True}), 200
+
 # Add this method to update order status
 @orders_bp.route('/orders/<order_id>/status', methods=['PUT'])
 @token_required
@@ -343,17 +408,17 @@ def update_order_status(order_id):
             shipping_info=shipping_info
         )
         
-        # If order is shipped, send notification email (optional)
-        if data['status'] == 'shipped' and shipping_info:
+        # Cancelling an unpaid order gives its held stock back
+        if data['status'] == 'cancelled':
+            InventoryModel.release_order(request.db, order_id, 'cancelled')
+        
+        # Shipped/delivered notifications are queued and sent in batches
+        if data['status'] in ('shipped', 'delivered'):
             try:
-                # Get order details
-                order = request.db.orders.find_one({'_id': ObjectId(order_id)})
-                if order and order.get('customerEmail'):
-                    # Here you would implement email notification
-                    # Example: send_shipped_email(order, shipping_info)
-                    current_app.logger.info(f'Order {order_id} shipped with tracking {shipping_info.get("trackingNumber")}')
+                if email_service.queue_status_notification(request.db, order_id, data['status']):
+                    current_app.logger.info(f'Order {order_id} {data["status"]} notification queued')
             except Exception as email_error:
-                current_app.logger.error(f'Error logging shipment: {email_error}')
+                current_app.logger.error(f'Error queueing {data["status"]} notification: {email_error}')
         
         return jsonify({
             'message': 'Order status updated successfully',
@@ -387,18 +452,12 @@ def confirm_order_success(order_id):
             db = request.db
             
             # Update order payment status
-            db.orders.update_one(
-                {'_id': ObjectId(order_id)},
-                {
-                    '$set': {
-                        'paymentStatus': 'paid',
-                        'orderStatus': 'processing',
-                        'stripeSessionId': session_id,
-                        'stripePaymentIntentId': session.payment_intent,
-                        'updatedAt': datetime.utcnow()
-                    }
-                }
-            )
+            OrderModel.update_order_payment_status(db, order_id, 'paid', {
+                'stripeSessionId': session_id,
+                'stripePaymentIntentId': session.payment_intent
+            })
+            OrderModel.update_order_status(db, order_id, 'processing')
+            InventoryModel.commit_order(db, order_id)
             
             # Get user ID from order
             order = db.orders.find_one({'_id': ObjectId(order_id)})
@@ -406,18 +465,15 @@ def confirm_order_success(order_id):
             current_app.logger.info(f'Order {order_id} payment confirmed for user {user_id}')
             user = request.db.users.find_one({'_id': ObjectId(request.user_id)})
             if order and user:
-                email_sent = email_service.send_order_confirmation(order, user)
-                if email_sent:
-                    current_app.logger.info(f'Order confirmation email sent for order {order_id}')
+                # Queued only; repeated confirmations of the same order are deduplicated
+                if email_service.send_order_confirmation(db, order, user):
+                    current_app.logger.info(f'Order confirmation email queued for order {order_id}')
                 else:
-                    current_app.logger.error(f'Failed to send order confirmation email for order {order_id}')
+                    current_app.logger.error(f'Could not queue order confirmation email for order {order_id}')
 
             # Clear user's cart
             if user_id:
-                db.users.update_one(
-                    {'_id': ObjectId(user_id)},
-                    {'$set': {'cart': []}}
-                )
+                CartModel.clear(db, CartModel.owner_for(user_id=user_id))
             
             return jsonify({
                 'success': True,
@@ -454,6 +510,13 @@ def get_order_by_id(order_id):
         if str(order['userId']) != str(user_id) and not request.is_admin:
             return jsonify({'error': 'Unauthorized'}), 403
         
+        # Skip serialization entirely if the client's copy is current
+        last_modified = order.get('updatedAt')
+        etag = make_etag('order', order['_id'], last_modified)
+        unchanged = not_modified(etag, last_modified, private=True)
+        if unchanged:
+            return unchanged
+        
         # Convert to JSON-serializable format
         order['_id'] = str(order['_id'])
         order['userId'] = str(order['userId'])
@@ -473,7 +536,7 @@ def get_order_by_id(order_id):
             if date_field in order and isinstance(order[date_field], datetime):
                 order[date_field] = order[date_field].isoformat()
         
-        return jsonify(order), 200
+        return apply_validators(jsonify(order), etag, last_modified, private=True), 200
         
     except Exception as e:
         current_app.logger.error(f'Error fetching order: {e}')
@@ -1,21 +1,120 @@
 from flask import Blueprint, request, jsonify
+import json
 from middleware.auth_middleware import token_required, admin_required
 from models.product import ProductModel
 from models.category import CategoryModel
 from utils.validators import validate_product_data
-from utils.helpers import encode_image_to_base64, object_id_to_string
-import base64
+from utils.helpers import object_id_to_string
+from services.image_store import image_store
+from services.image_pipeline import image_pipeline
+from utils.catalog_cache import catalog_cache
+from services.suggest_index import suggest_index
+from config import Config
+from utils.http_cache import make_etag, not_modified, apply_validators
 
 products_bp = Blueprint('products', __name__)
 
 @products_bp.route('/products', methods=['GET'])
 def get_products():
+    # Listings only change when the catalog version does
+    etag = make_etag('products', catalog_cache.tag, request.query_string)
+    unchanged = not_modified(etag, catalog_cache.updated_at)
+    if unchanged:
+        return unchanged
+    
     category = request.args.get('category')
-    page = int(request.args.get('page', 1))
-    limit = int(request.args.get('limit', 20))
+    try:
+        limit = int(request.args.get('limit', 20))
+        page = int(request.args.get('page', 1))
+    except ValueError:
+        return jsonify({'error': 'Invalid page or limit parameter'}), 400
+    if page < 1 or limit < 1:
+        return jsonify({'error': 'page and limit must be at least 1'}), 400
+    
+    # Cursor mode: ?cursor= (empty for the first page) returns nextCursor
+    if 'cursor' in request.args:
+        try:
+            result = ProductModel.get_products_by_cursor(
+                request.db,
+                category,
+                cursor=request.args.get('cursor') or None,
+                limit=limit,
+                sort=request.args.get('sort', 'newest'),
+                include_total=request.args.get('includeTotal', 'false').lower() == 'true'
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return apply_validators(jsonify(result), etag, catalog_cache.updated_at), 200
+    
+    try:
+        result = ProductModel.get_all_products(request.db, category, page, limit, request.args.get('sort'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return apply_validators(jsonify(result), etag, catalog_cache.updated_at), 200
+
+@products_bp.route('/products/search', methods=['GET'])
+def search_products():
+    try:
+        min_price = request.args.get('minPrice')
+        max_price = request.args.get('maxPrice')
+        available = request.args.get('available')
+        page = int(request.args.get('page', 1))
+        limit = min(int(request.args.get('limit', 20)), 100)
+        if page < 1 or limit < 1:
+            return jsonify({'error': 'page and limit must be at least 1'}), 400
+        
+        result = ProductModel.search_products(
+            request.db,
+            q=request.args.get('q', '').strip() or None,
+            category=request.args.get('category'),
+            min_price=float(min_price) if min_price else None,
+            max_price=float(max_price) if max_price else None,
+            size=request.args.get('size'),
+            available=available.lower() == 'true' if available else None,
+            page=page,
+            limit=limit
+        )
+        return jsonify(result), 200
+    except ValueError:
+        return jsonify({'error': 'Invalid price, page or limit parameter'}), 400
+
+@products_bp.route('/products/suggest', methods=['GET'])
+def suggest_products():
+    """Typeahead suggestions from the in-memory prefix index"""
+    query = request.args.get('q', '')
+    try:
+        limit = max(1, min(int(request.args.get('limit', 8)), 20))
+    except ValueError:
+        return jsonify({'error': 'Invalid limit parameter'}), 400
+    
+    suggest_index.ensure_built(request.db)
+    return jsonify({
+        'query': query,
+        'suggestions': suggest_index.suggest(query, limit)
+    }), 200
+
+@products_bp.route('/products/batch', methods=['GET'])
+def get_products_batch():
+    """Fetch several products in one round trip: ?ids=a,b,c[&fields=name,price]"""
+    ids = [pid.strip() for pid in request.args.get('ids', '').split(',') if pid.strip()]
+    if not ids:
+        return jsonify({'error': 'ids is required'}), 400
+    if len(ids) > Config.PRODUCT_BATCH_MAX:
+        return jsonify({'error': f'At most {Config.PRODUCT_BATCH_MAX} ids per request'}), 400
+    
+    projection = None
+    fields = request.args.get('fields')
+    if fields:
+        projection = {field.strip(): 1 for field in fields.split(',') if field.strip()}
     
-    result = ProductModel.get_all_products(request.db, category, page, limit)
-    return jsonify(result), 200
+    found = ProductModel.get_products_by_ids(request.db, ids, projection)
+    
+    # Preserve the requested order and report ids that did not resolve
+    ordered_ids = list(dict.fromkeys(ids))
+    return jsonify({
+        'products': [found[pid] for pid in ordered_ids if pid in found],
+        'missing': [pid for pid in ordered_ids if pid not in found]
+    }), 200
 
 @products_bp.route('/products/<product_id>', methods=['GET'])
 def get_product(product_id):
@@ -23,7 +122,12 @@ def get_product(product_id):
     if not product:
         return jsonify({'error': 'Product not found'}), 404
     
-    return jsonify(product), 200
+    etag = make_etag('product', product['_id'], product.get('updatedAt'))
+    unchanged = not_modified(etag, product.get('updatedAt'))
+    if unchanged:
+        return unchanged
+    
+    return apply_validators(jsonify(product), etag, product.get('updatedAt')), 200
 
 @products_bp.route('/products', methods=['POST'])
 @token_required
@@ -43,12 +147,7 @@ def create_product():
             image_files = request.files.getlist('images')
             for image_file in image_files:
                 if image_file.filename:
-                    encoded_image = encode_image_to_base64(image_file)
-                    images.append({
-                        'data': encoded_image,
-                        'contentType': image_file.content_type,
-                        'filename': image_file.filename
-                    })
+                    images.append(image_store.save_upload(request.db, image_file))
         
         # Parse sizes if provided
         sizes = []
@@ -68,8 +167,16 @@ def create_product():
             'stock': int(data.get('stock', 0))
         }
         
+        # Per-size stock as JSON, e.g. {"S": 3, "M": 5}
+        if data.get('inventory'):
+            product_data['inventory'] = json.loads(data['inventory'])
+        
         product_id = ProductModel.create_product(request.db, product_data, images)
         
+        # Generate thumbnail/card/zoom derivatives in the background
+        for image in images:
+            image_pipeline.submit(request.db, product_id, image['hash'])
+        
         return jsonify({
             'message': 'Product created successfully',
             'productId': product_id
@@ -103,12 +210,7 @@ def update_product(product_id):
                 print(f"Found {len(image_files)} image files")
                 for image_file in image_files:
                     if image_file.filename:
-                        encoded_image = encode_image_to_base64(image_file)
-                        new_images.append({
-                            'data': encoded_image,
-                            'contentType': image_file.content_type,
-                            'filename': image_file.filename
-                        })
+                        new_images.append(image_store.save_upload(request.db, image_file))
             
             # Parse sizes if provided
             sizes = []
@@ -133,6 +235,8 @@ def update_product(product_id):
                 update_data['availability'] = data.get('availability', 'true').lower() == 'true'
             if 'stock' in data:
                 update_data['stock'] = int(data.get('stock', 0))
+            if data.get('inventory'):
+                update_data['inventory'] = json.loads(data['inventory'])
             
             # Handle images - ALWAYS preserve existing images unless explicitly replacing
             if new_images:
@@ -164,6 +268,11 @@ def update_product(product_id):
         # Update the product
         updated_product = ProductModel.update_product(request.db, product_id, update_data)
         
+        # Generate derivatives for freshly uploaded images
+        if request.content_type and 'multipart/form-data' in request.content_type:
+            for image in new_images:
+                image_pipeline.submit(request.db, product_id, image['hash'])
+        
         return jsonify({
             'message': 'Product updated successfully',
             'product': updated_product
@@ -177,8 +286,13 @@ def update_product(product_id):
 
 @products_bp.route('/categories', methods=['GET'])
 def get_categories():
+    etag = make_etag('categories', catalog_cache.tag)
+    unchanged = not_modified(etag, catalog_cache.updated_at)
+    if unchanged:
+        return unchanged
+    
     categories = CategoryModel.get_all_categories(request.db)
-    return jsonify(categories), 200
+    return apply_validators(jsonify(categories), etag, catalog_cache.updated_at), 200
 
 @products_bp.route('/categories', methods=['POST'])
 @token_required
@@ -3,6 +3,7 @@ from middleware.auth_middleware import token_required
 from models.user import UserModel
 from models.order import OrderModel
 from bson import ObjectId
+from utils.http_cache import make_etag, not_modified, apply_validators
 
 
 users_bp = Blueprint('users', __name__)
@@ -99,7 +100,17 @@ def get_user_orders():
     limit = int(request.args.get('limit', 10))
     
     orders = OrderModel.get_user_orders(request.db, request.user_id, page, limit)
-    return jsonify(orders), 200
+    
+    # The page is unchanged if its orders and the total are unchanged
+    etag = make_etag(
+        'user-orders', request.user_id, page, limit, orders['total'],
+        *[(order['_id'], order.get('updatedAt')) for order in orders['orders']]
+    )
+    unchanged = not_modified(etag, private=True)
+    if unchanged:
+        return unchanged
+    
+    return apply_validators(jsonify(orders), etag, private=True), 200
 
 @users_bp.route('/address/<address_id>', methods=['DELETE'])
 @token_required
@@ -11,6 +11,10 @@ import base64
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from services.image_store import image_store
+from models.sales_rollup import SalesRollupModel
+from models.product_sales import ProductSalesModel
+
 # Database configuration
 MONGO_URI = "mongodb://localhost:27017/ecommerce"
 DATABASE_NAME = "ecommerce"
@@ -35,7 +39,7 @@ class DatabaseSeeder:
     def clear_database(self):
         """Clear all collections (optional)"""
         print("Clearing existing data...")
-        collections = ['users', 'products', 'categories', 'orders']
+        collections = ['users', 'products', 'categories', 'orders', 'carts', 'sales_daily', 'product_sales_daily']
         for collection in collections:
             self.db[collection].delete_many({})
             print(f"  Cleared {collection}")
@@ -65,7 +69,6 @@ class DatabaseSeeder:
                         "name": "Admin User"
                     }
                 ],
-                "cart": [],
                 "wishlist": [],
                 "isAdmin": True,
                 "createdAt": datetime.utcnow(),
@@ -101,7 +104,6 @@ class DatabaseSeeder:
                         "name": "John Doe"
                     }
                 ],
-                "cart": [],
                 "wishlist": [],
                 "isAdmin": False,
                 "createdAt": datetime.utcnow(),
@@ -126,7 +128,6 @@ class DatabaseSeeder:
                         "name": "Jane Smith"
                     }
                 ],
-                "cart": [],
                 "wishlist": [],
                 "isAdmin": False,
                 "createdAt": datetime.utcnow(),
@@ -229,18 +230,10 @@ class DatabaseSeeder:
             print("  No categories found. Please seed categories first.")
             return []
         
-        # Sample images (base64 encoded 1x1 pixel PNG)
+        # Sample images (1x1 pixel PNG) stored in the image store
         sample_images = [
-            {
-                "data": create_base64_image(),
-                "contentType": "image/png",
-                "filename": "product1.png"
-            },
-            {
-                "data": create_base64_image(),
-                "contentType": "image/png",
-                "filename": "product2.png"
-            }
+            image_store.save(self.db, base64.b64decode(create_base64_image()), "image/png", "product1.png"),
+            image_store.save(self.db, base64.b64decode(create_base64_image()), "image/png", "product2.png")
         ]
         
         products = [
@@ -363,18 +356,25 @@ class DatabaseSeeder:
             }
         ]
         
-        inserted_products = []
+        # Check which products already exist in a single query
+        existing_names = {
+            p["name"] for p in self.db.products.find(
+                {"name": {"$in": [product["name"] for product in products]}},
+                {"name": 1}
+            )
+        }
+        
+        inserted_products = [product for product in products if product["name"] not in existing_names]
         for product in products:
-            # Check if product already exists
-            existing_product = self.db.products.find_one({"name": product["name"]})
-            if not existing_product:
-                result = self.db.products.insert_one(product)
-                product["_id"] = str(result.inserted_id)
-                inserted_products.append(product)
-                print(f"  Created product: {product['name']} (${product['price']})")
-            else:
+            if product["name"] in existing_names:
                 print(f"  Product already exists: {product['name']}")
         
+        if inserted_products:
+            result = self.db.products.insert_many(inserted_products)
+            for product, inserted_id in zip(inserted_products, result.inserted_ids):
+                product["_id"] = str(inserted_id)
+                print(f"  Created product: {product['name']} (${product['price']})")
+        
         print(f"Total products seeded: {self.db.products.count_documents({})}\n")
         return inserted_products
     
@@ -459,6 +459,10 @@ class DatabaseSeeder:
             orders.append(order)
             print(f"  Created order #{i+1}: ${order['totalAmount']} - Status: {order['orderStatus']}")
         
+        # Seeded orders bypass OrderModel, so rebuild the sales rollups from them
+        SalesRollupModel.rebuild(self.db)
+        ProductSalesModel.rebuild(self.db)
+        
         print(f"Total orders seeded: {self.db.orders.count_documents({})}\n")
         return orders
     
@@ -484,13 +488,19 @@ class DatabaseSeeder:
                 cart_items.append({
                     "productId": str(product["_id"]),
                     "quantity": random.randint(1, 3),
+                    "price": product["price"],
                     "addedAt": datetime.utcnow()
                 })
             
             if cart_items:
-                self.db.users.update_one(
-                    {"_id": user["_id"]},
-                    {"$set": {"cart": cart_items}}
+                now = datetime.utcnow()
+                self.db.carts.update_one(
+                    {"userId": user["_id"]},
+                    {
+                        "$set": {"items": cart_items, "updatedAt": now},
+                        "$setOnInsert": {"createdAt": now}
+                    },
+                    upsert=True
                 )
                 print(f"  Added {len(cart_items)} items to {user['email']}'s cart")
         
@@ -505,11 +515,9 @@ class DatabaseSeeder:
             "description": "High-quality wireless earbuds with noise cancellation and 30-hour battery life. Perfect for music lovers and professionals.",
             "price": 149.99,
             "category": "electronics",
-            "images": [{
-                "data": create_base64_image(),
-                "contentType": "image/png",
-                "filename": "earbuds.png"
-            }],
+            "images": [
+                image_store.save(self.db, base64.b64decode(create_base64_image()), "image/png", "earbuds.png")
+            ],
             "sizes": [],
             "availability": True,
             "stock": 75,
@@ -3,67 +3,260 @@ import logging
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 import requests
+import threading
+import time
+import hmac
+import hashlib
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bson import ObjectId
 import random
 from datetime import timedelta
+from config import Config
+from models.email_outbox import EmailOutboxModel
+from utils.circuit_breaker import CircuitBreaker
+from utils.metrics import metrics
+
+class MailgunUnavailable(Exception):
+    """Raised without calling Mailgun while its circuit breaker is open"""
 
 class EmailService:
-    """Mailgun email service for order notifications"""
+    """Mailgun email service for order notifications.
+
+    The ``send_*`` methods only queue a message in ``email_outbox`` and
+    return; ``services/email_worker.py`` delivers it through ``deliver``.
+    All Mailgun calls share one pooled keep-alive session and go through a
+    circuit breaker. Point ``MAILGUN_API_BASE`` at ``mailgun_stub.py`` to
+    exercise the whole path locally.
+    """
     
     def __init__(self):
         self.mailgun_domain = os.getenv('MAILGUN_DOMAIN')
         self.mailgun_api_key = os.getenv('MAILGUN_API_KEY')
-        self.mailgun_base_url = f"https://api.mailgun.net/v3/{self.mailgun_domain}"
+        self.mailgun_api_base = os.getenv('MAILGUN_API_BASE', 'https://api.mailgun.net/v3').rstrip('/')
+        self.mailgun_base_url = f"{self.mailgun_api_base}/{self.mailgun_domain}"
         self.from_email = os.getenv('MAIL_FROM', f'noreply@{self.mailgun_domain}')
         self.company_name = os.getenv('COMPANY_NAME', 'Kirtli London')
         self.frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:3000')
+        self.webhook_signing_key = os.getenv('MAILGUN_WEBHOOK_SIGNING_KEY')
         
         # Email template names
         self.template_order_confirmation = 'order conformation'
         self.template_order_shipped = 'order-shipped'
         self.template_order_delivered = 'order-delivered'
+        # Batched notices can only carry scalar variables, so they use their own templates
+        self.template_order_shipped_batch = os.getenv('MAILGUN_TEMPLATE_SHIPPED_BATCH', 'order-shipped-batch')
+        self.template_order_delivered_batch = os.getenv('MAILGUN_TEMPLATE_DELIVERED_BATCH', 'order-delivered-batch')
+        
+        # Set whenever a message is queued so idle workers pick it up at once
+        self.queued = threading.Event()
+        
+        self.timeout = (Config.MAILGUN_CONNECT_TIMEOUT, Config.MAILGUN_READ_TIMEOUT)
+        self.session = self._build_session()
+        self.breaker = CircuitBreaker(
+            'mailgun',
+            failure_threshold=Config.MAILGUN_BREAKER_FAILURES,
+            reset_timeout=Config.MAILGUN_BREAKER_RESET_SECONDS
+        )
         
         # Validate Mailgun configuration
         if not self.mailgun_domain or not self.mailgun_api_key:
             logging.warning("Mailgun configuration incomplete. Email service will not work.")
     
-    def _send_email(self, to_email: str, subject: str, template_name: str, 
-                   template_vars: Dict[str, Any]) -> bool:
+    @property
+    def configured(self) -> bool:
+        return bool(self.mailgun_domain and self.mailgun_api_key)
+    
+    def _build_session(self) -> requests.Session:
         """
-        Send email using Mailgun API
+        Keep-alive session sized for the email workers. Only failed connects
+        and 429/502/503 answers are retried here: Mailgun never accepted
+        those POSTs, so a retry cannot send a message twice. Read timeouts
+        and dropped responses may follow an accepted send, so they are left
+        to the outbox backoff along with everything else.
         """
-        if not self.mailgun_domain or not self.mailgun_api_key:
-            logging.error("Mailgun not configured")
-            return False
+        retry = Retry(
+            total=Config.MAILGUN_RETRIES,
+            connect=Config.MAILGUN_RETRIES,
+            status=Config.MAILGUN_RETRIES,
+            read=0,
+            other=0,
+            backoff_factor=Config.MAILGUN_RETRY_BACKOFF,
+            status_forcelist=(429, 502, 503),
+            allowed_methods=frozenset({'GET', 'POST'}),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=Config.MAILGUN_POOL_SIZE, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.auth = ('api', self.mailgun_api_key)
+        return session
+    
+    def available(self) -> bool:
+        """False while the breaker is open, so workers leave messages queued"""
+        return self.breaker.state != 'open'
+    
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Call Mailgun through the pooled session, the circuit breaker and metrics.
+        Network errors, 429 and 5xx count against the breaker.
+        """
+        if not self.breaker.allow():
+            metrics.increment('email.mailgun', rejected=1)
+            raise MailgunUnavailable(f'Mailgun circuit open, retry in {self.breaker.stats()["retryInSeconds"]}s')
         
+        started = time.perf_counter()
         try:
-            # Prepare email data
-            email_data = {
-                'from': f'{self.company_name} <{self.from_email}>',
-                'to': to_email,
-                'subject': subject,
-                'template': template_name,
-                'h:X-Mailgun-Variables': self._serialize_template_vars(template_vars)
-            }
-            
-            # Send request to Mailgun
-            response = requests.post(
-                f"{self.mailgun_base_url}/messages",
-                auth=('api', self.mailgun_api_key),
-                data=email_data,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                logging.info(f"Email sent successfully to {to_email}")
-                return True
-            else:
-                logging.error(f"Mailgun API error: {response.status_code} - {response.text}")
-                return False
-                
-        except Exception as e:
-            logging.error(f"Failed to send email: {str(e)}")
+            response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+        except requests.RequestException:
+            self.breaker.record_failure()
+            metrics.record('email.mailgun', time.perf_counter() - started, failure=1)
+            raise
+        
+        elapsed = time.perf_counter() - started
+        if response.status_code == 429 or response.status_code >= 500:
+            self.breaker.record_failure()
+            metrics.record('email.mailgun', elapsed, failure=1)
+        else:
+            self.breaker.record_success()
+            metrics.record('email.mailgun', elapsed, success=1)
+        return response
+    
+    def verify_webhook(self, signature: Dict[str, Any]) -> bool:
+        """
+        Check a webhook's ``signature`` block: an HMAC-SHA256 of timestamp
+        and token under the webhook signing key
+        """
+        if not self.webhook_signing_key or not isinstance(signature, dict):
             return False
+        expected = hmac.new(
+            self.webhook_signing_key.encode('utf-8'),
+            f"{signature.get('timestamp', '')}{signature.get('token', '')}".encode('utf-8'),
+            hashlib.sha256
+        ).hexdigest()
+        return hmac.compare_digest(expected, str(signature.get('signature', '')))
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'circuit': self.breaker.stats(),
+            'poolSize': Config.MAILGUN_POOL_SIZE,
+            'apiBase': self.mailgun_api_base
+        }
+    
+    def _send_email(self, db, dedupe_key: str, to_email: str, subject: str,
+                   template_name: str, template_vars: Dict[str, Any], batchable: bool = False) -> bool:
+        """
+        Queue an email in the outbox; returns False only when there is no recipient.
+        A message whose ``dedupe_key`` was already queued is not queued again.
+        Batchable messages wait ``EMAIL_BATCH_WINDOW_SECONDS`` so others can join them,
+        and their variables must all be scalars (see ``_flatten_for_batch``).
+        """
+        if not to_email:
+            logging.error(f"No recipient for email {dedupe_key}")
+            return False
+        if batchable:
+            nested = [name for name, value in template_vars.items() if isinstance(value, (dict, list))]
+            if nested:
+                raise ValueError(f"Batchable email {dedupe_key} has non-scalar variables: {', '.join(nested)}")
+        
+        message_id = EmailOutboxModel.enqueue(
+            db,
+            dedupe_key,
+            to_email,
+            subject,
+            template_name,
+            self._serialize_template_vars(template_vars),
+            batchable=batchable,
+            delay_seconds=Config.EMAIL_BATCH_WINDOW_SECONDS if batchable else 0
+        )
+        if message_id is None:
+            logging.info(f"Email {dedupe_key} already queued, skipping")
+        elif not batchable:
+            self.queued.set()
+        return True
+    
+    def deliver(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Send one outbox message through Mailgun.
+        Returns ``{'ok', 'providerId', 'error', 'permanent'}``; 4xx responses
+        other than 429 are permanent and will not be retried. The outbox id
+        rides along as ``v:outboxId`` so delivery events can be matched back.
+        """
+        return self._post_message({
+            'from': f'{self.company_name} <{self.from_email}>',
+            'to': message['to'],
+            'subject': message['subject'],
+            'template': message['template'],
+            'h:X-Mailgun-Variables': message['variables'],
+            'v:outboxId': str(message['_id'])
+        })
+    
+    def deliver_batch(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Send outbox messages that share a template as one Mailgun batch request.
+        
+        Each recipient's subject, outbox id and template variables travel in
+        ``recipient-variables``; ``X-Mailgun-Variables`` maps every variable to
+        its ``%recipient.<name>%`` placeholder. Mailgun returns one id for the
+        whole batch, so ``v:outboxId`` tags each recipient's copy and its
+        delivery events are tracked per message (``record_delivery_event``).
+        
+        Only scalars can be substituted per recipient. A message with a list
+        or object variable (one queued before the batch templates existed)
+        fails the batch as permanent, and the worker sends each on its own.
+        Recipients must be unique.
+        """
+        import json
+        
+        recipient_variables = {}
+        names = set()
+        for message in messages:
+            variables = json.loads(message['variables'])
+            nested = [name for name, value in variables.items() if isinstance(value, (dict, list))]
+            if nested:
+                return {
+                    'ok': False,
+                    'error': f"Message {message['_id']} cannot be batched, non-scalar variables: {', '.join(nested)}",
+                    'permanent': True
+                }
+            names.update(variables)
+            variables['subject'] = message['subject']
+            variables['outboxId'] = str(message['_id'])
+            recipient_variables[message['to']] = variables
+        
+        return self._post_message({
+            'from': f'{self.company_name} <{self.from_email}>',
+            'to': [message['to'] for message in messages],
+            'subject': '%recipient.subject%',
+            'template': messages[0]['template'],
+            'h:X-Mailgun-Variables': json.dumps({name: f'%recipient.{name}%' for name in sorted(names)}),
+            'v:outboxId': '%recipient.outboxId%',
+            'recipient-variables': json.dumps(recipient_variables)
+        })
+    
+    def _post_message(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            response = self._request('POST', f"{self.mailgun_base_url}/messages", data=email_data)
+        except MailgunUnavailable as e:
+            return {'ok': False, 'error': str(e), 'permanent': False}
+        except requests.RequestException as e:
+            return {'ok': False, 'error': f'Mailgun request failed: {e}', 'permanent': False}
+        
+        if response.status_code == 200:
+            try:
+                provider_id = response.json().get('id')
+            except ValueError:
+                provider_id = None
+            return {'ok': True, 'providerId': provider_id}
+        
+        permanent = 400 <= response.status_code < 500 and response.status_code != 429
+        return {
+            'ok': False,
+            'error': f'Mailgun API error: {response.status_code} - {response.text[:200]}',
+            'permanent': permanent
+        }
     
     def _serialize_template_vars(self, template_vars: Dict[str, Any]) -> str:
         """
@@ -85,10 +278,10 @@ class EmailService:
         
         return json.dumps(serializable_vars)
     
-    def send_order_confirmation(self, order_data: Dict[str, Any], 
+    def send_order_confirmation(self, db, order_data: Dict[str, Any], 
                                user_data: Optional[Dict[str, Any]] = None) -> bool:
         """
-        Send order confirmation email
+        Queue order confirmation email (once per order)
         """
         # Prepare template variables
         template_vars = self._prepare_order_confirmation_vars(order_data, user_data)
@@ -96,45 +289,77 @@ class EmailService:
         subject = f"Order Confirmation - #{template_vars['orderNumber']}"
         
         return self._send_email(
+            db,
+            dedupe_key=f"order-confirmation:{order_data['_id']}",
             to_email=template_vars['customerEmail'],
             subject=subject,
             template_name=self.template_order_confirmation,
             template_vars=template_vars
         )
     
-    def send_order_shipped(self, order_data: Dict[str, Any],
+    def send_order_shipped(self, db, order_data: Dict[str, Any],
                           shipping_info: Dict[str, Any],
                           user_data: Optional[Dict[str, Any]] = None) -> bool:
         """
-        Send order shipped notification email
+        Queue order shipped notification email (once per tracking number)
         """
-        template_vars = self._prepare_order_shipped_vars(order_data, shipping_info, user_data)
+        template_vars = self._flatten_for_batch(
+            self._prepare_order_shipped_vars(order_data, shipping_info, user_data)
+        )
         
         subject = f"Your Order Has Been Shipped - #{template_vars['orderNumber']}"
         
         return self._send_email(
+            db,
+            dedupe_key=f"order-shipped:{order_data['_id']}:{template_vars['trackingNumber']}",
             to_email=template_vars['customerEmail'],
             subject=subject,
-            template_name=self.template_order_shipped,
-            template_vars=template_vars
+            template_name=self.template_order_shipped_batch,
+            template_vars=template_vars,
+            batchable=True
         )
     
-    def send_order_delivered(self, order_data: Dict[str, Any],
+    def send_order_delivered(self, db, order_data: Dict[str, Any],
                             user_data: Optional[Dict[str, Any]] = None) -> bool:
         """
-        Send order delivered notification email
+        Queue order delivered notification email (once per order)
         """
-        template_vars = self._prepare_order_delivered_vars(order_data, user_data)
+        template_vars = self._flatten_for_batch(
+            self._prepare_order_delivered_vars(order_data, user_data)
+        )
         
         subject = f"Your Order Has Been Delivered - #{template_vars['orderNumber']}"
         
         return self._send_email(
+            db,
+            dedupe_key=f"order-delivered:{order_data['_id']}",
             to_email=template_vars['customerEmail'],
             subject=subject,
-            template_name=self.template_order_delivered,
-            template_vars=template_vars
+            template_name=self.template_order_delivered_batch,
+            template_vars=template_vars,
+            batchable=True
         )
     
+    def queue_status_notification(self, db, order_id: str, status: str) -> bool:
+        """
+        Queue the customer notification for an order that moved to shipped or
+        delivered. These are batchable, so a warehouse run of status updates
+        goes out as a few batch requests.
+        """
+        if status not in ('shipped', 'delivered'):
+            return False
+        order = db.orders.find_one({'_id': ObjectId(order_id)})
+        if not order:
+            return False
+        
+        user = None
+        if not order.get('customerEmail') and order.get('userId'):
+            user = db.users.find_one({'_id': order['userId']}, {'firstName': 1, 'lastName': 1, 'email': 1})
+        
+        if status == 'shipped':
+            return self.send_order_shipped(db, order, order.get('shippingInfo') or {}, user)
+        return self.send_order_delivered(db, order, user)
+    
     def _prepare_order_confirmation_vars(self, order_data: Dict[str, Any],
                                         user_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
@@ -262,6 +487,32 @@ class EmailService:
         
         return template_vars
     
+    def _flatten_for_batch(self, template_vars: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Replace the items list and address object with scalar variables
+        for the batch templates: ``itemCount``, ``itemSummary`` ("2 x Name
+        (variant), ..."), ``shippingName`` and a one-line ``shippingAddress``.
+        """
+        flat = {name: value for name, value in template_vars.items() if name not in ('items', 'shippingAddress')}
+        
+        items = template_vars.get('items') or []
+        lines = []
+        for item in items:
+            label = f"{item['name']} ({item['variant']})" if item.get('variant') else item['name']
+            lines.append(f"{item['quantity']} x {label}")
+        flat['itemCount'] = sum(item['quantity'] for item in items)
+        flat['itemSummary'] = ', '.join(lines)
+        
+        address = template_vars.get('shippingAddress') or {}
+        if isinstance(address, dict):
+            parts = [address.get(key) for key in ('street', 'city', 'state', 'zipCode', 'country')]
+            flat['shippingName'] = address.get('name', '')
+            flat['shippingAddress'] = ', '.join(part for part in parts if part)
+        else:
+            flat['shippingName'] = ''
+            flat['shippingAddress'] = str(address)
+        return flat
+    
     def _get_estimated_delivery_date(self, shipped: bool = False) -> str:
         """
         Calculate estimated delivery date
@@ -283,9 +534,9 @@ class EmailService:
         """
         Test Mailgun API connection
         """
-        service = EmailService()
+        service = email_service
         
-        if not service.mailgun_domain or not service.mailgun_api_key:
+        if not service.configured:
             return {
                 'status': 'error',
                 'message': 'Mailgun configuration missing'
@@ -293,11 +544,7 @@ class EmailService:
         
         try:
             # Test API by checking domain
-            response = requests.get(
-                f"https://api.mailgun.net/v3/domains/{service.mailgun_domain}",
-                auth=('api', service.mailgun_api_key),
-                timeout=5
-            )
+            response = service._request('GET', f"{service.mailgun_api_base}/domains/{service.mailgun_domain}")
             
             if response.status_code == 200:
                 return {
@@ -0,0 +1,101 @@
+import logging
+import threading
+import time
+from config import Config
+from models.email_outbox import EmailOutboxModel
+from services.email_service import email_service
+from utils.metrics import metrics
+
+
+class EmailWorker:
+    """Fixed pool of threads draining ``email_outbox``.
+
+    Each thread claims one message at a time, so at most ``EMAIL_WORKERS``
+    Mailgun calls are in flight and request threads never wait on Mailgun.
+    Idle threads sleep until a message is queued in this process or the
+    poll interval passes (messages queued elsewhere, retries coming due).
+    A batchable message is sent together with every other due message for
+    the same template, up to ``MAILGUN_BATCH_SIZE`` recipients per request.
+    """
+
+    def __init__(self):
+        self.size = Config.EMAIL_WORKERS
+        self.poll_interval = Config.EMAIL_POLL_INTERVAL
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self, db):
+        if self._threads:
+            return
+        if not email_service.configured:
+            logging.warning("Mailgun not configured; queued emails will wait in the outbox")
+            return
+        self._stop.clear()
+        for index in range(self.size):
+            thread = threading.Thread(target=self._run, args=(db, f'email-worker-{index}'), name=f'email-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logging.info(f"Email worker pool running with {self.size} threads")
+
+    def stop(self):
+        self._stop.set()
+        email_service.queued.set()
+        for thread in self._threads:
+            thread.join(timeout=self.poll_interval)
+        self._threads = []
+
+    def _run(self, db, name):
+        while not self._stop.is_set():
+            try:
+                if self.process_one(db, name):
+                    continue
+            except Exception as e:
+                logging.error(f"Email worker {name} failed: {e}")
+            # Nothing due: wait for a new message or the next poll
+            email_service.queued.wait(self.poll_interval)
+            email_service.queued.clear()
+
+    def process_one(self, db, name='email-worker'):
+        """Deliver one due message; returns False when nothing was due or Mailgun is down"""
+        if not email_service.available():
+            # Leave messages queued (and their attempts unspent) until the breaker lets a trial through
+            return False
+        message = EmailOutboxModel.claim(db, name)
+        if message is None:
+            return False
+
+        batch = [message]
+        if message.get('batchable'):
+            batch += EmailOutboxModel.claim_batch(
+                db, name, message['template'], Config.MAILGUN_BATCH_SIZE - 1, exclude_to=[message['to']]
+            )
+
+        started = time.perf_counter()
+        result = email_service.deliver(message) if len(batch) == 1 else email_service.deliver_batch(batch)
+        elapsed = time.perf_counter() - started
+
+        if result['ok']:
+            for sent in batch:
+                EmailOutboxModel.mark_sent(db, sent, result.get('providerId'))
+            metrics.record('email.outbox', elapsed, sent=len(batch), batches=int(len(batch) > 1))
+            logging.info(f"Email {message['dedupeKey']} sent to {len(batch)} recipient(s)")
+            return True
+
+        if len(batch) > 1 and result.get('permanent'):
+            # One bad recipient must not sink the rest: retry each on its own
+            EmailOutboxModel.unbatch(db, batch)
+            metrics.increment('email.outbox', unbatched=len(batch))
+            logging.error(f"Email batch of {len(batch)} rejected, sending individually: {result['error']}")
+            return True
+
+        dead = 0
+        for failed in batch:
+            status = EmailOutboxModel.mark_failed(db, failed, result['error'], permanent=result.get('permanent', False))
+            dead += int(status == 'dead')
+        metrics.record('email.outbox', elapsed, failed=len(batch), deadLettered=dead)
+        logging.error(f"Email {message['dedupeKey']} attempt {message['attempts']} failed for {len(batch)} recipient(s): {result['error']}")
+        return True
+
+
+# Create singleton instance
+email_worker = EmailWorker()
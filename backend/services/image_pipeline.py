@@ -0,0 +1,148 @@
+import io
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any
+from PIL import Image, ImageOps, features
+from config import Config
+from services.image_store import image_store
+from models.product import ProductModel
+
+# Fixed-size derivatives generated for every uploaded product image
+VARIANTS = {
+    'thumb': (150, 150),
+    'card': (400, 400),
+    'zoom': (1200, 1200)
+}
+
+def render_variants(data: bytes) -> Dict[str, Dict[str, Any]]:
+    """Resize one original into every variant (runs inside a worker process)"""
+    use_webp = features.check('webp')
+    image_format = 'WEBP' if use_webp else 'JPEG'
+    content_type = 'image/webp' if use_webp else 'image/jpeg'
+
+    source = Image.open(io.BytesIO(data))
+    source = ImageOps.exif_transpose(source)
+    if use_webp:
+        source = source.convert('RGBA' if source.mode in ('RGBA', 'LA', 'P') else 'RGB')
+    else:
+        source = source.convert('RGB')
+
+    save_options = {'quality': Config.IMAGE_VARIANT_QUALITY}
+    save_options.update({'method': 4} if use_webp else {'optimize': True})
+
+    rendered = {}
+    for name, size in VARIANTS.items():
+        variant = source.copy()
+        variant.thumbnail(size, Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        variant.save(buffer, format=image_format, **save_options)
+
+        rendered[name] = {
+            'data': buffer.getvalue(),
+            'contentType': content_type,
+            'width': variant.width,
+            'height': variant.height
+        }
+    return rendered
+
+
+class ImagePipeline:
+    """Generates thumbnail/card/zoom derivatives on a bounded process pool.
+
+    Uploads only enqueue work; the variant references are written back onto
+    the product's image entry once the worker finishes. When the queue is
+    full the job is dropped and can be backfilled with ``migrate_images.py``.
+    """
+
+    def __init__(self):
+        self.max_workers = Config.IMAGE_PIPELINE_WORKERS
+        self._slots = threading.BoundedSemaphore(Config.IMAGE_PIPELINE_QUEUE_SIZE)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn avoids forking a process that holds MongoClient sockets
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def submit(self, db, product_id: str, image_hash: str) -> bool:
+        """Queue derivative generation for one product image"""
+        # Same content already processed for another product
+        cached = db.image_variants.find_one({'_id': image_hash})
+        if cached:
+            ProductModel.set_image_variants(db, product_id, image_hash, cached['variants'])
+            return True
+
+        if not self._slots.acquire(blocking=False):
+            logging.warning(f"Image pipeline queue full, skipping variants for {image_hash}")
+            return False
+
+        try:
+            data = image_store.read(db, image_hash)
+            if data is None:
+                self._slots.release()
+                return False
+            future = self._get_executor().submit(render_variants, data)
+        except Exception as e:
+            self._slots.release()
+            logging.error(f"Failed to queue image variants for {image_hash}: {e}")
+            return False
+
+        future.add_done_callback(
+            lambda done: self._on_done(db, product_id, image_hash, done)
+        )
+        return True
+
+    def process_now(self, db, product_id: str, image_hash: str) -> bool:
+        """Generate variants synchronously (used by the backfill script)"""
+        cached = db.image_variants.find_one({'_id': image_hash})
+        if cached:
+            ProductModel.set_image_variants(db, product_id, image_hash, cached['variants'])
+            return True
+
+        data = image_store.read(db, image_hash)
+        if data is None:
+            return False
+        self._store(db, product_id, image_hash, render_variants(data))
+        return True
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def _on_done(self, db, product_id, image_hash, future):
+        try:
+            self._store(db, product_id, image_hash, future.result())
+        except Exception as e:
+            logging.error(f"Image variant generation failed for {image_hash}: {e}")
+        finally:
+            self._slots.release()
+
+    def _store(self, db, product_id, image_hash, rendered):
+        variants = {}
+        for name, variant in rendered.items():
+            reference = image_store.save(db, variant['data'], variant['contentType'], f"{image_hash}-{name}")
+            reference['width'] = variant['width']
+            reference['height'] = variant['height']
+            variants[name] = reference
+
+        db.image_variants.update_one(
+            {'_id': image_hash},
+            {'$set': {'variants': variants}},
+            upsert=True
+        )
+        ProductModel.set_image_variants(db, product_id, image_hash, variants)
+
+
+# Create singleton instance
+image_pipeline = ImagePipeline()
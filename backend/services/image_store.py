@@ -0,0 +1,127 @@
+import os
+import json
+import hashlib
+import logging
+from typing import Dict, Any, Optional, Tuple, BinaryIO
+import gridfs
+from config import Config
+
+
+class ImageStore:
+    """Content-addressed blob store for product images.
+
+    Blobs are keyed by the SHA-256 of their bytes, so uploading the same file
+    twice stores it once. Product documents only keep the small reference
+    returned by ``save`` and the bytes are served by ``GET /api/images/<hash>``.
+    """
+
+    def __init__(self):
+        self.backend = Config.IMAGE_STORE_BACKEND
+        self.root = Config.IMAGE_STORE_PATH
+        self.bucket_name = 'images'
+
+        if self.backend not in ('gridfs', 'filesystem'):
+            logging.warning(f"Unknown IMAGE_STORE_BACKEND '{self.backend}', falling back to gridfs")
+            self.backend = 'gridfs'
+
+    @staticmethod
+    def compute_hash(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def make_reference(image_hash: str, content_type: str, filename: str, size: int) -> Dict[str, Any]:
+        """Small image reference embedded in product documents"""
+        return {
+            'hash': image_hash,
+            'contentType': content_type,
+            'filename': filename,
+            'size': size
+        }
+
+    @staticmethod
+    def pick_variant(image: Optional[Dict[str, Any]], variant: str) -> Optional[Dict[str, Any]]:
+        """Return the reference for ``variant`` of an image, or the original if not generated yet"""
+        if not image:
+            return image
+        variants = image.get('variants') or {}
+        return variants.get(variant, image)
+
+    def save(self, db, data: bytes, content_type: str, filename: str = '') -> Dict[str, Any]:
+        """Store raw image bytes (deduplicated) and return the reference"""
+        image_hash = self.compute_hash(data)
+        content_type = content_type or 'application/octet-stream'
+
+        if not self.exists(db, image_hash):
+            if self.backend == 'filesystem':
+                self._save_file(image_hash, data, content_type, filename)
+            else:
+                bucket = gridfs.GridFSBucket(db, bucket_name=self.bucket_name)
+                try:
+                    bucket.upload_from_stream_with_id(
+                        image_hash,
+                        filename or image_hash,
+                        data,
+                        metadata={'contentType': content_type}
+                    )
+                except gridfs.errors.FileExists:
+                    # Another worker stored the same content concurrently
+                    pass
+
+        return self.make_reference(image_hash, content_type, filename, len(data))
+
+    def save_upload(self, db, image_file) -> Dict[str, Any]:
+        """Store a werkzeug FileStorage upload"""
+        return self.save(db, image_file.read(), image_file.content_type, image_file.filename)
+
+    def exists(self, db, image_hash: str) -> bool:
+        if self.backend == 'filesystem':
+            return os.path.exists(self._path(image_hash))
+        return db[f'{self.bucket_name}.files'].count_documents({'_id': image_hash}, limit=1) > 0
+
+    def open(self, db, image_hash: str) -> Optional[Tuple[BinaryIO, int, str]]:
+        """Return ``(seekable file object, size, content type)`` or None"""
+        if self.backend == 'filesystem':
+            path = self._path(image_hash)
+            if not os.path.exists(path):
+                return None
+            with open(f'{path}.json') as meta_file:
+                meta = json.load(meta_file)
+            return open(path, 'rb'), os.path.getsize(path), meta.get('contentType', 'application/octet-stream')
+
+        bucket = gridfs.GridFSBucket(db, bucket_name=self.bucket_name)
+        try:
+            grid_out = bucket.open_download_stream(image_hash)
+        except gridfs.errors.NoFile:
+            return None
+        content_type = (grid_out.metadata or {}).get('contentType', 'application/octet-stream')
+        return grid_out, grid_out.length, content_type
+
+    def read(self, db, image_hash: str) -> Optional[bytes]:
+        opened = self.open(db, image_hash)
+        if not opened:
+            return None
+        fileobj = opened[0]
+        try:
+            return fileobj.read()
+        finally:
+            fileobj.close()
+
+    def _path(self, image_hash: str) -> str:
+        # Fan out into sub-directories so no single directory gets huge
+        return os.path.join(self.root, image_hash[:2], image_hash[2:4], image_hash)
+
+    def _save_file(self, image_hash: str, data: bytes, content_type: str, filename: str):
+        path = self._path(image_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temp file and rename so readers never see partial blobs
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as blob_file:
+            blob_file.write(data)
+        with open(f'{path}.json', 'w') as meta_file:
+            json.dump({'contentType': content_type, 'filename': filename}, meta_file)
+        os.replace(tmp_path, path)
+
+
+# Create singleton instance
+image_store = ImageStore()
@@ -0,0 +1,131 @@
+import time
+import logging
+import statistics
+import bcrypt
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from config import Config
+from utils.helpers import hash_password, verify_password, password_cost
+from utils.metrics import metrics
+
+
+def measure_hash_ms(cost, samples=3):
+    """Median milliseconds for one bcrypt hash at ``cost`` on this host"""
+    salt = bcrypt.gensalt(cost)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        bcrypt.hashpw(b'calibration-password', salt)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+class HasherBusy(Exception):
+    """The bcrypt pool is saturated; the caller should answer 503 and retry later"""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a small dedicated process pool.
+
+    Request threads hand hashing off and wait for it, but at most
+    ``AUTH_HASH_QUEUE_SIZE`` operations may be running or waiting at once;
+    beyond that ``HasherBusy`` is raised immediately instead of letting a
+    login burst tie up every waitress thread. bcrypt's CPU time is spent in
+    the worker processes, away from the threads serving catalog reads.
+
+    New hashes use ``cost``, fixed by ``AUTH_HASH_COST`` or picked by
+    ``calibrate`` at startup; stored hashes below that cost are rehashed on
+    the next successful login. Costs only ever move up: calibration varies
+    a little between hosts and restarts, and a stronger hash is never
+    replaced by a weaker one.
+    """
+
+    def __init__(self):
+        self.cost = Config.AUTH_HASH_COST or 12
+        self.max_workers = Config.AUTH_HASH_WORKERS
+        self.timeout = Config.AUTH_HASH_TIMEOUT
+        self._slots = threading.BoundedSemaphore(Config.AUTH_HASH_QUEUE_SIZE)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn avoids forking a process that holds MongoClient sockets
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def _run(self, operation, function, *args):
+        if not self._slots.acquire(blocking=False):
+            metrics.increment('auth.bcrypt', rejected=1)
+            raise HasherBusy('Too many sign-in requests, please try again shortly')
+
+        started = time.perf_counter()
+        try:
+            future = self._get_executor().submit(function, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # The slot is freed when the work finishes, even if the caller gave up waiting
+        future.add_done_callback(lambda done: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            metrics.increment('auth.bcrypt', timedOut=1)
+            raise HasherBusy('Sign-in is taking too long, please try again shortly')
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool on the next call
+            with self._lock:
+                self._executor = None
+            logging.error("Password hasher pool broke, restarting it")
+            raise HasherBusy('Sign-in is temporarily unavailable, please try again shortly')
+        finally:
+            metrics.record(f'auth.bcrypt.{operation}', time.perf_counter() - started)
+
+    def calibrate(self, target_ms=None):
+        """Pick the highest cost whose hash time fits ``target_ms`` on this host.
+
+        One cost step doubles the work, so timing the minimum cost is enough
+        to extrapolate the rest.
+        """
+        if Config.AUTH_HASH_COST:
+            self.cost = Config.AUTH_HASH_COST
+            logging.info(f"bcrypt cost fixed at {self.cost}")
+            return self.cost
+
+        target_ms = target_ms or Config.AUTH_HASH_TARGET_MS
+        base_cost = Config.AUTH_HASH_MIN_COST
+        base_ms = measure_hash_ms(base_cost)
+        cost = base_cost
+        while cost < Config.AUTH_HASH_MAX_COST and base_ms * 2 ** (cost + 1 - base_cost) <= target_ms:
+            cost += 1
+        self.cost = cost
+        logging.info(f"bcrypt cost calibrated to {cost} (~{base_ms * 2 ** (cost - base_cost):.0f} ms, target {target_ms} ms)")
+        return cost
+
+    def needs_rehash(self, hashed):
+        cost = password_cost(hashed)
+        return cost is not None and cost < self.cost
+
+    def hash(self, password):
+        return self._run('hash', hash_password, password, self.cost)
+
+    def verify(self, password, hashed):
+        return self._run('verify', verify_password, password, hashed)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+                logging.info("Password hasher pool stopped")
+
+
+# Create singleton instance
+password_hasher = PasswordHasher()
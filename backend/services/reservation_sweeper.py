@@ -0,0 +1,44 @@
+import logging
+import threading
+from config import Config
+from models.inventory import InventoryModel
+
+
+class ReservationSweeper:
+    """Background thread that releases stock held by abandoned checkouts.
+
+    Stripe's ``checkout.session.expired`` webhook normally releases a hold;
+    this catches the ones whose webhook never arrives.
+    """
+
+    def __init__(self):
+        self.interval = Config.RESERVATION_SWEEP_INTERVAL
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, db):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(db,), name='reservation-sweeper', daemon=True)
+        self._thread.start()
+        logging.info(f"Reservation sweeper running every {self.interval}s")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+
+    def _run(self, db):
+        while not self._stop.wait(self.interval):
+            try:
+                released = InventoryModel.release_expired(db)
+                if released:
+                    logging.info(f"Released {released} expired stock reservations")
+            except Exception as e:
+                logging.error(f"Reservation sweep failed: {e}")
+
+
+# Create singleton instance
+reservation_sweeper = ReservationSweeper()
@@ -0,0 +1,187 @@
+import re
+import bisect
+import logging
+import threading
+import string
+from typing import Dict, Any, List
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+# Characters tried when generating one-edit typo variants
+_ALPHABET = string.ascii_lowercase + string.digits
+
+def normalize(text: str) -> str:
+    return _NON_WORD.sub(' ', (text or '').lower()).strip()
+
+
+class SuggestIndex:
+    """In-memory typeahead index over product names and categories.
+
+    Keys are the normalized name starting at every word boundary, kept in one
+    sorted list so a prefix lookup is two bisects. Products are added and
+    replaced incrementally as they are created or edited, and their
+    popularity (``unitsSold``) follows sales through ``record_sales``.
+    """
+
+    def __init__(self, max_scan=200):
+        self.max_scan = max_scan
+        self._keys = []        # sorted list of (key, entry_id)
+        self._entries = {}     # entry_id -> suggestion dict
+        self._entry_keys = {}  # entry_id -> keys it was indexed under
+        self._category_counts = {}
+        self._lock = threading.RLock()
+        self.built = False
+
+    def build(self, db):
+        """(Re)build the index from db.products"""
+        products = db.products.find({}, {'name': 1, 'category': 1, 'unitsSold': 1})
+        with self._lock:
+            self.built = False
+            self._keys = []
+            self._entries = {}
+            self._entry_keys = {}
+            self._category_counts = {}
+            for product in products:
+                self._add_product(product)
+            self._keys.sort()
+            self.built = True
+        logging.info(f"Suggest index built with {len(self._entries)} entries")
+
+    def ensure_built(self, db):
+        if not self.built:
+            self.build(db)
+
+    def upsert_product(self, product: Dict[str, Any]):
+        """Index a created/updated product, replacing its previous keys"""
+        if not self.built:
+            return
+        with self._lock:
+            entry_id = f"product:{product['_id']}"
+            old = self._entries.get(entry_id)
+            if old:
+                self._change_category(old['category'], -1)
+            self._remove(entry_id)
+            for key in self._add_product(product):
+                bisect.insort(self._keys, (key, entry_id))
+
+    def record_sales(self, units_by_product: Dict[str, int]):
+        """Add sold units to the products' popularity; no rebuild or re-sort needed"""
+        if not self.built:
+            return
+        with self._lock:
+            for product_id, units in units_by_product.items():
+                entry = self._entries.get(f"product:{product_id}")
+                if entry:
+                    entry['popularity'] += units
+
+    def suggest(self, query: str, limit: int = 8) -> List[Dict[str, Any]]:
+        term = normalize(query)
+        if not term:
+            return []
+
+        with self._lock:
+            matches = self._prefix_matches(term)
+            # Light typo tolerance: only when exact prefixes are scarce
+            if len(matches) < limit and len(term) >= 3:
+                for variant in self._edit_variants(term):
+                    for entry_id in self._prefix_matches(variant):
+                        matches.setdefault(entry_id, 1)
+                    if len(matches) >= self.max_scan:
+                        break
+            ranked = sorted(
+                matches.items(),
+                key=lambda item: (item[1], -self._entries[item[0]]['popularity'], self._entries[item[0]]['name'])
+            )
+            return [dict(self._entries[entry_id]) for entry_id, _ in ranked[:limit]]
+
+    def _prefix_matches(self, prefix):
+        """entry_id -> 0 for entries with a key starting with ``prefix``"""
+        matches = {}
+        start = bisect.bisect_left(self._keys, (prefix,))
+        for key, entry_id in self._keys[start:start + self.max_scan]:
+            if not key.startswith(prefix):
+                break
+            matches[entry_id] = 0
+        return matches
+
+    @staticmethod
+    def _edit_variants(term):
+        """All strings one deletion, insertion, transposition or substitution away"""
+        variants = set()
+        for i in range(len(term) + 1):
+            for char in _ALPHABET:
+                variants.add(term[:i] + char + term[i:])
+            if i == len(term):
+                break
+            variants.add(term[:i] + term[i + 1:])
+            if i + 1 < len(term):
+                variants.add(term[:i] + term[i + 1] + term[i] + term[i + 2:])
+            for char in _ALPHABET:
+                variants.add(term[:i] + char + term[i + 1:])
+        variants.discard(term)
+        return [variant for variant in variants if len(variant) >= 2]
+
+    @staticmethod
+    def _word_keys(text):
+        words = normalize(text).split()
+        return {' '.join(words[i:]) for i in range(len(words))}
+
+    def _add_product(self, product):
+        """Register a product entry and return the keys it needs (caller inserts them)"""
+        entry_id = f"product:{product['_id']}"
+        category = product.get('category', '')
+        self._entries[entry_id] = {
+            'type': 'product',
+            'id': str(product['_id']),
+            'name': product.get('name', ''),
+            'category': category,
+            'popularity': product.get('unitsSold', 0) or 0
+        }
+        keys = self._word_keys(product.get('name', ''))
+        self._entry_keys[entry_id] = keys
+        if not self.built:
+            # Initial build sorts once at the end
+            self._keys.extend((key, entry_id) for key in keys)
+        self._change_category(category, 1)
+        return keys if self.built else []
+
+    def _change_category(self, category, delta):
+        if not category:
+            return
+        entry_id = f"category:{category}"
+        count = self._category_counts.get(category, 0) + delta
+        if count <= 0:
+            self._category_counts.pop(category, None)
+            self._remove(entry_id)
+            return
+
+        self._category_counts[category] = count
+        if entry_id in self._entries:
+            self._entries[entry_id]['popularity'] = count
+            return
+
+        self._entries[entry_id] = {
+            'type': 'category',
+            'id': category,
+            'name': category,
+            'category': category,
+            'popularity': count
+        }
+        keys = self._word_keys(category)
+        self._entry_keys[entry_id] = keys
+        for key in keys:
+            if self.built:
+                bisect.insort(self._keys, (key, entry_id))
+            else:
+                self._keys.append((key, entry_id))
+
+    def _remove(self, entry_id):
+        for key in self._entry_keys.pop(entry_id, ()):
+            index = bisect.bisect_left(self._keys, (key, entry_id))
+            if index < len(self._keys) and self._keys[index] == (key, entry_id):
+                del self._keys[index]
+        self._entries.pop(entry_id, None)
+
+
+# Create singleton instance
+suggest_index = SuggestIndex()
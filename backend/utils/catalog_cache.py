@@ -0,0 +1,76 @@
+import threading
+import uuid
+from datetime import datetime
+from utils.cache import TTLCache
+from config import Config
+
+class CatalogCache:
+    """In-process cache for catalog reads with version-based invalidation.
+
+    Every catalog write bumps ``version``. List-style entries (product pages,
+    counts, searches) include the version in their key, so a write makes all
+    of them unreachable at once and they simply age out of the LRU. Single
+    products and the category list are invalidated by key. Cached values are
+    shared between requests and must be treated as read-only.
+
+    Listing ETags are built from ``tag``, which adds a per-start nonce to the
+    version, so a tag issued before a restart (or by another process) never
+    revalidates. Only writes made through this process bump the version:
+    after writing to the catalog out of process (seed_data.py,
+    migrate_images.py, rebuild_sales_rollup.py, manual edits) restart the app.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.boot_id = uuid.uuid4().hex[:12]
+        self.version = 1
+        self.updated_at = datetime.utcnow()
+        self.lists = TTLCache(maxsize=Config.CATALOG_CACHE_SIZE, ttl=Config.CATALOG_CACHE_TTL)
+        self.products = TTLCache(maxsize=Config.CATALOG_CACHE_SIZE, ttl=Config.CATALOG_CACHE_TTL)
+        self.categories = TTLCache(maxsize=16, ttl=Config.CATALOG_CACHE_TTL)
+
+    def bump(self):
+        with self._lock:
+            self.version += 1
+            self.updated_at = datetime.utcnow()
+            return self.version
+
+    @property
+    def tag(self):
+        return f'{self.boot_id}.{self.version}'
+
+    def list_key(self, *parts):
+        return (self.version,) + parts
+
+    def set_if_current(self, cache, key, value, version):
+        """Store ``value`` unless a write happened since ``version`` was read"""
+        if version == self.version:
+            cache.set(key, value)
+
+    def invalidate_product(self, product_id=None):
+        """A product was created or changed: drop it and every listing"""
+        if product_id:
+            self.products.delete(str(product_id))
+        self.bump()
+
+    def evict_products(self, product_ids):
+        """Drop single-product entries only; listings and their ETags stay valid"""
+        for product_id in product_ids:
+            self.products.delete(str(product_id))
+
+    def invalidate_categories(self):
+        self.categories.clear()
+        self.bump()
+
+    def stats(self):
+        return {
+            'version': self.version,
+            'tag': self.tag,
+            'lists': self.lists.stats(),
+            'products': self.products.stats(),
+            'categories': self.categories.stats()
+        }
+
+
+# Create singleton instance
+catalog_cache = CatalogCache()
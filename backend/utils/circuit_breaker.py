@@ -0,0 +1,72 @@
+import time
+import threading
+
+class CircuitBreaker:
+    """Fail fast while a dependency is unhealthy.
+
+    ``closed``: calls go through and consecutive failures are counted.
+    ``open``: after ``failure_threshold`` failures calls are refused for
+    ``reset_timeout`` seconds. ``half_open``: then one trial call is let
+    through; success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._times_opened = 0
+
+    def allow(self):
+        """True when a call may be attempted now"""
+        with self._lock:
+            if self._state == 'closed':
+                return True
+            if self._state == 'open':
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = 'half_open'
+                self._trial_in_flight = False
+            # Half open: a single trial call at a time
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = 'closed'
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == 'half_open' or self._failures >= self.failure_threshold:
+                if self._state != 'open':
+                    self._times_opened += 1
+                self._state = 'open'
+                self._opened_at = time.monotonic()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == 'open' and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half_open'
+            return self._state
+
+    def stats(self):
+        state = self.state
+        with self._lock:
+            return {
+                'name': self.name,
+                'state': state,
+                'consecutiveFailures': self._failures,
+                'timesOpened': self._times_opened,
+                'retryInSeconds': round(max(self.reset_timeout - (time.monotonic() - self._opened_at), 0), 1) if state == 'open' else 0
+            }
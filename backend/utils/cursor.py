@@ -0,0 +1,20 @@
+from bson import ObjectId, json_util
+import base64
+
+def encode_cursor(sort, value, last_id):
+    """Opaque cursor pointing just after (value, _id) in the given sort"""
+    raw = json_util.dumps({'s': sort, 'v': value, 'id': last_id})
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Decode and validate a cursor; anything malformed raises ValueError (a 400)"""
+    try:
+        position = json_util.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if (not isinstance(position, dict)
+            or not {'s', 'v', 'id'} <= position.keys()
+            or not isinstance(position['id'], str)
+            or not ObjectId.is_valid(position['id'])):
+        raise ValueError('Invalid cursor')
+    return position
@@ -5,11 +5,22 @@ from config import Config
 import base64
 from bson import ObjectId
 
-def hash_password(password):
-    salt = bcrypt.gensalt()
+def hash_password(password, rounds=None):
+    salt = bcrypt.gensalt(rounds or Config.AUTH_HASH_COST or 12)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
+def password_cost(hashed):
+    """Work factor of a bcrypt hash ('$2b$12$...' -> 12), or None if unrecognized"""
+    parts = (hashed or '').split('$')
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+def normalize_email(email):
+    """Trimmed, lowercased address as stored on orders, or None"""
+    return (email or '').strip().lower() or None
+
 def verify_password(password, hashed):
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
@@ -0,0 +1,44 @@
+from flask import request, current_app
+from datetime import datetime, timezone
+import hashlib
+
+def make_etag(*parts):
+    """Build an ETag value from the parts that identify a representation"""
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+def _as_utc(value):
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    # HTTP dates have second precision
+    return value.replace(microsecond=0)
+
+def apply_validators(response, etag, last_modified=None, private=False):
+    """Attach ETag/Last-Modified and ask clients to revalidate before reuse"""
+    response.set_etag(etag)
+    if isinstance(last_modified, datetime):
+        response.last_modified = _as_utc(last_modified)
+    response.cache_control.no_cache = True
+    if private:
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+    return response
+
+def not_modified(etag, last_modified=None, private=False):
+    """Return a 304 response when the request's validators still match, else None.
+
+    Call this before serializing the payload so unchanged resources cost
+    neither JSON encoding nor bandwidth.
+    """
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(etag)
+    elif isinstance(last_modified, datetime) and request.if_modified_since:
+        matched = _as_utc(last_modified) <= _as_utc(request.if_modified_since)
+    else:
+        matched = False
+
+    if not matched:
+        return None
+    return apply_validators(current_app.response_class(status=304), etag, last_modified, private)
@@ -0,0 +1,71 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+class LatencyMetrics:
+    """Named latency recorders: counts, totals and percentiles over recent samples"""
+
+    def __init__(self, window=500):
+        self.window = window
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _get_series(self, name):
+        return self._series.setdefault(name, {
+            'count': 0,
+            'totalMs': 0.0,
+            'maxMs': 0.0,
+            'samples': deque(maxlen=self.window),
+            'counters': {}
+        })
+
+    def increment(self, name, **counters):
+        """Bump counters without recording a latency sample"""
+        with self._lock:
+            series = self._get_series(name)
+            for counter, value in counters.items():
+                series['counters'][counter] = series['counters'].get(counter, 0) + value
+
+    def record(self, name, seconds, **counters):
+        with self._lock:
+            series = self._get_series(name)
+            ms = seconds * 1000
+            series['count'] += 1
+            series['totalMs'] += ms
+            series['maxMs'] = max(series['maxMs'], ms)
+            series['samples'].append(ms)
+            for counter, value in counters.items():
+                series['counters'][counter] = series['counters'].get(counter, 0) + value
+
+    @contextmanager
+    def timed(self, name, **counters):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started, **counters)
+
+    def snapshot(self, prefix=''):
+        with self._lock:
+            report = {}
+            for name, series in self._series.items():
+                if not name.startswith(prefix):
+                    continue
+                samples = sorted(series['samples'])
+                if not samples:
+                    report[name] = {'count': 0, **series['counters']}
+                    continue
+                report[name] = {
+                    'count': series['count'],
+                    'avgMs': round(series['totalMs'] / series['count'], 3),
+                    'p50Ms': round(samples[len(samples) // 2], 3),
+                    'p95Ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+                    'maxMs': round(series['maxMs'], 3),
+                    **series['counters']
+                }
+            return report
+
+
+# Create singleton instance
+metrics = LatencyMetrics()
@@ -0,0 +1,125 @@
+from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
+from models.product import ProductModel
+from models.inventory import InventoryModel
+from config import Config
+
+# Only what pricing needs from each product
+PRICING_PROJECTION = {'name': 1, 'price': 1, 'availability': 1, 'inventory': 1}
+
+class PricingError(Exception):
+    """The basket cannot be priced; ``details`` is returned to the client"""
+
+    def __init__(self, message, status=400, **details):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.details = details
+
+def to_pence(amount):
+    """Convert a GBP amount (float, str or Decimal) to integer pence"""
+    try:
+        pounds = Decimal(str(amount))
+    except (InvalidOperation, ValueError):
+        raise PricingError(f'Invalid amount: {amount}')
+    return int((pounds * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+def from_pence(pence):
+    return float(Decimal(pence) / 100)
+
+def price_order(db, items, shipping_fee, expected_total=None):
+    """Price a basket from the catalog, never from client-supplied amounts.
+
+    Every product is loaded with a single $in query. Prices the client saw
+    (``item['price']`` and ``expected_total``) are only compared, and any
+    mismatch raises a 409 PricingError listing the current prices so the
+    client can refresh. All arithmetic is in integer pence.
+    """
+    if len(items) > Config.PRODUCT_BATCH_MAX:
+        raise PricingError(f'At most {Config.PRODUCT_BATCH_MAX} lines per order')
+    
+    quantities = {}
+    client_prices = {}
+    for item in items:
+        try:
+            product_id = str(item['productId'])
+            quantity = int(item['quantity'])
+        except (KeyError, TypeError, ValueError):
+            raise PricingError('Each item needs productId and an integer quantity')
+        if quantity < 1:
+            raise PricingError('Quantity must be at least 1', productId=product_id)
+        # Repeated lines for the same product and size are combined
+        key = (product_id, item.get('size') or None)
+        quantities[key] = quantities.get(key, 0) + quantity
+        if item.get('price') is not None:
+            client_prices[product_id] = to_pence(item['price'])
+    
+    product_ids = list(dict.fromkeys(pid for pid, _ in quantities))
+    products = ProductModel.get_products_by_ids(db, product_ids, PRICING_PROJECTION)
+    
+    missing = [pid for pid in product_ids if pid not in products]
+    if missing:
+        raise PricingError('Product not found', status=404, missing=missing)
+    unavailable = [pid for pid in product_ids if not products[pid].get('availability', True)]
+    if unavailable:
+        raise PricingError('Some products are no longer available', status=409, unavailable=unavailable)
+    for product_id, size in quantities:
+        size_error = InventoryModel.check_size(products[product_id], size)
+        if size_error:
+            raise PricingError(size_error, productId=product_id)
+    
+    lines = []
+    stock_lines = []
+    stale = []
+    reported = set()
+    subtotal = 0
+    for (product_id, size), quantity in quantities.items():
+        product = products[product_id]
+        unit = to_pence(product['price'])
+        line_total = unit * quantity
+        subtotal += line_total
+        
+        if product_id in client_prices and client_prices[product_id] != unit and product_id not in reported:
+            reported.add(product_id)
+            stale.append({
+                'productId': product_id,
+                'price': from_pence(unit),
+                'submittedPrice': from_pence(client_prices[product_id])
+            })
+        
+        line = {
+            'productId': product_id,
+            'name': product['name'],
+            'price': from_pence(unit),
+            'quantity': quantity,
+            'subtotal': from_pence(line_total),
+            'unitPricePence': unit,
+            'lineTotalPence': line_total
+        }
+        if size:
+            line['size'] = size
+        lines.append(line)
+        
+        # What InventoryModel.reserve holds: per size only where the product tracks sizes
+        stock_line = {'productId': product_id, 'quantity': quantity}
+        if size and product.get('inventory'):
+            stock_line['size'] = size
+        stock_lines.append(stock_line)
+    
+    if stale:
+        raise PricingError('Prices have changed, please review your basket', status=409, stalePrices=stale)
+    if expected_total is not None and to_pence(expected_total) != subtotal:
+        raise PricingError(
+            'Order total does not match current prices',
+            status=409,
+            totalAmount=from_pence(subtotal),
+            submittedTotal=expected_total
+        )
+    
+    shipping = to_pence(shipping_fee)
+    return {
+        'items': lines,
+        'stockLines': stock_lines,
+        'subtotalPence': subtotal,
+        'shippingPence': shipping,
+        'grandTotalPence': subtotal + shipping
+    }
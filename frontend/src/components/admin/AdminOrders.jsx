@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { adminService } from '../../services/adminService';
+import { orderService } from '../../services/orderService';
 import LoadingSpinner from '../common/LoadingSpinner';
 import { 
   Container, Row, Col, Card, Table, Button, Badge, 
@@ -25,20 +26,33 @@ const AdminOrders = () => {
   const [trackingNumber, setTrackingNumber] = useState('');
   const [searchTerm, setSearchTerm] = useState('');
   const [statusFilter, setStatusFilter] = useState('');
+  const [emailFilter, setEmailFilter] = useState('');
   const [currentPage, setCurrentPage] = useState(1);
+  // pageCursors[n] is the cursor that loads page n + 1
+  const [pageCursors, setPageCursors] = useState([null]);
   const [totalPages, setTotalPages] = useState(1);
+  const [totalOrders, setTotalOrders] = useState(0);
   const [itemsPerPage] = useState(10);
 
   useEffect(() => {
     fetchOrders();
-  }, [currentPage, statusFilter]);
+  }, [currentPage, statusFilter, emailFilter]);
 
   const fetchOrders = async () => {
     setLoading(true);
     try {
-      const data = await adminService.getAllOrders(currentPage, itemsPerPage);
+      const filters = {};
+      if (statusFilter) filters.status = statusFilter;
+      if (emailFilter.trim()) filters.email = emailFilter.trim();
+      const data = await adminService.getAllOrders(pageCursors[currentPage - 1], itemsPerPage, filters);
       setOrders(data.orders || []);
       setTotalPages(data.totalPages || 1);
+      setTotalOrders(data.total || 0);
+      setPageCursors(prev => {
+        const next = prev.slice(0, currentPage);
+        if (data.nextCursor) next.push(data.nextCursor);
+        return next;
+      });
     } catch (error) {
       toast.error('Failed to load orders');
     } finally {
@@ -46,9 +60,24 @@ const AdminOrders = () => {
     }
   };
 
-  const handleViewDetails = (order) => {
+  const applyServerFilter = (setter) => (value) => {
+    setter(value);
+    setPageCursors([null]);
+    setCurrentPage(1);
+  };
+  const changeStatusFilter = applyServerFilter(setStatusFilter);
+  const changeEmailFilter = applyServerFilter(setEmailFilter);
+
+  const handleViewDetails = async (order) => {
+    // List rows are summaries; load the full order for the modal
     setSelectedOrder(order);
     setShowDetailsModal(true);
+    try {
+      const fullOrder = await orderService.getOrderById(order._id);
+      setSelectedOrder(fullOrder);
+    } catch (error) {
+      toast.error('Failed to load order details');
+    }
   };
 
   const handleUpdateStatus = (order) => {
@@ -141,10 +170,15 @@ const AdminOrders = () => {
       order.userId.toLowerCase().includes(searchTerm.toLowerCase()) ||
       (order.shippingInfo?.trackingNumber && 
        order.shippingInfo.trackingNumber.toLowerCase().includes(searchTerm.toLowerCase()));
-    const matchesStatus = statusFilter === '' || order.orderStatus === statusFilter;
-    return matchesSearch && matchesStatus;
+    return matchesSearch;
   });
 
+  const clearFilters = () => {
+    setSearchTerm('');
+    changeStatusFilter('');
+    changeEmailFilter('');
+  };
+
   if (loading && orders.length === 0) {
     return <LoadingSpinner message="Loading orders..." />;
   }
@@ -154,7 +188,7 @@ const AdminOrders = () => {
       <div className="d-flex justify-content-between align-items-center mb-4">
         <h1>Order Management</h1>
         <div className="text-muted">
-          Total Orders: {orders.length}
+          Total Orders: {totalOrders}
         </div>
       </div>
 
@@ -162,7 +196,7 @@ const AdminOrders = () => {
       <Card className="mb-4">
         <Card.Body>
           <Row>
-            <Col md={6}>
+            <Col md={4}>
               <Form.Group>
                 <InputGroup>
                   <InputGroup.Text>
@@ -170,18 +204,28 @@ const AdminOrders = () => {
                   </InputGroup.Text>
                   <Form.Control
                     type="text"
-                    placeholder="Search by Order ID, User ID, or Tracking Number..."
+                    placeholder="Search this page by Order ID, User ID, or Tracking Number..."
                     value={searchTerm}
                     onChange={(e) => setSearchTerm(e.target.value)}
                   />
                 </InputGroup>
               </Form.Group>
             </Col>
-            <Col md={4}>
+            <Col md={3}>
+              <Form.Group>
+                <Form.Control
+                  type="text"
+                  placeholder="Customer email starts with..."
+                  value={emailFilter}
+                  onChange={(e) => changeEmailFilter(e.target.value)}
+                />
+              </Form.Group>
+            </Col>
+            <Col md={3}>
               <Form.Group>
                 <Form.Select
                   value={statusFilter}
-                  onChange={(e) => setStatusFilter(e.target.value)}
+                  onChange={(e) => changeStatusFilter(e.target.value)}
                 >
                   <option value="">All Statuses</option>
                   {Object.entries(ORDER_STATUS).map(([key, config]) => (
@@ -194,10 +238,7 @@ const AdminOrders = () => {
               <Button 
                 variant="outline-secondary" 
                 className="w-100"
-                onClick={() => {
-                  setSearchTerm('');
-                  setStatusFilter('');
-                }}
+                onClick={clearFilters}
               >
                 <FaFilter className="me-2" />
                 Clear Filters
@@ -244,7 +285,7 @@ const AdminOrders = () => {
                     </td>
                     <td>
                       <Badge bg="info">
-                        {order.items?.length || 0} items
+                        {order.itemCount ?? order.items?.length ?? 0} items
                       </Badge>
                     </td>
                     <td>
@@ -292,13 +333,10 @@ const AdminOrders = () => {
             <div className="text-center py-5">
               <FaBoxOpen size={48} className="text-muted mb-3" />
               <p className="text-muted">No orders found</p>
-              {searchTerm || statusFilter ? (
+              {searchTerm || statusFilter || emailFilter ? (
                 <Button 
                   variant="outline-primary"
-                  onClick={() => {
-                    setSearchTerm('');
-                    setStatusFilter('');
-                  }}
+                  onClick={clearFilters}
                 >
                   Clear filters to see all orders
                 </Button>
@@ -319,38 +357,13 @@ const AdminOrders = () => {
                   disabled={currentPage === 1}
                 />
                 
-                {[...Array(totalPages).keys()].map(num => {
-                  const pageNum = num + 1;
-                  if (
-                    pageNum === 1 ||
-                    pageNum === totalPages ||
-                    (pageNum >= currentPage - 1 && pageNum <= currentPage + 1)
-                  ) {
-                    return (
-                      <Pagination.Item
-                        key={pageNum}
-                        active={pageNum === currentPage}
-                        onClick={() => setCurrentPage(pageNum)}
-                      >
-                        {pageNum}
-                      </Pagination.Item>
-                    );
-                  } else if (
-                    pageNum === currentPage - 2 ||
-                    pageNum === currentPage + 2
-                  ) {
-                    return <Pagination.Ellipsis key={pageNum} />;
-                  }
-                  return null;
-                })}
+                <Pagination.Item active>
+                  Page {currentPage} of {totalPages}
+                </Pagination.Item>
                 
                 <Pagination.Next 
                   onClick={() => setCurrentPage(currentPage + 1)} 
-                  disabled={currentPage === totalPages}
-                />
-                <Pagination.Last 
-                  onClick={() => setCurrentPage(totalPages)} 
-                  disabled={currentPage === totalPages}
+                  disabled={pageCursors.length <= currentPage}
                 />
               </Pagination>
             </div>
@@ -12,7 +12,7 @@ import {
   FaFilter, FaSort, FaToggleOn, FaToggleOff,
   FaBox, FaBoxOpen, FaCheckSquare, FaSquare
 } from 'react-icons/fa';
-import { formatPrice } from '../../utils/helper';
+import { formatPrice, getImageUrl } from '../../utils/helper';
 import { toast } from 'react-toastify';
 
 const AdminProducts = () => {
@@ -358,9 +358,7 @@ const AdminProducts = () => {
               </thead>
               <tbody>
                 {products.map(product => {
-                  const imageUrl = product.images?.[0]?.data 
-                    ? `data:${product.images[0].contentType};base64,${product.images[0].data}`
-                    : 'https://via.placeholder.com/50x50?text=No+Image';
+                  const imageUrl = getImageUrl(product.images?.[0], 'https://via.placeholder.com/50x50?text=No+Image', 'thumb');
                   const stockStatus = getStockStatus(product.stock);
 
                   return (
@@ -587,9 +585,7 @@ const AdminProducts = () => {
             <div className="mt-3 p-3 bg-light rounded">
               <div className="d-flex align-items-center">
                 <img
-                  src={productToDelete.images?.[0]?.data 
-                    ? `data:${productToDelete.images[0].contentType};base64,${productToDelete.images[0].data}`
-                    : 'https://via.placeholder.com/50x50?text=No+Image'}
+                  src={getImageUrl(productToDelete.images?.[0], 'https://via.placeholder.com/50x50?text=No+Image', 'thumb')}
                   alt={productToDelete.name}
                   style={{ width: '50px', height: '50px', objectFit: 'cover' }}
                   className="rounded me-3"
@@ -238,7 +238,7 @@ const Dashboard = () => {
             <Card.Body>
               <Row className="align-items-center">
                 <Col xs={8}>
-                  <h6 className="text-muted mb-0">Weekly Sales</h6>
+                  <h6 className="text-muted mb-0">Sales (last {daysFilter} days)</h6>
                   <h3 className="mt-2">{formatPrice(stats?.summary.totalRevenue || 0)}</h3>
                   <small className="text-success">
                     
@@ -72,7 +72,7 @@ const Cart = () => {
                 </div>
                 
                 {cartItems.map(item => (
-                  <CartItem key={item.productId} item={item} />
+                  <CartItem key={`${item.productId}:${item.size || ''}`} item={item} />
                 ))}
               </Card.Body>
             </Card>
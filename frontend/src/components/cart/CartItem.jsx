@@ -3,7 +3,7 @@ import { Link } from 'react-router-dom';
 import { useCart } from '../../context/CartContext';
 import { Row, Col, Image, Button, Form } from 'react-bootstrap';
 import { FaTrash } from 'react-icons/fa';
-import { formatPrice } from '../../utils/helper';
+import { formatPrice, getImageUrl } from '../../utils/helper';
 
 const CartItem = ({ item }) => {
   const { updateQuantity, removeFromCart } = useCart();
@@ -11,17 +11,15 @@ const CartItem = ({ item }) => {
   const handleQuantityChange = (e) => {
     const newQuantity = parseInt(e.target.value);
     if (newQuantity >= 1) {
-      updateQuantity(item.productId, newQuantity);
+      updateQuantity(item.productId, newQuantity, item.size);
     }
   };
 
   const handleRemove = () => {
-    removeFromCart(item.productId);
+    removeFromCart(item.productId, item.size);
   };
 
-  const imageUrl = item.product?.image?.data 
-    ? `data:${item.product.image.contentType};base64,${item.product.image.data}`
-    : 'https://via.placeholder.com/100x100?text=No+Image';
+  const imageUrl = getImageUrl(item.product?.image, 'https://via.placeholder.com/100x100?text=No+Image');
 
   const subtotal = (item.product?.price || 0) * item.quantity;
 
@@ -43,6 +41,9 @@ const CartItem = ({ item }) => {
         <Link to={`/products/${item.productId}`} className="text-decoration-none">
           <h6 className="mb-1">{item.product?.name}</h6>
         </Link>
+        {item.size && (
+          <small className="text-muted d-block">Size: {item.size}</small>
+        )}
         {item.product?.availability === false && (
           <small className="text-danger">Out of stock</small>
         )}
@@ -13,6 +13,7 @@ import {
   FaHeart, FaCrown, FaGift, FaStore
 } from 'react-icons/fa';
 import { MdDashboard } from 'react-icons/md';
+import { getImageUrl } from '../../utils/helper';
 import './Header.css';
 
 const Header = () => {
@@ -155,10 +156,7 @@ const Header = () => {
                         {cartItems.slice(0, 3).map((item, index) => (
                           <div key={index} className="cart-preview-item">
                             <img 
-                              src={item.product.image?.data 
-                                ? `data:${item.product.image.contentType};base64,${item.product.image.data}`
-                                : 'https://via.placeholder.com/40x40?text=Product'
-                              } 
+                              src={getImageUrl(item.product.image, 'https://via.placeholder.com/40x40?text=Product')} 
                               alt={item.product.name}
                               className="cart-preview-image"
                             />
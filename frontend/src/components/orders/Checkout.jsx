@@ -16,11 +16,11 @@ import {
   FaCity, FaMapPin, FaPhone, FaGlobe, FaExclamationTriangle,
   FaSearch, FaSpinner, FaBuilding, FaShippingFast
 } from 'react-icons/fa';
-import { formatPrice, getUserData } from '../../utils/helper';
+import { formatPrice, getUserData, getImageUrl } from '../../utils/helper';
 import { toast } from 'react-toastify';
 
 const Checkout = () => {
-  const { cartItems, getCartTotal, clearCart } = useCart();
+  const { cartItems, getCartTotal, clearCart, refreshCart } = useCart();
   const { user, isAuthenticated } = useAuth();
   const navigate = useNavigate();
   
@@ -339,6 +339,7 @@ const Checkout = () => {
         userId: userId,
         items: cartItems.map(item => ({
           productId: item.productId,
+          size: item.size,
           name: item.product.name,
           price: item.product.price,
           quantity: item.quantity,
@@ -365,6 +366,10 @@ const Checkout = () => {
       }
     } catch (error) {
       toast.error(error.error || 'Failed to place order');
+      // Prices are set by the server; reload the cart so the review shows current ones
+      if (error.stalePrices || error.totalAmount !== undefined) {
+        await refreshCart();
+      }
       setProcessing(false);
     }
   };
@@ -547,9 +552,7 @@ const Checkout = () => {
                           <td>
                             <div className="d-flex align-items-center">
                               <img
-                                src={item.product?.image?.data 
-                                  ? `data:${item.product.image.contentType};base64,${item.product.image.data}`
-                                  : 'https://via.placeholder.com/40x40?text=Product'}
+                                src={getImageUrl(item.product?.image, 'https://via.placeholder.com/40x40?text=Product')}
                                 alt={item.product?.name}
                                 style={{ width: '40px', height: '40px', objectFit: 'cover' }}
                                 className="rounded me-2"
@@ -4,7 +4,7 @@ import { useCart } from '../../context/CartContext';
 import { Card, Button, Badge } from 'react-bootstrap';
 import { FaShoppingCart, FaEye } from 'react-icons/fa';
 import { toast } from 'react-toastify';
-import { formatPrice } from '../../utils/helper';
+import { formatPrice, getImageUrl } from '../../utils/helper';
 
 const ProductCard = ({ product }) => {
   const { addToCart } = useCart();
@@ -20,9 +20,7 @@ const ProductCard = ({ product }) => {
     }
   };
 
-  const imageUrl = product.images?.[0]?.data 
-    ? `data:${product.images[0].contentType};base64,${product.images[0].data}`
-    : 'https://via.placeholder.com/300x200?text=No+Image';
+  const imageUrl = getImageUrl(product.thumbnail || product.images?.[0], 'https://via.placeholder.com/300x200?text=No+Image');
 
   return (
     <Card className="h-100">
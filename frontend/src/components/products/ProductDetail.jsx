@@ -6,7 +6,7 @@ import LoadingSpinner from '../common/LoadingSpinner';
 import { Container, Row, Col, Button, Badge, Alert, Image, Form } from 'react-bootstrap';
 import { FaShoppingCart, FaArrowLeft, FaStar } from 'react-icons/fa';
 import { toast } from 'react-toastify';
-import { formatPrice } from '../../utils/helper';
+import { formatPrice, getImageUrl } from '../../utils/helper';
 
 const ProductDetail = () => {
   const { id } = useParams();
@@ -40,7 +40,7 @@ const ProductDetail = () => {
 
   const handleAddToCart = async () => {
     try {
-      await addToCart(product._id, quantity);
+      await addToCart(product._id, quantity, selectedSize || null);
       toast.success('Added to cart!');
     } catch (error) {
       toast.error('Failed to add to cart');
@@ -72,9 +72,7 @@ const ProductDetail = () => {
 
   // Get the selected image based on selectedImageIndex
   const selectedImage = product.images?.[selectedImageIndex];
-  const mainImage = selectedImage?.data 
-    ? `data:${selectedImage.contentType};base64,${selectedImage.data}`
-    : 'https://via.placeholder.com/500x400?text=No+Image';
+  const mainImage = getImageUrl(selectedImage, 'https://via.placeholder.com/500x400?text=No+Image', 'zoom');
 
   return (
     <Container className="py-5">
@@ -125,7 +123,7 @@ const ProductDetail = () => {
                     onMouseLeave={(e) => e.currentTarget.style.transform = 'scale(1)'}
                   >
                     <Image
-                      src={`data:${img.contentType};base64,${img.data}`}
+                      src={getImageUrl(img, null, 'thumb')}
                       alt={`${product.name} ${index + 1}`}
                       thumbnail
                       style={{ 
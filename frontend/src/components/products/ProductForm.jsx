@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { productService } from '../../services/productService';
+import { getImageUrl } from '../../utils/helper';
 import { Form, Button, Row, Col, Alert, Card, Tab, Nav,Badge } from 'react-bootstrap';
 import { FaUpload, FaImage, FaTags, FaBox, FaDollarSign, FaInfoCircle } from 'react-icons/fa';
 import { toast } from 'react-toastify';
@@ -35,9 +36,7 @@ const ProductForm = ({ product, categories, onSuccess, onCancel }) => {
         images: []
       });
       if (product.images) {
-        setImagePreviews(product.images.map(img => 
-          `data:${img.contentType};base64,${img.data}`
-        ));
+        setImagePreviews(product.images.map(img => getImageUrl(img)));
       }
     }
   }, [product]);
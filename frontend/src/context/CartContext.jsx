@@ -29,15 +29,15 @@ export const CartProvider = ({ children }) => {
   };
 
   useEffect(() => {
-    const token = localStorage.getItem('token');
-    if (token) {
+    // Guests have a cart too, keyed by the cartToken the API issues
+    if (localStorage.getItem('token') || localStorage.getItem('cartToken')) {
       fetchCart();
     }
   }, []);
 
-  const addToCart = async (productId, quantity = 1) => {
+  const addToCart = async (productId, quantity = 1, size = null) => {
     try {
-      await cartService.addToCart(productId, quantity);
+      await cartService.addToCart(productId, quantity, size);
       await fetchCart();
       toast.success('Added to cart!');
     } catch (error) {
@@ -46,13 +46,13 @@ export const CartProvider = ({ children }) => {
     }
   };
 
-  const updateQuantity = async (productId, quantity) => {
+  const updateQuantity = async (productId, quantity, size = null) => {
     try {
       if (quantity < 1) {
-        await removeFromCart(productId);
+        await removeFromCart(productId, size);
         return;
       }
-      await cartService.updateCartItem(productId, quantity);
+      await cartService.updateCartItem(productId, quantity, size);
       await fetchCart();
       toast.success('Cart updated!');
     } catch (error) {
@@ -61,9 +61,9 @@ export const CartProvider = ({ children }) => {
     }
   };
 
-  const removeFromCart = async (productId) => {
+  const removeFromCart = async (productId, size = null) => {
     try {
-      await cartService.removeFromCart(productId);
+      await cartService.removeFromCart(productId, size);
       await fetchCart();
       toast.success('Removed from cart!');
     } catch (error) {
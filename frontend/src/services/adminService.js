@@ -20,9 +20,12 @@ export const adminService = {
     }
   },
 
-  getAllOrders: async (page = 1, limit = 20) => {
+  // filters: { status, paymentStatus, from, to, email }; cursor comes from the previous page's nextCursor
+  getAllOrders: async (cursor = null, limit = 20, filters = {}) => {
     try {
-      const response = await api.get('/admin/orders', { params: { page, limit } });
+      const params = { limit, ...filters };
+      if (cursor) params.cursor = cursor;
+      const response = await api.get('/admin/orders', { params });
       return response.data;
     } catch (error) {
       throw error.response?.data || error.message;
@@ -16,6 +16,11 @@ api.interceptors.request.use(
     if (token) {
       config.headers.Authorization = `Bearer ${token}`;
     }
+    // Anonymous carts are identified by a server-issued token
+    const cartToken = localStorage.getItem('cartToken');
+    if (cartToken) {
+      config.headers['X-Cart-Token'] = cartToken;
+    }
     return config;
   },
   (error) => {
@@ -25,7 +30,12 @@ api.interceptors.request.use(
 
 // Response interceptor to handle errors
 api.interceptors.response.use(
-  (response) => response,
+  (response) => {
+    if (response.data?.cartToken) {
+      localStorage.setItem('cartToken', response.data.cartToken);
+    }
+    return response;
+  },
   (error) => {
     if (error.response?.status === 401) {
       // Token expired or invalid
@@ -25,6 +25,8 @@ export const authService = {
           email: credentials.email,
           isAdmin: response.data.isAdmin || false
         });
+        // Any guest cart was merged into the account on login
+        localStorage.removeItem('cartToken');
       }
       return response.data;
     } catch (error) {
@@ -10,27 +10,27 @@ export const cartService = {
     }
   },
 
-  addToCart: async (productId, quantity) => {
+  addToCart: async (productId, quantity, size = null) => {
     try {
-      const response = await api.post('/cart', { productId, quantity });
+      const response = await api.post('/cart', { productId, quantity, size });
       return response.data;
     } catch (error) {
       throw error.response?.data || error.message;
     }
   },
 
-  updateCartItem: async (productId, quantity) => {
+  updateCartItem: async (productId, quantity, size = null) => {
     try {
-      const response = await api.post('/cart', { productId, quantity });
+      const response = await api.post('/cart', { productId, quantity, size });
       return response.data;
     } catch (error) {
       throw error.response?.data || error.message;
     }
   },
 
-  removeFromCart: async (productId) => {
+  removeFromCart: async (productId, size = null) => {
     try {
-      const response = await api.delete(`/cart/${productId}`);
+      const response = await api.delete(`/cart/${productId}`, { params: size ? { size } : {} });
       return response.data;
     } catch (error) {
       throw error.response?.data || error.message;
@@ -43,7 +43,7 @@ export const cartService = {
       const cart = await cartService.getCart();
       // Remove all items one by one (or implement bulk delete in backend)
       for (const item of cart) {
-        await cartService.removeFromCart(item.productId);
+        await cartService.removeFromCart(item.productId, item.size);
       }
       return { message: 'Cart cleared successfully' };
     } catch (error) {
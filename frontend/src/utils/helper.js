@@ -1,3 +1,5 @@
+import { API_BASE_URL } from './constants';
+
 export const formatPrice = (price) => {
   return new Intl.NumberFormat('en-US', {
     style: 'currency',
@@ -38,4 +40,19 @@ export const isAdmin = () => {
 export const validateEmail = (email) => {
   const re = /^[^\s@]+@[^\s@]+\.[^\s@]+$/;
   return re.test(email);
+};
+
+export const getImageUrl = (image, placeholder = null, variant = null) => {
+  // Prefer a generated derivative (thumb/card/zoom) when one exists
+  if (variant && image?.variants?.[variant]) {
+    image = image.variants[variant];
+  }
+  if (image?.hash) {
+    return `${API_BASE_URL}/images/${image.hash}`;
+  }
+  // Legacy products still carrying embedded base64 data
+  if (image?.data) {
+    return `data:${image.contentType};base64,${image.data}`;
+  }
+  return placeholder;
 };
\ No newline at end of file